@@ -0,0 +1,240 @@
+"""
+perf_regression.py
+------------------
+Latences de queue (p50/p90/p99) avec intervalles de confiance bootstrap et
+détection de régression par rapport à une baseline enregistrée.
+
+Exemples :
+    # Enregistrer le dernier run comme baseline
+    python -m src.analysis.perf_regression --save-baseline
+
+    # Comparer le dernier run à la baseline (code retour 1 si régression)
+    python -m src.analysis.perf_regression --latency-threshold 0.10 --wer-threshold 0.02
+
+Une régression est signalée seulement si l'estimation courante dépasse la
+baseline au-delà du seuil ET que la borne basse de son IC dépasse la valeur
+de baseline : le bruit d'échantillonnage seul ne fait pas échouer le contrôle.
+
+L'état courant d'un modèle est la dernière ligne de chaque (modèle, jeu,
+fichier) sur l'ensemble des runs : un run repris ne contient que les fichiers
+recalculés et ne suffit pas à lui seul. Une statistique de la baseline absente
+de l'état courant fait échouer le contrôle (--allow-missing : simple avertissement).
+"""
+
+import os
+import sys
+import json
+import argparse
+import numpy as np
+from datetime import datetime
+
+from src.common.config import BASELINES_DIR, RESULTS_STORE_DIR
+from src.common.results_store import list_runs, load_results
+
+PERCENTILES = {"p50": 50, "p90": 90, "p99": 99}
+LATENCY_METRICS = ["latency_sec", "rtf"]
+
+
+# ---------------------------------------------------------------------
+# Statistiques
+# ---------------------------------------------------------------------
+def bootstrap_ci(values, stat_fn, n_boot=2000, alpha=0.05, seed=0):
+    """
+    IC bootstrap (percentile) d'une statistique.
+    stat_fn(samples, axis=1) doit accepter un tableau (n_boot, n) : tous les
+    rééchantillonnages sont évalués en une seule opération NumPy.
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return np.nan, (np.nan, np.nan)
+    rng = np.random.default_rng(seed)
+    samples = values[rng.integers(0, values.size, size=(n_boot, values.size))]
+    boots = stat_fn(samples, axis=1)
+    low, high = np.quantile(boots, [alpha / 2, 1 - alpha / 2])
+    point = float(stat_fn(values[np.newaxis, :], axis=1)[0])
+    return point, (float(low), float(high))
+
+
+def summarize_run(df, n_boot=2000):
+    """Par modèle : p50/p90/p99 de latence et RTF, WER moyen, tous avec IC 95 %."""
+    if "rtf" in df.columns and "duration_sec" in df.columns:
+        df = df.copy()
+        df["rtf"] = df["rtf"].fillna(df["latency_sec"] / df["duration_sec"])
+
+    summary = {}
+    for model, group in df.groupby("model"):
+        entry = {"n": int(len(group))}
+        for metric in LATENCY_METRICS:
+            if metric not in group.columns or group[metric].isna().all():
+                continue
+            entry[metric] = {}
+            for name, q in PERCENTILES.items():
+                value, ci = bootstrap_ci(group[metric], lambda a, axis, q=q: np.percentile(a, q, axis=axis), n_boot)
+                entry[metric][name] = {"value": value, "ci": ci}
+        if "wer" in group.columns and not group["wer"].isna().all():
+            value, ci = bootstrap_ci(group["wer"], np.mean, n_boot)
+            entry["wer"] = {"mean": {"value": value, "ci": ci}}
+        summary[str(model)] = entry
+    return summary
+
+
+# ---------------------------------------------------------------------
+# Comparaison à la baseline
+# ---------------------------------------------------------------------
+def compare(current, baseline, latency_threshold, wer_threshold):
+    """
+    Renvoie la liste des régressions (dicts).
+    Latence/RTF : seuil relatif ; WER : seuil absolu.
+    """
+    regressions = []
+    for model, cur in current.items():
+        base = baseline.get(model)
+        if not base:
+            continue
+        for metric, stats in cur.items():
+            if metric == "n" or metric not in base:
+                continue
+            for stat_name, cur_stat in stats.items():
+                base_stat = base[metric].get(stat_name)
+                if not base_stat or np.isnan(cur_stat["value"]) or np.isnan(base_stat["value"]):
+                    continue
+                base_value = base_stat["value"]
+                if metric == "wer":
+                    limit = base_value + wer_threshold
+                else:
+                    limit = base_value * (1 + latency_threshold)
+                if cur_stat["value"] > limit and cur_stat["ci"][0] > base_value:
+                    regressions.append({
+                        "model": model, "metric": metric, "stat": stat_name,
+                        "baseline": base_value, "current": cur_stat["value"],
+                        "ci": cur_stat["ci"], "limit": limit,
+                    })
+    return regressions
+
+
+def missing_stats(current, baseline):
+    """Statistiques de la baseline absentes de l'état courant : [(modèle, métrique, stat)]."""
+    missing = []
+    for model, base in baseline.items():
+        cur = current.get(model, {})
+        for metric, stats in base.items():
+            if metric == "n":
+                continue
+            for stat_name, base_stat in stats.items():
+                if base_stat["value"] is None or np.isnan(base_stat["value"]):
+                    continue
+                cur_stat = cur.get(metric, {}).get(stat_name)
+                if cur_stat is None or np.isnan(cur_stat["value"]):
+                    missing.append((model, metric, stat_name))
+    return missing
+
+
+def format_summary(summary):
+    lines = []
+    for model, entry in summary.items():
+        lines.append(f"{model} (n={entry['n']})")
+        for metric, stats in entry.items():
+            if metric == "n":
+                continue
+            for stat_name, s in stats.items():
+                lines.append(f"  {metric:<12} {stat_name:<5} {s['value']:.4f}  IC95 [{s['ci'][0]:.4f}, {s['ci'][1]:.4f}]")
+    return "\n".join(lines)
+
+
+def latest_rows(store_dir, models=None, up_to=None):
+    """
+    Dernière ligne de chaque (modèle, jeu, fichier) sur tous les runs jusqu'à up_to
+    inclus (les run_id commencent par un horodatage ; les imports legacy sont ignorés).
+    Renvoie (DataFrame, dernier run_id pris en compte).
+    """
+    run_ids = sorted({
+        run_id for model, run_id in list_runs(store_dir)
+        if not run_id.startswith("legacy-") and (not models or model in models)
+        and (up_to is None or run_id <= up_to)
+    })
+    if not run_ids:
+        return None, None
+    df = load_results(store_dir, models=models, run_ids=run_ids,
+                      columns=["audio_file", "dataset", "latency_sec", "rtf", "duration_sec", "wer"])
+    keys = [c for c in ("model", "dataset", "audio_file") if c in df.columns]
+    df = df.sort_values("run_id", kind="stable").drop_duplicates(keys, keep="last")
+    return df, run_ids[-1]
+
+
+def baseline_path(name):
+    return os.path.join(BASELINES_DIR, f"{name}.json")
+
+
+# ---------------------------------------------------------------------
+# Programme principal
+# ---------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Latences de queue et contrôle de régression")
+    parser.add_argument("--run_id", type=str, default=None,
+                        help="État des résultats à ce run inclus (défaut : tous les runs)")
+    parser.add_argument("--models", nargs="*", default=None)
+    parser.add_argument("--baseline", type=str, default="default", help="Nom de la baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Enregistrer le run comme baseline")
+    parser.add_argument("--latency-threshold", type=float, default=0.10, help="Régression relative tolérée (latence, RTF)")
+    parser.add_argument("--wer-threshold", type=float, default=0.02, help="Hausse absolue tolérée du WER moyen")
+    parser.add_argument("--allow-missing", action="store_true",
+                        help="Statistique de la baseline absente : avertissement au lieu d'un échec")
+    parser.add_argument("--n_boot", type=int, default=2000)
+    parser.add_argument("--store_dir", type=str, default=RESULTS_STORE_DIR)
+    args = parser.parse_args()
+
+    df, run_id = latest_rows(args.store_dir, args.models, args.run_id)
+    if not run_id:
+        print("Aucun run trouvé dans le store")
+        return 2
+    if df.empty:
+        print(f"Aucun résultat jusqu'au run {run_id}")
+        return 2
+
+    summary = summarize_run(df, args.n_boot)
+    print(f"Dernier résultat par fichier, jusqu'au run {run_id} ({df['run_id'].nunique()} run(s))")
+    print(format_summary(summary))
+
+    path = baseline_path(args.baseline)
+    if args.save_baseline:
+        os.makedirs(BASELINES_DIR, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"run_id": run_id, "created": datetime.now().isoformat(timespec="seconds"),
+                       "models": summary}, f, indent=2)
+        print(f"Baseline enregistrée : {path}")
+        return 0
+
+    if not os.path.exists(path):
+        print(f"Pas de baseline ({path}) : lancer d'abord avec --save-baseline")
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    base_models = {m: e for m, e in baseline["models"].items() if not args.models or m in args.models}
+    for model, entry in base_models.items():
+        if model in summary and summary[model]["n"] < entry["n"]:
+            print(f"Attention : {model} compte {summary[model]['n']} fichier(s) contre {entry['n']} dans la baseline")
+
+    status = 0
+    missing = missing_stats(summary, base_models)
+    if missing:
+        print(f"{len(missing)} statistique(s) de la baseline absente(s) :")
+        for model, metric, stat_name in missing:
+            print(f"  {model} {metric} {stat_name}")
+        if not args.allow_missing:
+            status = 1
+
+    regressions = compare(summary, base_models, args.latency_threshold, args.wer_threshold)
+    if not regressions:
+        print(f"Aucune régression par rapport à la baseline {baseline['run_id']}")
+        return status
+    print(f"{len(regressions)} régression(s) par rapport à la baseline {baseline['run_id']} :")
+    for r in regressions:
+        print(f"  {r['model']} {r['metric']} {r['stat']} : {r['baseline']:.4f} -> {r['current']:.4f} "
+              f"(IC95 [{r['ci'][0]:.4f}, {r['ci'][1]:.4f}], limite {r['limit']:.4f})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
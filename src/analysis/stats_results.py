@@ -5,30 +5,26 @@ import seaborn as sns
 from scipy.stats import skew, kurtosis
 import numpy as np
 from src.common.config import REPORTING_DIR, RESULTS_DIR
+from src.common.results_store import SCHEMA_COLS, load_results, load_legacy_csv
 
 # ---------------------------------------------------------------------
 # Lecture des résultats
 # ---------------------------------------------------------------------
-BENCHMARK_CSV = os.path.join(RESULTS_DIR, "benchmark_vosk-model-small-fr-0.22_v2.csv")
-df = pd.read_csv(BENCHMARK_CSV)
-
-# Nettoyage : mémoire négative → 0
-if 'memory_mb' in df.columns:
-    df['memory_mb'] = df['memory_mb'].apply(lambda x: max(0, x))
-
-# Colonnes numériques à convertir (si elles existent)
 num_cols = ['wer','wer_token','levenshtein','levenshtein_pct','accuracy','bleu3',
             'meteor','chrf','rougeL','latency_sec','memory_mb','duration_sec',
-            'latency_per_sec','memory_per_sec','tokens','tokens_per_sec',
+            'latency_per_sec','memory_per_sec','tokens','tokens_per_sec','rtf',
             'latency_per_token','memory_per_token','wer_per_token']
 
-for col in num_cols:
-    if col in df.columns:
-        # Gestion spéciale chrf si c'est encore un dict ou str
-        if col == 'chrf':
-            df[col] = df[col].apply(lambda x: float(str(x).split('=')[-1]) if pd.notnull(x) else np.nan)
-        else:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+# Store Parquet typé (chrf déjà en float), seules les colonnes utiles sont lues ;
+# repli sur l'ancien CSV si le store est vide
+BENCHMARK_CSV = os.path.join(RESULTS_DIR, "benchmark_vosk-model-small-fr-0.22_v2.csv")
+df = load_results(columns=['transcript'] + [c for c in num_cols if c in SCHEMA_COLS])
+if df.empty:
+    df = load_legacy_csv(BENCHMARK_CSV)
+
+# Nettoyage : mémoire négative → 0
+if 'memory_mb' in df.columns:
+    df['memory_mb'] = df['memory_mb'].clip(lower=0)
 
 df_clean = df.dropna(subset=['transcript']).copy()
 
@@ -79,6 +75,8 @@ for model_name, group_df in df_clean.groupby('model'):
             '25%': col_data.quantile(0.25),
             '50%': col_data.median(),
             '75%': col_data.quantile(0.75),
+            '90%': col_data.quantile(0.90),
+            '99%': col_data.quantile(0.99),
             'max': col_data.max(),
             'skew': skew(col_data) if np.var(col_data) > 1e-12 else np.nan,
             'kurtosis': kurtosis(col_data) if np.var(col_data) > 1e-12 else np.nan
@@ -0,0 +1,177 @@
+"""
+bilingual_benchmark.py
+----------------------
+Coût du mode bilingue FR / EN (src/speech/bilingual.py) par rapport au décodage
+monolingue français :
+
+    mono-fr     modèle français seul (référence actuelle)
+    lid         sonde de PROBE_SEC dans les deux langues, puis un seul recognizer
+                sur tout le fichier dans la langue retenue
+    parallel    deux recognizers sur tout le fichier, meilleure hypothèse retenue
+
+Fichiers : le jeu français --dataset (langue attendue "fr") et, si fourni, un
+dossier de WAV anglais --en_dir (références : <nom>.txt à côté du WAV).
+
+Par fichier et mode : langue choisie / attendue, WER, latence, surcoût par
+rapport à mono-fr (coût de bascule) et temps du routage. Mémoire : empreinte de
+chaque modèle résident, d'un recognizer par langue, surcoût total du second modèle.
+
+Sorties : results/bilingual/bilingual_<run_id>.csv, summary_<run_id>.csv, memory_<run_id>.json
+
+Exemple :
+    python -m src.benchmarks.bilingual_benchmark --dataset medecin_v2 --en_dir data/raw/english --limit 20
+"""
+
+import os
+import gc
+import time
+import argparse
+import pandas as pd
+from vosk import KaldiRecognizer
+
+from src.common.config import (
+    BENCHMARK_DATASETS, BILINGUAL_RESULTS_DIR, DEFAULT_MODEL_EN, DEFAULT_MODEL_FR, SAMPLE_RATE
+)
+from src.common.run_manifest import atomic_write_json, new_run_id
+from src.common.event_log import event, get_logger
+from src.benchmarks.datasets import load_dataset
+from src.benchmarks.metrics import compute_metrics
+from src.common.memory import rss_mb
+from src.speech.bilingual import PROBE_SEC, STRATEGIES, BilingualRecognizer
+from src.speech.vosk_decode import convert_to_wav, decode_wav, is_vosk_ready, wav_duration
+
+logger = get_logger("Bilingual_Benchmark", "bilingual_benchmark")
+
+
+def english_files(en_dir):
+    if not en_dir or not os.path.isdir(en_dir):
+        return []
+    files = []
+    for name in sorted(f for f in os.listdir(en_dir) if f.lower().endswith(".wav")):
+        ref_path = os.path.join(en_dir, os.path.splitext(name)[0] + ".txt")
+        ref = None
+        if os.path.exists(ref_path):
+            with open(ref_path, "r", encoding="utf-8") as f:
+                ref = f.read().strip()
+        files.append((name, os.path.join(en_dir, name), ref))
+    return files
+
+
+def recognizer_overhead(router):
+    """Delta RSS à la création d'un recognizer par langue (graphe de décodage, tampons)."""
+    overhead = {}
+    for language, model in router.models.items():
+        gc.collect()
+        before = rss_mb()
+        rec = KaldiRecognizer(model, SAMPLE_RATE)
+        rec.AcceptWaveform(b"\0\0" * SAMPLE_RATE)
+        overhead[language] = round(rss_mb() - before, 2)
+        del rec
+    return overhead
+
+
+def _row(audio_file, expected, mode, language, ref_text, text, duration, latency, mono_latency, routing_sec):
+    metrics = compute_metrics(ref_text, text) if ref_text else {"wer": None}
+    return {
+        "audio_file": audio_file,
+        "expected_language": expected,
+        "mode": mode,
+        "language": language,
+        "correct_language": language == expected,
+        "duration_sec": round(duration, 3),
+        "latency_sec": round(latency, 4),
+        "rtf": round(latency / duration, 4) if duration else None,
+        "switch_cost_sec": round(latency - mono_latency, 4),
+        "routing_sec": routing_sec,
+        "wer": metrics["wer"],
+        "transcript": text,
+    }
+
+
+def benchmark_file(router, strategies, audio_file, wav_path, expected, ref_text):
+    duration = wav_duration(wav_path)
+    start = time.perf_counter()
+    text = decode_wav(router.models["fr"], wav_path)
+    mono = time.perf_counter() - start
+    rows = [_row(audio_file, expected, "mono-fr", "fr", ref_text, text, duration, mono, mono, 0.0)]
+    for strategy in strategies:
+        router.strategy = strategy
+        start = time.perf_counter()
+        text, language, info = router.transcribe(wav_path)
+        latency = time.perf_counter() - start
+        rows.append(_row(audio_file, expected, strategy, language, ref_text, text, duration, latency, mono,
+                         info["routing_sec"]))
+    return rows
+
+
+def summarize(df):
+    grouped = df.groupby("mode", sort=False)
+    return pd.DataFrame({
+        "files": grouped["audio_file"].count(),
+        "language_accuracy": grouped["correct_language"].mean(),
+        "wer_mean": grouped["wer"].mean(),
+        "latency_sec_mean": grouped["latency_sec"].mean(),
+        "rtf_mean": grouped["rtf"].mean(),
+        "switch_cost_sec_mean": grouped["switch_cost_sec"].mean(),
+        "switch_cost_sec_p90": grouped["switch_cost_sec"].quantile(0.9),
+        "routing_sec_mean": grouped["routing_sec"].mean(),
+    }).round(4).reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mode bilingue FR / EN : choix de langue, coût de bascule, mémoire")
+    parser.add_argument("--dataset", type=str, default="medecin_v2", choices=list(BENCHMARK_DATASETS))
+    parser.add_argument("--en_dir", type=str, default=None, help="Dossier de WAV anglais (+ <nom>.txt de référence)")
+    parser.add_argument("--model_fr", type=str, default=DEFAULT_MODEL_FR)
+    parser.add_argument("--model_en", type=str, default=DEFAULT_MODEL_EN)
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=STRATEGIES)
+    parser.add_argument("--probe_sec", type=float, default=PROBE_SEC)
+    parser.add_argument("--limit", type=int, default=None, help="Nombre maximal de fichiers par langue")
+    parser.add_argument("--results_dir", type=str, default=BILINGUAL_RESULTS_DIR)
+    args = parser.parse_args()
+
+    files = [(f, p, r, "fr") for f, p, r in load_dataset(args.dataset)[:args.limit]]
+    files += [(f, p, r, "en") for f, p, r in english_files(args.en_dir)[:args.limit]]
+    if not files:
+        logger.warning("Aucun fichier à évaluer")
+        return
+
+    rss_start = rss_mb()
+    router = BilingualRecognizer({"fr": args.model_fr, "en": args.model_en}, probe_sec=args.probe_sec).load()
+    memory = {
+        "rss_start_mb": round(rss_start, 2),
+        "model_mb": router.load_mb,
+        "recognizer_mb": recognizer_overhead(router),
+        "bilingual_overhead_mb": router.load_mb["en"],
+        "rss_loaded_mb": round(rss_mb(), 2),
+    }
+    logger.info(f"Mémoire : {memory}")
+
+    rows = []
+    for audio_file, audio_path, ref_text, expected in files:
+        wav_path = audio_path if is_vosk_ready(audio_path) else convert_to_wav(audio_path)
+        try:
+            file_rows = benchmark_file(router, args.strategies, audio_file, wav_path, expected, ref_text)
+        finally:
+            if wav_path != audio_path and os.path.exists(wav_path):
+                os.remove(wav_path)
+        rows.extend(file_rows)
+        event(logger, "fichier évalué", stage="bilingual", file=audio_file, expected=expected,
+              languages={r["mode"]: r["language"] for r in file_rows})
+    router.close()
+    memory["rss_end_mb"] = round(rss_mb(), 2)
+
+    run_id = new_run_id()
+    os.makedirs(args.results_dir, exist_ok=True)
+    df = pd.DataFrame(rows)
+    df.to_csv(os.path.join(args.results_dir, f"bilingual_{run_id}.csv"), index=False)
+    atomic_write_json(os.path.join(args.results_dir, f"memory_{run_id}.json"), memory)
+    summary = summarize(df)
+    summary_path = os.path.join(args.results_dir, f"summary_{run_id}.csv")
+    summary.to_csv(summary_path, index=False)
+    logger.info("Synthèse :\n" + summary.to_string(index=False))
+    logger.info(f"Synthèse enregistrée dans : {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
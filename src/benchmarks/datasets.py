@@ -0,0 +1,58 @@
+"""
+datasets.py
+-----------
+Accès uniforme aux jeux de données déclarés dans config.BENCHMARK_DATASETS :
+liste des fichiers audio et texte de référence associé.
+Les jeux "synthetic" (src/data/synthetic_generation.py) sont lus depuis leurs
+shards, les WAV étant exportés une fois à côté.
+"""
+
+import os
+import pandas as pd
+
+from src.common.config import BENCHMARK_DATASETS, TSV_DIR
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".mp4", ".flac", ".m4a", ".ogg")
+
+
+def _tsv_references():
+    """Références Common Voice (validated + invalidated) indexées par nom de fichier."""
+    refs = {}
+    for name in ("validated.tsv", "invalidated.tsv"):
+        path = os.path.join(TSV_DIR, name)
+        if os.path.exists(path):
+            df = pd.read_csv(path, sep="\t", usecols=["path", "sentence"])
+            for clip, sentence in zip(df["path"], df["sentence"]):
+                refs.setdefault(os.path.basename(clip), str(sentence).strip())
+    return refs
+
+
+def _txt_reference(transcripts_dir, audio_file):
+    base_name = os.path.splitext(os.path.basename(audio_file))[0]
+    path = os.path.join(transcripts_dir, f"{base_name}.txt")
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    return None
+
+
+def load_dataset(name):
+    """Renvoie la liste des (audio_file, chemin, référence ou None) d'un jeu de données."""
+    if name not in BENCHMARK_DATASETS:
+        raise ValueError(f"Jeu de données inconnu : {name} (disponibles : {', '.join(BENCHMARK_DATASETS)})")
+    spec = BENCHMARK_DATASETS[name]
+    audio_dir = spec["audio_dir"]
+    if not os.path.isdir(audio_dir):
+        return []
+
+    if spec["references"] == "synthetic":
+        from src.data.synthetic_generation import SyntheticDataset
+        if not os.path.exists(os.path.join(audio_dir, "manifest.json")):
+            return []
+        return SyntheticDataset(audio_dir).as_benchmark_files()
+
+    audio_files = sorted(f for f in os.listdir(audio_dir) if f.lower().endswith(AUDIO_EXTENSIONS))
+    if spec["references"] == "tsv":
+        refs = _tsv_references()
+        return [(f, os.path.join(audio_dir, f), refs.get(f)) for f in audio_files]
+    return [(f, os.path.join(audio_dir, f), _txt_reference(spec["references"], f)) for f in audio_files]
@@ -0,0 +1,174 @@
+"""
+denoise_benchmark.py
+--------------------
+Gain de WER du débruitage en flux (src/speech/denoise.py) contre la latence ajoutée.
+
+Chaque fichier du jeu de données est décodé par Vosk sans puis avec le
+StreamingDenoiser branché sur la boucle (frontend), dans les conditions :
+
+    recorded     enregistrement tel quel
+    snr<X>       enregistrement + bruit de NOISE_DIR mélangé à X dB (--snr)
+
+Par fichier, condition et mode : WER / accuracy, temps de décodage, coût du
+débruitage par bloc (moyenne, p95) et latence ajoutée = latence algorithmique
+(FRAME - HOP) + p95 du traitement d'un bloc.
+
+Sorties : results/denoise/denoise_<run_id>.csv + summary_<run_id>.csv
+(WER sans / avec débruitage, gain, latence ajoutée par condition).
+
+Exemple :
+    python -m src.benchmarks.denoise_benchmark --dataset medecin_v2 --snr 10 5 0
+"""
+
+import os
+import time
+import wave
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from vosk import Model
+
+from src.common.config import BENCHMARK_DATASETS, DEFAULT_MODEL_FR, DENOISE_RESULTS_DIR, NOISE_DIR
+from src.common.run_manifest import new_run_id
+from src.common.event_log import event, get_logger
+from src.benchmarks.datasets import load_dataset
+from src.benchmarks.metrics import compute_metrics
+from src.data.synthetic_generation import load_noise, mix_at_snr
+from src.speech.denoise import StreamingDenoiser, noise_profile
+from src.speech.vosk_decode import convert_to_wav, decode_wav, is_vosk_ready, wav_duration
+
+logger = get_logger("Denoise_Benchmark", "denoise_benchmark")
+
+
+class TimedFrontend:
+    """Enveloppe d'un frontend : durée de traitement de chaque bloc."""
+
+    def __init__(self, frontend):
+        self.frontend = frontend
+        self.chunk_sec = []
+
+    def process(self, data):
+        start = time.perf_counter()
+        out = self.frontend.process(data)
+        self.chunk_sec.append(time.perf_counter() - start)
+        return out
+
+    def flush(self):
+        return self.frontend.flush()
+
+
+def write_wav(samples, rate):
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(samples.tobytes())
+    return path
+
+
+def benchmark_condition(model, wav_path, audio_file, condition, ref_text, profile, gain_floor):
+    duration = wav_duration(wav_path)
+    rows = []
+    for mode in ("raw", "denoised"):
+        frontend = TimedFrontend(StreamingDenoiser(noise_psd=profile, gain_floor=gain_floor)) if mode == "denoised" else None
+        start = time.perf_counter()
+        text = decode_wav(model, wav_path, frontend=frontend)
+        decode_sec = time.perf_counter() - start
+        metrics = compute_metrics(ref_text, text)
+        chunk_us = 1e6 * np.array(frontend.chunk_sec) if frontend else np.zeros(1)
+        latency_ms = frontend.frontend.latency_ms + float(np.percentile(chunk_us, 95)) / 1000 if frontend else 0.0
+        rows.append({
+            "audio_file": audio_file,
+            "condition": condition,
+            "mode": mode,
+            "duration_sec": round(duration, 3),
+            "decode_sec": round(decode_sec, 4),
+            "rtf": round(decode_sec / duration, 4) if duration else None,
+            "denoise_chunk_us_mean": round(float(chunk_us.mean()), 2),
+            "denoise_chunk_us_p95": round(float(np.percentile(chunk_us, 95)), 2),
+            "added_latency_ms": round(latency_ms, 3),
+            "wer": metrics["wer"],
+            "accuracy": metrics["accuracy"],
+            "transcript": text,
+        })
+    return rows
+
+
+def summarize(df):
+    pivot = df.pivot_table(index="condition", columns="mode", values="wer", aggfunc="mean", sort=False)
+    denoised = df[df["mode"] == "denoised"].groupby("condition", sort=False)
+    summary = pd.DataFrame({
+        "files": denoised["audio_file"].count(),
+        "wer_raw": pivot["raw"],
+        "wer_denoised": pivot["denoised"],
+        "wer_gain": pivot["raw"] - pivot["denoised"],
+        "denoise_chunk_us_mean": denoised["denoise_chunk_us_mean"].mean(),
+        "added_latency_ms": denoised["added_latency_ms"].mean(),
+        "rtf_raw": df[df["mode"] == "raw"].groupby("condition", sort=False)["rtf"].mean(),
+        "rtf_denoised": denoised["rtf"].mean(),
+    })
+    return summary.round(4).reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débruitage en flux avant Vosk : gain de WER vs latence")
+    parser.add_argument("--dataset", type=str, default="medecin_v2", choices=list(BENCHMARK_DATASETS))
+    parser.add_argument("--model", type=str, default=DEFAULT_MODEL_FR)
+    parser.add_argument("--snr", type=float, nargs="*", default=[10.0, 5.0, 0.0],
+                        help="SNR (dB) des mélanges avec les bruits de NOISE_DIR")
+    parser.add_argument("--gain_floor", type=float, default=0.1)
+    parser.add_argument("--no_profile", action="store_true", help="Bruit estimé en ligne seulement (sans NOISE_DIR)")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results_dir", type=str, default=DENOISE_RESULTS_DIR)
+    args = parser.parse_args()
+
+    files = [f for f in load_dataset(args.dataset) if f[2]][:args.limit]
+    if not files:
+        logger.warning(f"Aucun fichier avec référence dans {args.dataset}")
+        return
+    noise = load_noise() if args.snr else None
+    if args.snr and noise is None:
+        logger.warning(f"Aucun bruit dans {NOISE_DIR} : seules les conditions d'enregistrement sont évaluées")
+    profile = None if args.no_profile else noise_profile()
+    rng = np.random.default_rng(args.seed)
+    model = Model(args.model)
+
+    rows = []
+    for audio_file, audio_path, ref_text in files:
+        wav_path = audio_path if is_vosk_ready(audio_path) else convert_to_wav(audio_path)
+        try:
+            rows.extend(benchmark_condition(model, wav_path, audio_file, "recorded", ref_text, profile, args.gain_floor))
+            if noise is not None:
+                with wave.open(wav_path, "rb") as wf:
+                    rate = wf.getframerate()
+                    speech = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+                for snr in args.snr:
+                    mixed_path = write_wav(mix_at_snr(speech, noise, snr, rng), rate)
+                    try:
+                        rows.extend(benchmark_condition(model, mixed_path, audio_file, f"snr{snr:g}", ref_text,
+                                                        profile, args.gain_floor))
+                    finally:
+                        os.remove(mixed_path)
+        finally:
+            if wav_path != audio_path and os.path.exists(wav_path):
+                os.remove(wav_path)
+        event(logger, "fichier évalué", stage="denoise", file=audio_file,
+              wer={f"{r['condition']}/{r['mode']}": r["wer"] for r in rows if r["audio_file"] == audio_file})
+
+    run_id = new_run_id()
+    os.makedirs(args.results_dir, exist_ok=True)
+    df = pd.DataFrame(rows)
+    df.to_csv(os.path.join(args.results_dir, f"denoise_{run_id}.csv"), index=False)
+    summary = summarize(df)
+    summary_path = os.path.join(args.results_dir, f"summary_{run_id}.csv")
+    summary.to_csv(summary_path, index=False)
+    logger.info("Synthèse :\n" + summary.to_string(index=False))
+    logger.info(f"Synthèse enregistrée dans : {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
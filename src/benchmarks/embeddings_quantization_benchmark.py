@@ -0,0 +1,150 @@
+"""
+embeddings_quantization_benchmark.py
+------------------------------------
+Stockage réduit de la matrice d'embeddings du vocabulaire (EmbeddingsManager,
+precision="float16" / "int8") comparé au float32 de référence.
+
+Requêtes : --queries mots tirés du vocabulaire, vecteur éventuellement bruité
+(--noise, écart-type relatif à la norme : mot mal reconnu proche du mot visé).
+Le mot requête lui-même est exclu des voisins. Pour chaque précision :
+
+    recall@N        part des N plus proches voisins float32 retrouvés (--top_n)
+    cos_err         écart absolu moyen / maximal des similarités cosinus
+    mb / ratio      taille de la matrice (+ échelles int8) et gain vs float32
+    ms_per_query    temps de calcul des similarités sur tout le vocabulaire
+
+Aucun modèle n'est chargé : la matrice vient du cache float32 de
+EmbeddingsManager (<vocab>_embeddings.npy, créé au premier chargement).
+
+En production, la matrice n'est chargée que par le score N-best CamemBERT
+(contexte vs candidat) ; l'empreinte réelle du post-traitement par précision
+est mesurée par memory_profile.py.
+
+Sortie : results/embeddings/quantization_<run_id>.csv
+
+Exemple :
+    python -m src.benchmarks.embeddings_quantization_benchmark --top_n 1 5 10 --noise 0.1
+"""
+
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+from src.common.config import EMBEDDINGS_RESULTS_DIR, VOCAB_DATA_DIR
+from src.common.memory import MB
+from src.common.run_manifest import new_run_id
+from src.common.event_log import event, get_logger
+from src.nlp.embeddings_manager import PRECISIONS, cosine_scores, quantize, row_norms
+
+logger = get_logger("Embeddings_Quantization_Benchmark", "embeddings_quantization_benchmark")
+
+# Requêtes évaluées ensemble (matrice de scores requêtes x vocabulaire bornée)
+QUERY_BATCH = 64
+
+
+def top_k(scores, k):
+    """Indices des k meilleurs scores de chaque ligne, par score décroissant."""
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1)
+    return np.take_along_axis(idx, order, axis=1)
+
+
+def make_queries(matrix, count, noise, rng):
+    ids = rng.choice(len(matrix), size=min(count, len(matrix)), replace=False)
+    queries = np.asarray(matrix[ids], dtype=np.float32)
+    if noise:
+        norms = np.linalg.norm(queries, axis=1, keepdims=True) / np.sqrt(queries.shape[1])
+        queries = queries + noise * norms * rng.standard_normal(queries.shape).astype(np.float32)
+    return ids, queries
+
+
+def evaluate(matrix, precisions, ids, queries, top_ns):
+    reference_norms = row_norms(matrix)
+    stored = {}
+    for precision in precisions:
+        data, scale = quantize(matrix, precision)
+        stored[precision] = (data, scale, row_norms(data))
+
+    k = max(top_ns)
+    stats = {p: {"hits": {n: 0 for n in top_ns}, "err_sum": 0.0, "err_max": 0.0, "sec": 0.0} for p in precisions}
+    for start in range(0, len(queries), QUERY_BATCH):
+        batch, batch_ids = queries[start:start + QUERY_BATCH], ids[start:start + QUERY_BATCH]
+        rows = np.arange(len(batch))
+        reference = cosine_scores(batch, matrix, reference_norms)
+        reference[rows, batch_ids] = -np.inf
+        expected = top_k(reference, k)
+        reference[rows, batch_ids] = 0.0
+        for precision, (data, _, norms) in stored.items():
+            t0 = time.perf_counter()
+            scores = cosine_scores(batch, data, norms)
+            stats[precision]["sec"] += time.perf_counter() - t0
+            err = np.abs(scores - reference)
+            err[rows, batch_ids] = 0.0
+            stats[precision]["err_sum"] += float(err.sum())
+            stats[precision]["err_max"] = max(stats[precision]["err_max"], float(err.max()))
+            scores[rows, batch_ids] = -np.inf
+            found = top_k(scores, k)
+            for n in top_ns:
+                stats[precision]["hits"][n] += sum(len(set(e[:n]) & set(f[:n])) for e, f in zip(expected, found))
+
+    float32_mb = matrix.nbytes / MB
+    result = []
+    for precision, (data, scale, _) in stored.items():
+        s = stats[precision]
+        mb = (data.nbytes + (scale.nbytes if scale is not None else 0)) / MB
+        row = {
+            "precision": precision,
+            "words": len(matrix),
+            "dim": matrix.shape[1],
+            "mb": round(mb, 2),
+            "ratio": round(float32_mb / mb, 2) if mb else None,
+            "ms_per_query": round(1000 * s["sec"] / len(queries), 3),
+            "cos_err_mean": round(s["err_sum"] / (len(queries) * max(1, len(matrix) - 1)), 6),
+            "cos_err_max": round(s["err_max"], 6),
+        }
+        for n in top_ns:
+            row[f"recall@{n}"] = round(s["hits"][n] / (n * len(queries)), 4)
+        result.append(row)
+    return pd.DataFrame(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embeddings float16 / int8 : rappel des plus proches voisins vs float32")
+    parser.add_argument("--vocab", type=str, default=os.path.join(VOCAB_DATA_DIR, "medical_vocab_phon.json"))
+    parser.add_argument("--cache", type=str, default=None, help="Cache float32 (défaut : <vocab>_embeddings.npy)")
+    parser.add_argument("--precisions", nargs="+", default=list(PRECISIONS), choices=PRECISIONS)
+    parser.add_argument("--top_n", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--noise", type=float, default=0.0, help="Bruit relatif ajouté aux vecteurs requêtes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results_dir", type=str, default=EMBEDDINGS_RESULTS_DIR)
+    args = parser.parse_args()
+
+    cache = args.cache or os.path.splitext(args.vocab)[0] + "_embeddings.npy"
+    if not os.path.exists(cache):
+        logger.warning(f"Cache float32 introuvable : {cache} (créé au premier chargement d'EmbeddingsManager)")
+        return
+    matrix = np.load(cache).astype(np.float32, copy=False)
+    if len(matrix) <= max(args.top_n):
+        logger.warning(f"Vocabulaire trop petit ({len(matrix)} mots) pour top_n={max(args.top_n)}")
+        return
+
+    rng = np.random.default_rng(args.seed)
+    ids, queries = make_queries(matrix, args.queries, args.noise, rng)
+    df = evaluate(matrix, args.precisions, ids, queries, sorted(set(args.top_n)))
+    df.insert(1, "noise", args.noise)
+
+    run_id = new_run_id()
+    os.makedirs(args.results_dir, exist_ok=True)
+    out_path = os.path.join(args.results_dir, f"quantization_{run_id}.csv")
+    df.to_csv(out_path, index=False)
+    logger.info("Synthèse :\n" + df.to_string(index=False))
+    logger.info(f"Résultats enregistrés dans : {out_path}")
+    event(logger, "quantification évaluée", stage="embeddings", file=out_path, queries=len(queries),
+          recall={r["precision"]: r[f"recall@{max(args.top_n)}"] for r in df.to_dict("records")})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+engines.py
+----------
+Moteurs STT interchangeables pour le harnais de benchmark.
+
+Chaque moteur expose :
+    name       : identifiant utilisé comme colonne "model" des résultats
+    config     : paramètres qui influencent la transcription (clé du manifeste)
+    vocab_hash : hash du vocabulaire injecté (None sinon)
+    load()     : charge le modèle (mesuré séparément du décodage)
+    transcribe(wav_path) -> texte
+
+Spécifications acceptées par `build_engine` :
+    vosk:<dossier_modele>
+    vosk-grammar:<dossier_modele>,<vocab.json>
+    vosk-bilingual:<lid|parallel>[,<modele_fr>,<modele_en>]   (deux modèles résidents)
+    whisper:<taille>[,<threads>[,<fp32|int8>[,<fr|en|auto>]]]   (tiny, base, small, medium, large...)
+ou un des préréglages de ENGINE_PRESETS.
+"""
+
+import os
+from vosk import Model
+
+from src.common.config import DEFAULT_MODEL_EN, DEFAULT_MODEL_FR, EXPERIMENTAL_MODEL_FR, MODELS_DIR, VOCAB_DATA_DIR
+from src.common.run_manifest import obj_hash
+from src.nlp.vocabulary import Vocabulary
+from src.speech.bilingual import BilingualRecognizer
+from src.speech.vosk_decode import CHUNK_FRAMES, decode_wav
+from src.speech.vosk_lexicon import load_lexicon
+
+
+class VoskEngine:
+    def __init__(self, model_dir):
+        self.model_dir = model_dir
+        self.name = os.path.basename(model_dir.rstrip("/\\"))
+        self.config = {"engine": "vosk", "chunk_frames": CHUNK_FRAMES}
+        self.vocab_hash = None
+        self.model = None
+
+    def load(self):
+        self.model = Model(self.model_dir)
+
+    def transcribe(self, wav_path):
+        return decode_wav(self.model, wav_path)
+
+
+class VoskGrammarEngine(VoskEngine):
+    """Vosk avec une grammaire (liste de mots) injectée dans le recognizer.
+
+    Les mots absents du lexique du modèle (graph/words.txt) sont retirés :
+    Kaldi les ignorerait de toute façon, avec un avertissement par mot.
+    """
+
+    def __init__(self, model_dir, vocab_path):
+        super().__init__(model_dir)
+        vocab = Vocabulary.from_json(vocab_path)
+        words_txt = os.path.join(model_dir, "graph", "words.txt")
+        if os.path.exists(words_txt):
+            vocab = vocab.intersection(load_lexicon(words_txt, normalize=False))
+        self.grammar = vocab.sorted()
+        self.name = f"{self.name}+grammar-{os.path.splitext(os.path.basename(vocab_path))[0]}"
+        self.config = {"engine": "vosk-grammar", "chunk_frames": CHUNK_FRAMES}
+        self.vocab_hash = obj_hash(self.grammar)
+
+    def transcribe(self, wav_path):
+        return decode_wav(self.model, wav_path, grammar=self.grammar)
+
+
+class BilingualVoskEngine:
+    """Vosk FR + EN résidents, langue choisie par fichier (src/speech/bilingual.py)."""
+
+    def __init__(self, strategy="lid", model_fr=DEFAULT_MODEL_FR, model_en=DEFAULT_MODEL_EN):
+        self.router = BilingualRecognizer({"fr": model_fr, "en": model_en}, strategy=strategy)
+        self.name = f"vosk-bilingual-{strategy}"
+        self.config = {"engine": "vosk-bilingual", "strategy": strategy, "chunk_frames": CHUNK_FRAMES,
+                       "models": [os.path.basename(model_fr.rstrip("/\\")), os.path.basename(model_en.rstrip("/\\"))]}
+        self.vocab_hash = None
+        self.last_language = None
+
+    def load(self):
+        self.router.load()
+
+    def transcribe(self, wav_path):
+        text, self.last_language, _ = self.router.transcribe(wav_path)
+        return text
+
+
+class WhisperEngine:
+    def __init__(self, size, language="fr", threads=None, precision="fp32"):
+        self.size = size
+        # None : langue détectée par Whisper
+        self.language = language
+        self.threads = threads
+        self.precision = precision
+        self.name = f"whisper-{size}" + ("-int8" if precision == "int8" else "") + ("-auto" if language is None else "")
+        self.config = {"engine": "whisper", "language": language, "fp16": False, "precision": precision}
+        self.vocab_hash = None
+        self.model = None
+
+    def load(self):
+        # Import différé : torch/whisper ne sont chargés que si un moteur Whisper est demandé
+        from src.transcription.whisper_batch import load_whisper_model
+        os.environ["TORCH_HOME"] = MODELS_DIR
+        self.model, _ = load_whisper_model(self.size, self.precision, self.threads)
+
+    def transcribe(self, wav_path):
+        result = self.model.transcribe(wav_path, language=self.language, fp16=False)
+        return result["text"].strip()
+
+
+ENGINE_PRESETS = {
+    "vosk-small-fr": f"vosk:{DEFAULT_MODEL_FR}",
+    "vosk-small-fr-med": f"vosk:{EXPERIMENTAL_MODEL_FR}",
+    "vosk-small-fr-med-grammar": f"vosk-grammar:{EXPERIMENTAL_MODEL_FR},{os.path.join(VOCAB_DATA_DIR, 'words_clean.json')}",
+    "vosk-bilingual-lid": "vosk-bilingual:lid",
+    "vosk-bilingual-parallel": "vosk-bilingual:parallel",
+    "whisper-small": "whisper:small",
+    "whisper-medium": "whisper:medium",
+    "whisper-large": "whisper:large",
+}
+
+
+def build_engine(spec):
+    """Construit un moteur depuis un préréglage ou une spécification 'type:args'."""
+    spec = ENGINE_PRESETS.get(spec, spec)
+    kind, _, args = spec.partition(":")
+    if kind == "vosk":
+        return VoskEngine(args)
+    if kind == "vosk-grammar":
+        model_dir, _, vocab_path = args.partition(",")
+        return VoskGrammarEngine(model_dir, vocab_path)
+    if kind == "vosk-bilingual":
+        strategy, model_fr, model_en = (args.split(",") + ["", ""])[:3]
+        return BilingualVoskEngine(strategy or "lid", model_fr or DEFAULT_MODEL_FR, model_en or DEFAULT_MODEL_EN)
+    if kind == "whisper":
+        size, threads, precision, language = (args.split(",") + ["", "", ""])[:4]
+        return WhisperEngine(size or "small", language=None if language == "auto" else (language or "fr"),
+                             threads=int(threads) if threads else None, precision=precision or "fp32")
+    raise ValueError(f"Moteur inconnu : {spec}")
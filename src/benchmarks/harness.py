@@ -0,0 +1,180 @@
+"""
+harness.py
+----------
+Harnais de benchmark unifié : une matrice moteurs x jeux de données,
+exécutée en parallèle (un processus par cellule), avec un schéma de
+résultats unique (latence, RTF, mémoire, WER...) directement comparable.
+
+Exemples :
+    python -m src.benchmarks.harness --engines vosk-small-fr whisper-small --datasets medecin_v2
+    python -m src.benchmarks.harness --engines vosk:models/vosk-model-fr-0.22 --datasets commonvoice --workers 2
+
+Chaque cellule écrit results/harness/<dataset>/<moteur>.csv (+ manifeste, donc
+reprise après crash) et alimente le store Parquet. Une table de synthèse
+results/harness/summary_<run_id>.csv est produite à la fin.
+"""
+
+import os
+import time
+import argparse
+import psutil
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.common.config import HARNESS_RESULTS_DIR, BENCHMARK_DATASETS
+from src.common import profiling
+from src.common.run_manifest import BatchedResultWriter, file_hash, make_run_key, new_run_id
+from src.common.results_store import load_legacy_csv
+from src.benchmarks.engines import ENGINE_PRESETS, build_engine
+from src.benchmarks.datasets import load_dataset
+from src.benchmarks.metrics import METRIC_COLUMNS, compute_metrics
+from src.speech.vosk_decode import convert_to_wav, is_vosk_ready, wav_duration
+from src.common.event_log import event, get_logger, init_worker
+
+logger = get_logger("STT_Harness", "harness")
+
+CSV_HEADER = [
+    "audio_file", "model", "dataset", "latency_sec", "duration_sec", "rtf",
+    "memory_mb", "model_load_mb", "tokens",
+    *METRIC_COLUMNS,
+    "reference_text", "reference_text_lemma", "transcript", "transcript_lemma",
+]
+
+
+def measure_memory():
+    return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+
+
+def cell_results_path(results_dir, dataset, engine_name):
+    return os.path.join(results_dir, dataset, f"{engine_name}.csv")
+
+
+# ---------------------------------------------------------------------
+# Exécution d'une cellule (moteur x jeu de données) dans un processus
+# ---------------------------------------------------------------------
+def run_cell(engine_spec, dataset, run_id, results_dir):
+    engine = build_engine(engine_spec)
+    results_path = cell_results_path(results_dir, dataset, engine.name)
+    writer = BatchedResultWriter(results_path, CSV_HEADER, run_id=run_id)
+
+    pending = []
+    for audio_file, audio_path, ref_text in load_dataset(dataset):
+        key = make_run_key(engine.name, file_hash(audio_path), engine.vocab_hash, engine.config)
+        if not writer.is_done(key):
+            pending.append((audio_file, audio_path, ref_text, key))
+
+    logger.info(f"[{engine.name} x {dataset}] {len(pending)} fichiers à calculer")
+    if not pending:
+        return results_path
+
+    mem_before_load = measure_memory()
+    with profiling.stage("engine.load"):
+        engine.load()
+    model_load_mb = measure_memory() - mem_before_load
+
+    with writer:
+        for audio_file, audio_path, ref_text, key in pending:
+            # Conversion hors chrono : seule la transcription est mesurée
+            wav_path = audio_path if is_vosk_ready(audio_path) else convert_to_wav(audio_path)
+            try:
+                duration = wav_duration(wav_path)
+                mem_before = measure_memory()
+                start = time.perf_counter()
+                with profiling.stage("engine.transcribe"):
+                    transcript = engine.transcribe(wav_path)
+                latency = time.perf_counter() - start
+                mem_after = measure_memory()
+            finally:
+                if wav_path != audio_path and os.path.exists(wav_path):
+                    os.remove(wav_path)
+
+            row = {
+                "audio_file": audio_file,
+                "model": engine.name,
+                "dataset": dataset,
+                "latency_sec": round(latency, 3),
+                "duration_sec": round(duration, 3),
+                "rtf": round(latency / duration, 4) if duration else None,
+                "memory_mb": round(mem_after - mem_before, 2),
+                "model_load_mb": round(model_load_mb, 2),
+                "tokens": len(transcript.split()),
+                "reference_text": ref_text,
+                "transcript": transcript,
+            }
+            row.update(compute_metrics(ref_text, transcript))
+            writer.add(key, row)
+            event(logger, "fichier traité", stage="transcribe", file=audio_file, duration=row["latency_sec"],
+                  model=engine.name, dataset=dataset, rtf=row["rtf"], wer=row["wer"])
+
+    # Les processus du pool ne passent pas par atexit : profil écrit par cellule
+    profiling.report(tag=f"{dataset}_{engine.name}")
+    return results_path
+
+
+# ---------------------------------------------------------------------
+# Synthèse
+# ---------------------------------------------------------------------
+def summarize(result_paths):
+    """Une ligne par (jeu de données, moteur) avec latence/RTF/mémoire/WER."""
+    frames = [load_legacy_csv(p) for p in result_paths if os.path.exists(p)]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    grouped = df.groupby(["dataset", "model"])
+    summary = pd.DataFrame({
+        "files": grouped["audio_file"].count(),
+        "audio_sec": grouped["duration_sec"].sum(),
+        "model_load_mb": grouped["model_load_mb"].max(),
+        "latency_mean": grouped["latency_sec"].mean(),
+        "latency_p50": grouped["latency_sec"].quantile(0.5),
+        "latency_p90": grouped["latency_sec"].quantile(0.9),
+        "rtf_mean": grouped["rtf"].mean(),
+        "rtf_p90": grouped["rtf"].quantile(0.9),
+        "memory_mb_mean": grouped["memory_mb"].mean(),
+        "wer_mean": grouped["wer"].mean(),
+        "accuracy_mean": grouped["accuracy"].mean(),
+    })
+    return summary.round(4).reset_index()
+
+
+# ---------------------------------------------------------------------
+# Programme principal
+# ---------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Harnais de benchmark STT (moteurs x jeux de données)")
+    parser.add_argument("--engines", nargs="+", default=["vosk-small-fr"],
+                        help=f"Préréglages ({', '.join(ENGINE_PRESETS)}) ou vosk:<dir>, "
+                             f"vosk-grammar:<dir>,<vocab.json>, whisper:<taille>[,<threads>[,<fp32|int8>]]")
+    parser.add_argument("--datasets", nargs="+", default=["medecin_v2"], choices=list(BENCHMARK_DATASETS))
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Cellules exécutées en parallèle (>1 : les latences subissent la concurrence CPU)")
+    parser.add_argument("--results_dir", type=str, default=HARNESS_RESULTS_DIR)
+    args = parser.parse_args()
+
+    run_id = new_run_id()
+    cells = [(e, d) for e in args.engines for d in args.datasets]
+    logger.info(f"Run {run_id} : {len(cells)} cellules, {args.workers} worker(s)")
+
+    result_paths = []
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker) as pool:
+        futures = {pool.submit(run_cell, e, d, run_id, args.results_dir): (e, d) for e, d in cells}
+        for future in as_completed(futures):
+            engine_spec, dataset = futures[future]
+            try:
+                result_paths.append(future.result())
+                logger.info(f"Cellule terminée : {engine_spec} x {dataset}")
+            except Exception as e:
+                logger.error(f"Cellule en échec {engine_spec} x {dataset} : {e}")
+
+    summary = summarize(result_paths)
+    if summary.empty:
+        logger.warning("Aucun résultat à résumer")
+        return
+    summary_path = os.path.join(args.results_dir, f"summary_{run_id}.csv")
+    summary.to_csv(summary_path, index=False)
+    logger.info("Synthèse :\n" + summary.to_string(index=False))
+    logger.info(f"Synthèse enregistrée dans : {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
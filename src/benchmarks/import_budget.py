@@ -0,0 +1,92 @@
+"""
+import_budget.py
+----------------
+Contrôle du coût d'import des modules src (python -X importtime).
+
+Chaque module est importé dans un interpréteur neuf ; le temps cumulé du module
+(ligne "import time" qui le concerne) est comparé à son budget. Un import qui
+échoue (lecture de sys.argv, fichier de données manquant, chargement de modèle...)
+est signalé comme effet de bord.
+
+Exemples :
+    python -m src.benchmarks.import_budget
+    python -m src.benchmarks.import_budget --modules src.common.config --repeat 5
+
+Code de sortie 1 si un budget est dépassé ou si un import échoue.
+"""
+
+import sys
+import argparse
+import subprocess
+
+from src.common.config import BASE_DIR
+
+# Budgets en millisecondes (temps cumulé, dépendances tierces comprises)
+BUDGETS_MS = {
+    "src.common.config": 20,
+    "src.common.profiling": 50,
+    "src.common.event_log": 50,
+    "src.common.run_manifest": 100,
+    "src.speech.vosk_decode": 500,
+    "src.benchmarks.metrics": 300,
+    "src.benchmarks.stt_benchmark": 2500,
+    "src.benchmarks.stt_benchmark_medecin": 2500,
+    "src.benchmarks.stt_benchmark_vocab_injection": 2500,
+    "src.benchmarks.harness": 2500,
+    "src.nlp.g2p_fr": 200,
+    "src.nlp.embeddings_manager": 500,
+    "src.nlp.medical_postprocessor": 2000,
+    "src.inference.run_stt_vosk": 2500,
+    "src.inference.run_stt_csv": 500,
+}
+
+
+def measure_import(module, python=sys.executable):
+    """Temps cumulé d'import (ms) dans un interpréteur neuf. Renvoie (ms, erreur)."""
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        return None, proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"code {proc.returncode}"
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1000, None
+    return None, "module absent de la trace -X importtime"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budget de temps d'import des modules src")
+    parser.add_argument("--modules", nargs="+", default=list(BUDGETS_MS))
+    parser.add_argument("--repeat", type=int, default=3, help="Mesures par module (on garde la meilleure)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Facteur appliqué aux budgets (machine lente)")
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'module':<48} {'import (ms)':>12} {'budget (ms)':>12}  statut")
+    for module in args.modules:
+        budget = BUDGETS_MS.get(module, 1000) * args.scale
+        timings, error = [], None
+        for _ in range(max(args.repeat, 1)):
+            ms, error = measure_import(module)
+            if error:
+                break
+            timings.append(ms)
+        if error:
+            failures += 1
+            print(f"{module:<48} {'-':>12} {budget:>12.0f}  ÉCHEC : {error}")
+            continue
+        best = min(timings)
+        ok = best <= budget
+        failures += not ok
+        print(f"{module:<48} {best:>12.1f} {budget:>12.0f}  {'ok' if ok else 'DÉPASSÉ'}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
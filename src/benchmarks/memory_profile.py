@@ -0,0 +1,230 @@
+"""
+memory_profile.py
+-----------------
+Mode profilage mémoire : empreinte de chaque composant du pipeline Vosk +
+post-traitement, mesurée étape par étape dans un même processus
+(src/common/memory.py), et prédiction pour la tablette cible.
+
+Composants :
+    model_load.<langue>    chargement de chaque modèle Vosk (FR, EN avec --model_en)
+    recognizer             un KaldiRecognizer qui décode l'extrait audio
+    grammar.<n>            recognizer avec une grammaire de n mots (--grammar_sizes) ;
+                           surcoût = delta - delta du recognizer sans grammaire
+    postprocessor          MedicalPostProcessorPhonetic (CamemBERT, index phonétique) ;
+                           taille des poids à part
+    postprocess            correction phonétique de la transcription (tampons torch ;
+                           la matrice d'embeddings n'est pas chargée)
+    embeddings.<précision> scoring N-best de la transcription (chaque mot contre ses
+                           voisins phonétiques) : chargement de la matrice dans la
+                           précision (--compare_precisions) et pages mmap lues
+
+Prédiction : runtime (interpréteur + imports) + modèles + --recognizers x
+(recognizer [+ grammaire avec --grammar]) + post-traitement (+ matrice avec
+--nbest) + plus grand transitoire, comparée à --budget_mb. Mesures faites sur la machine courante :
+ordre de grandeur pour la tablette (binaires ARM, allocateur Android).
+
+Sorties : results/memory/memory_<run_id>.json (composants, allocations Python
+principales, prédiction) + components_<run_id>.csv
+
+Exemple :
+    python -m src.benchmarks.memory_profile --model_en models/vosk-model-small-en-us-0.15 --recognizers 2 --grammar
+"""
+
+import os
+import json
+import wave
+import argparse
+import pandas as pd
+from vosk import KaldiRecognizer, Model
+
+from src.common.config import (
+    BENCHMARK_DATASETS, DEFAULT_MODEL_FR, MEMORY_BUDGET_MB, MEMORY_RESULTS_DIR, SAMPLE_RATE, VOCAB_DATA_DIR
+)
+from src.common.memory import MB, MemoryProfiler, predict_fit
+from src.common.run_manifest import new_run_id
+from src.common.event_log import event, get_logger
+from src.benchmarks.datasets import load_dataset
+from src.benchmarks.engines import VoskGrammarEngine
+from src.nlp.medical_postprocessor import PRECISIONS, SCORERS, MedicalPostProcessorPhonetic
+from src.speech.vosk_decode import CHUNK_FRAMES, convert_to_wav, is_vosk_ready
+
+logger = get_logger("Memory_Profile", "memory_profile")
+
+
+def read_audio(audio_path, dataset):
+    """PCM 16 bits de l'extrait décodé (premier fichier du jeu de données par défaut)."""
+    if audio_path is None:
+        files = load_dataset(dataset)
+        if not files:
+            logger.warning(f"Aucun fichier dans {dataset} : 10 s de silence décodées")
+            return b"\0\0" * SAMPLE_RATE * 10, SAMPLE_RATE, None
+        audio_path = files[0][1]
+    wav_path = audio_path if is_vosk_ready(audio_path) else convert_to_wav(audio_path)
+    try:
+        with wave.open(wav_path, "rb") as wf:
+            return wf.readframes(wf.getnframes()), wf.getframerate(), audio_path
+    finally:
+        if wav_path != audio_path and os.path.exists(wav_path):
+            os.remove(wav_path)
+
+
+def feed(rec, data, chunk_frames=CHUNK_FRAMES):
+    """Décode tout l'extrait ; le recognizer reste utilisable (pas de FinalResult)."""
+    texts = []
+    step = 2 * chunk_frames
+    for i in range(0, len(data), step):
+        if rec.AcceptWaveform(data[i:i + step]):
+            texts.append(json.loads(rec.Result()).get("text", ""))
+    texts.append(json.loads(rec.PartialResult()).get("partial", ""))
+    return " ".join(t for t in texts if t)
+
+
+def postprocessor_sizes(processor):
+    """Taille théorique des poids CamemBERT (Mo)."""
+    manager = processor.emb_manager
+    if manager is None:
+        return {}
+    return {"camembert_params_mb": round(sum(p.numel() * p.element_size() for p in manager.model.parameters()) / MB, 2)}
+
+
+def embeddings_sizes(manager):
+    """Taille théorique de la matrice chargée (Mo, échelles int8 comprises)."""
+    scale_bytes = manager.scale.nbytes if manager.scale is not None else 0
+    return {
+        "embeddings_mb": round((manager.embeddings.nbytes + scale_bytes) / MB, 2),
+        "embeddings_shape": list(manager.embeddings.shape),
+    }
+
+
+def score_nbest(processor, text):
+    """Chemin N-best : chaque mot noté contre ses voisins phonétiques (lignes de la matrice lues)."""
+    words = text.split()
+    for i, word in enumerate(words):
+        neighbours = processor.index.candidates(processor._phonetic_key(word), processor.top_n)
+        candidates = [c for c in neighbours if c != word]
+        if candidates:
+            processor._nbest_scores(words, i, [word] + candidates)
+
+
+def prediction_parts(profiler, recognizers, grammar_size, embeddings=None):
+    entries = profiler.components
+    parts = {
+        "runtime": profiler.baseline_mb,
+        "models": sum(e["rss_delta_mb"] for e in entries if e["component"].startswith("model_load.")),
+        "recognizers": recognizers * profiler.delta("recognizer"),
+    }
+    if grammar_size:
+        parts["grammar"] = recognizers * max(0.0, profiler.delta(f"grammar.{grammar_size}") - profiler.delta("recognizer"))
+    parts["postprocessor"] = profiler.delta("postprocessor") + profiler.delta("postprocess")
+    if embeddings:
+        parts["embeddings"] = profiler.delta(f"embeddings.{embeddings}")
+    # Les transitoires ne se cumulent pas : seul le plus grand compte
+    parts["transient"] = max((e["transient_mb"] for e in entries), default=0.0)
+    return parts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Empreinte mémoire par composant et prédiction sur tablette")
+    parser.add_argument("--model", type=str, default=DEFAULT_MODEL_FR)
+    parser.add_argument("--model_en", type=str, default=None, help="Second modèle résident (mode bilingue)")
+    parser.add_argument("--audio", type=str, default=None, help="Extrait décodé (défaut : premier fichier de --dataset)")
+    parser.add_argument("--dataset", type=str, default="medecin_v2", choices=list(BENCHMARK_DATASETS))
+    parser.add_argument("--grammar_vocab", type=str, default=os.path.join(VOCAB_DATA_DIR, "words_clean.json"))
+    parser.add_argument("--grammar_sizes", type=int, nargs="*", default=[100, 1000, 10000],
+                        help="Tailles de grammaire mesurées (mots)")
+    parser.add_argument("--grammar", action="store_true",
+                        help="Configuration prédite avec grammaire (plus grande taille mesurée)")
+    parser.add_argument("--vocab", type=str, default=os.path.join(VOCAB_DATA_DIR, "medical_vocab_phon.json"))
+    parser.add_argument("--scorer", type=str, default="camembert", choices=SCORERS + ("none",))
+    parser.add_argument("--embeddings_precision", type=str, default="float32", choices=PRECISIONS)
+    parser.add_argument("--compare_precisions", nargs="*", default=list(PRECISIONS), choices=PRECISIONS,
+                        help="Précisions de la matrice mesurées sur le scoring N-best")
+    parser.add_argument("--nbest", action="store_true",
+                        help="Configuration prédite avec scoring N-best (matrice d'embeddings chargée)")
+    parser.add_argument("--recognizers", type=int, default=1, help="Recognizers simultanés de la configuration prédite")
+    parser.add_argument("--budget_mb", type=float, default=MEMORY_BUDGET_MB)
+    parser.add_argument("--no_trace", action="store_true", help="RSS seulement, sans tracemalloc")
+    parser.add_argument("--results_dir", type=str, default=MEMORY_RESULTS_DIR)
+    args = parser.parse_args()
+
+    data, rate, audio_path = read_audio(args.audio, args.dataset)
+    grammar = VoskGrammarEngine(args.model, args.grammar_vocab).grammar \
+        if args.grammar_sizes and os.path.exists(args.grammar_vocab) else []
+    profiler = MemoryProfiler(trace=not args.no_trace)
+
+    models = {}
+    for language, model_dir in (("fr", args.model), ("en", args.model_en)):
+        if model_dir:
+            with profiler.component(f"model_load.{language}", model=os.path.basename(model_dir.rstrip("/\\"))):
+                models[language] = Model(model_dir)
+
+    # Les recognizers restent vivants jusqu'à la fin : la mémoire libérée serait
+    # sinon réutilisée par l'étape suivante et son delta sous-estimé
+    recognizers = []
+    with profiler.component("recognizer", grammar_words=0):
+        rec = KaldiRecognizer(models["fr"], rate)
+        text = feed(rec, data)
+        recognizers.append(rec)
+
+    grammar_sizes = sorted({min(n, len(grammar)) for n in args.grammar_sizes if n > 0}) if grammar else []
+    for size in grammar_sizes:
+        with profiler.component(f"grammar.{size}", grammar_words=size) as entry:
+            rec = KaldiRecognizer(models["fr"], rate, json.dumps(grammar[:size], ensure_ascii=False))
+            feed(rec, data)
+            recognizers.append(rec)
+        entry["grammar_overhead_mb"] = round(entry["rss_delta_mb"] - profiler.delta("recognizer"), 2)
+
+    if args.scorer != "none":
+        with profiler.component("postprocessor", scorer=args.scorer, precision=args.embeddings_precision) as entry:
+            processor = MedicalPostProcessorPhonetic(vocab_json_path=args.vocab, threshold=0.7, top_n=5,
+                                                     scorer=args.scorer, embeddings_precision=args.embeddings_precision)
+        entry.update(postprocessor_sizes(processor))
+        with profiler.component("postprocess", words=len(text.split())):
+            processor.process_sentence(text)
+
+    # Matrice d'embeddings : lue seulement par le scoring N-best CamemBERT
+    precisions = list(dict.fromkeys([args.embeddings_precision] + args.compare_precisions)) \
+        if args.scorer == "camembert" else []
+    for precision in precisions:
+        processor.emb_manager.release(precision)
+        with profiler.component(f"embeddings.{precision}", precision=precision) as entry:
+            score_nbest(processor, text)
+        entry.update(embeddings_sizes(processor.emb_manager))
+    if precisions:
+        processor.emb_manager.release(args.embeddings_precision)
+
+    parts = prediction_parts(profiler, args.recognizers, grammar_sizes[-1] if args.grammar and grammar_sizes else 0,
+                             args.embeddings_precision if args.nbest and precisions else None)
+    prediction = predict_fit(parts, budget_mb=args.budget_mb)
+    prediction["config"] = {"languages": list(models), "recognizers": args.recognizers, "scorer": args.scorer,
+                            "embeddings_precision": args.embeddings_precision, "nbest": args.nbest,
+                            "grammar_words": grammar_sizes[-1] if args.grammar and grammar_sizes else 0}
+
+    run_id = new_run_id()
+    os.makedirs(args.results_dir, exist_ok=True)
+    df = pd.DataFrame(profiler.components)
+    df.to_csv(os.path.join(args.results_dir, f"components_{run_id}.csv"), index=False)
+    path = profiler.save(os.path.join(args.results_dir, f"memory_{run_id}.json"), audio=audio_path,
+                         prediction=prediction)
+
+    columns = [c for c in ("component", "rss_delta_mb", "rss_peak_mb", "transient_mb", "python_mb", "python_peak_mb")
+               if c in df]
+    logger.info("Empreinte par composant (Mo) :\n" + df[columns].to_string(index=False))
+    if precisions:
+        base = profiler.delta("postprocessor") + profiler.delta("postprocess")
+        logger.info("Post-traitement par précision de la matrice (RSS, Mo) :\n" + "\n".join(
+            f"  {p:>8} : {base:8.1f} (phonétique) {base + profiler.delta(f'embeddings.{p}'):8.1f} (N-best)"
+            f" - matrice {profiler.entry(f'embeddings.{p}')['embeddings_mb']:.1f}" for p in precisions))
+    if "postprocessor" in profiler.allocations:
+        logger.info("Allocations Python du post-traitement :\n" + "\n".join(
+            f"  {a['size_mb']:>9.3f} Mo  {a['line']}" for a in profiler.allocations["postprocessor"]))
+    verdict = "tient dans" if prediction["fits"] else "DÉPASSE"
+    logger.info(f"Prédiction : {prediction['predicted_mb']:.0f} Mo ({prediction['budget_pct']} %), "
+                f"{verdict} le budget de {args.budget_mb:.0f} Mo (marge {prediction['headroom_mb']:.0f} Mo) "
+                f"- {prediction['parts_mb']}")
+    event(logger, "profil mémoire", stage="memory", file=path, peak_rss_mb=profiler.report()["peak_rss_mb"],
+          predicted_mb=prediction["predicted_mb"], fits=prediction["fits"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+metrics.py
+----------
+Métriques de qualité de transcription communes aux benchmarks
+(calculées sur les textes lemmatisés, comme dans stt_benchmark*.py).
+"""
+
+import logging
+from jiwer import wer
+import Levenshtein
+
+from src.common.profiling import profiled, stage
+
+logger = logging.getLogger(__name__)
+
+METRIC_COLUMNS = [
+    "wer", "wer_token", "levenshtein", "levenshtein_pct", "accuracy",
+    "bleu3", "meteor", "chrf", "rougeL",
+]
+
+NLTK_PACKAGES = {"wordnet": "corpora/wordnet", "omw-1.4": "corpora/omw-1.4"}
+
+_nlp = None
+_scorer = None
+_nltk_ready = False
+
+
+def get_nlp():
+    """Modèle spaCy de lemmatisation, chargé au premier appel."""
+    global _nlp
+    if _nlp is None:
+        import spacy
+        with stage("spacy.load"):
+            try:
+                _nlp = spacy.load("fr_core_news_md")
+            except OSError:
+                _nlp = spacy.load("fr_core_news_sm")
+    return _nlp
+
+
+def ensure_nltk_data():
+    """Télécharge les ressources NLTK de METEOR si elles manquent (une fois par processus)."""
+    global _nltk_ready
+    if _nltk_ready:
+        return
+    import nltk
+    for package, resource in NLTK_PACKAGES.items():
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            nltk.download(package, quiet=True)
+    _nltk_ready = True
+
+
+@profiled("spacy.lemmatize")
+def lemmatize_text(text):
+    """Renvoie une version lemmatisée (canonique) du texte en français."""
+    doc = get_nlp()(text.lower())
+    return " ".join(t.lemma_ for t in doc if not t.is_punct and not t.is_space)
+
+
+def _rouge():
+    global _scorer
+    if _scorer is None:
+        from rouge_score import rouge_scorer
+        _scorer = rouge_scorer.RougeScorer(["rougeL"], use_stemmer=True)
+    return _scorer
+
+
+@profiled("metrics.compute")
+def compute_metrics(ref_text, transcript):
+    """
+    Calcule toutes les métriques pour une paire (référence, transcription).
+    Renvoie un dict ; une métrique en échec vaut None, toutes valent None sans
+    référence. Une transcription vide (décodage échoué ou silencieux) est notée
+    comme entièrement fausse (WER 1, accuracy 0...) et compte dans les moyennes.
+    """
+    result = {col: None for col in METRIC_COLUMNS}
+    result["reference_text_lemma"] = None
+    result["transcript_lemma"] = None
+    if not ref_text:
+        return result
+
+    ensure_nltk_data()
+    ref_lemma = lemmatize_text(ref_text)
+    hyp_lemma = lemmatize_text(transcript) if transcript else ""
+    ref_words = ref_lemma.split()
+    hyp_words = hyp_lemma.split()
+    result["reference_text_lemma"] = ref_lemma
+    result["transcript_lemma"] = hyp_lemma
+    if not ref_words:
+        return result
+    if not hyp_words:
+        result.update({
+            "wer": 1.0, "wer_token": 0.0, "accuracy": 0.0,
+            "levenshtein": float(len(ref_lemma)), "levenshtein_pct": 1.0,
+            "bleu3": 0.0, "meteor": 0.0, "chrf": 0.0, "rougeL": 0.0,
+        })
+        return result
+
+    # Imports différés : NLTK et sacrebleu pèsent plusieurs centaines de ms à l'import
+    from nltk.translate.bleu_score import sentence_bleu
+    from nltk.translate.meteor_score import meteor_score
+    import sacrebleu
+
+    computations = {
+        "wer": lambda: wer(ref_lemma, hyp_lemma),
+        "levenshtein": lambda: Levenshtein.distance(ref_lemma, hyp_lemma),
+        "levenshtein_pct": lambda: Levenshtein.distance(ref_lemma, hyp_lemma) / max(len(ref_lemma), 1),
+        "wer_token": lambda: 1 - sum(r != h for r, h in zip(ref_words, hyp_words)) / max(len(ref_words), 1),
+        "accuracy": lambda: sum(r == h for r, h in zip(ref_words, hyp_words)) / max(len(ref_words), 1),
+        "bleu3": lambda: sentence_bleu([ref_words], hyp_words, weights=(1/3, 1/3, 1/3, 0)),
+        "meteor": lambda: meteor_score([ref_words], hyp_words),
+        "chrf": lambda: sacrebleu.corpus_chrf([hyp_lemma], [[ref_lemma]]).score,
+        "rougeL": lambda: _rouge().score(ref_lemma, hyp_lemma)["rougeL"].fmeasure,
+    }
+    for name, fn in computations.items():
+        try:
+            with stage(f"metric.{name}"):
+                result[name] = round(float(fn()), 3)
+        except Exception as e:
+            logger.warning(f"Métrique {name} en échec : {e}")
+    return result
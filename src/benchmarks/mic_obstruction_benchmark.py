@@ -0,0 +1,164 @@
+"""
+mic_obstruction_benchmark.py
+----------------------------
+Banc d'essai du détecteur de micro obstrué sur obstructions synthétiques :
+chaque segment de wav_data_v2 est rejoué tel quel ("clean") puis filtré
+passe-bas (Butterworth, coupures --cutoffs), comme un micro couvert par une coque.
+
+Par fichier et condition : alerte levée ou non, instant de la première alerte,
+caractéristiques finales (part haute bande, pente, RSB) et coût du détecteur
+(µs par bloc, facteur temps réel). Avec --model, le segment propre est aussi
+décodé par Vosk sans puis avec le détecteur branché sur la boucle : le surcoût
+relatif du décodage donne la part du détecteur (différence de deux mesures,
+bruitée sur un fichier court, à lire en moyenne).
+
+Sorties dans results/mic_obstruction/ :
+    mic_<run_id>.csv        une ligne par fichier et condition
+    summary_<run_id>.csv    taux de détection par condition, coût moyen
+    sweep_<run_id>.csv      fausses alertes / détections selon le seuil haute bande
+
+Exemple :
+    python -m src.benchmarks.mic_obstruction_benchmark --cutoffs 1000 2000 3000 --model models/vosk-model-small-fr-0.22
+"""
+
+import os
+import time
+import wave
+import argparse
+import numpy as np
+import pandas as pd
+
+from src.common.config import MIC_RESULTS_DIR, WAV_DATA_DIR_v2
+from src.common.run_manifest import new_run_id
+from src.common.event_log import event, get_logger
+from src.data.synthetic_generation import lowpass
+from src.micro_detection.mic_obstruction import MicObstructionDetector, analyze_pcm
+from src.speech.vosk_decode import CHUNK_FRAMES, decode_wav
+
+logger = get_logger("Mic_Obstruction_Benchmark", "mic_obstruction_benchmark")
+
+
+def read_pcm(wav_path):
+    with wave.open(wav_path, "rb") as wf:
+        return wf.readframes(wf.getnframes()), wf.getframerate()
+
+
+def lowpass_pcm(data, rate, cutoff):
+    """Obstruction synthétique : PCM 16 bits filtré passe-bas."""
+    return lowpass(np.frombuffer(data, dtype=np.int16), cutoff, rate).tobytes()
+
+
+def run_detector(data, rate, audio_file, condition, chunk_frames):
+    # Pas d'événement par alerte ici : le benchmark ne journalise que ses lignes
+    detector = MicObstructionDetector(rate=rate, file=audio_file, log=None)
+    start = time.perf_counter()
+    status = analyze_pcm(data, detector, chunk_frames)
+    elapsed = time.perf_counter() - start
+    duration = len(data) / 2 / rate
+    chunks = max(1, -(-len(data) // (2 * chunk_frames)))
+    return {
+        "audio_file": audio_file,
+        "condition": condition,
+        "duration_sec": round(duration, 3),
+        **status,
+        "detector_ms": round(1000 * elapsed, 3),
+        "us_per_chunk": round(1e6 * elapsed / chunks, 2),
+        "rtf": round(elapsed / duration, 6) if duration else None,
+    }
+
+
+def decode_share(model, wav_path, chunk_frames):
+    """
+    Temps de décodage Vosk sans puis avec le détecteur branché sur la boucle
+    (decode_wav(..., monitor=detector)) : renvoie (decode_sec, monitored_sec).
+    """
+    start = time.perf_counter()
+    decode_wav(model, wav_path, chunk_frames=chunk_frames)
+    decode_sec = time.perf_counter() - start
+    with wave.open(wav_path, "rb") as wf:
+        detector = MicObstructionDetector(rate=wf.getframerate(), log=None)
+    start = time.perf_counter()
+    decode_wav(model, wav_path, chunk_frames=chunk_frames, monitor=detector)
+    monitored_sec = time.perf_counter() - start
+    return decode_sec, monitored_sec
+
+
+def threshold_sweep(df, thresholds):
+    """Fausses alertes (clean) et détections (filtré) si seule la part haute bande décidait."""
+    clean = df[df["condition"] == "clean"]["hf_ratio_db"].dropna()
+    rows = []
+    for threshold in thresholds:
+        row = {"hf_threshold_db": threshold, "false_alarm_rate": float((clean < threshold).mean()) if len(clean) else None}
+        for condition, group in df[df["condition"] != "clean"].groupby("condition", sort=False):
+            row[f"detect_{condition}"] = float((group["hf_ratio_db"].dropna() < threshold).mean())
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def summarize(df):
+    grouped = df.groupby("condition", sort=False)
+    return pd.DataFrame({
+        "files": grouped["audio_file"].count(),
+        "alert_rate": grouped["obstructed"].mean(),
+        "first_alert_sec_mean": grouped["first_alert_sec"].mean(),
+        "hf_ratio_db_mean": grouped["hf_ratio_db"].mean(),
+        "tilt_db_oct_mean": grouped["tilt_db_oct"].mean(),
+        "snr_db_mean": grouped["snr_db"].mean(),
+        "us_per_chunk_mean": grouped["us_per_chunk"].mean(),
+        "rtf_mean": grouped["rtf"].mean(),
+    }).round(4).reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Détecteur de micro obstrué : obstructions synthétiques (passe-bas)")
+    parser.add_argument("--audio_dir", type=str, default=WAV_DATA_DIR_v2)
+    parser.add_argument("--cutoffs", type=int, nargs="+", default=[1000, 2000, 3000], help="Coupures passe-bas (Hz)")
+    parser.add_argument("--chunk_frames", type=int, default=CHUNK_FRAMES)
+    parser.add_argument("--model", type=str, default=None, help="Modèle Vosk : mesure la part du détecteur dans le décodage")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--results_dir", type=str, default=MIC_RESULTS_DIR)
+    args = parser.parse_args()
+
+    wav_files = sorted(f for f in os.listdir(args.audio_dir) if f.lower().endswith(".wav"))[:args.limit] \
+        if os.path.isdir(args.audio_dir) else []
+    if not wav_files:
+        logger.warning(f"Aucun WAV dans {args.audio_dir}")
+        return
+
+    model = None
+    if args.model:
+        from vosk import Model
+        model = Model(args.model)
+
+    rows = []
+    for audio_file in wav_files:
+        wav_path = os.path.join(args.audio_dir, audio_file)
+        data, rate = read_pcm(wav_path)
+        rows.append(run_detector(data, rate, audio_file, "clean", args.chunk_frames))
+        for cutoff in args.cutoffs:
+            rows.append(run_detector(lowpass_pcm(data, rate, cutoff), rate, audio_file, f"lowpass{cutoff}", args.chunk_frames))
+        if model is not None:
+            decode_sec, monitored_sec = decode_share(model, wav_path, args.chunk_frames)
+            share = round(100 * (monitored_sec - decode_sec) / decode_sec, 4) if decode_sec else None
+            rows[-1 - len(args.cutoffs)]["decode_share_pct"] = share
+        event(logger, "fichier évalué", stage="mic_obstruction", file=audio_file,
+              alerts={r["condition"]: r["obstructed"] for r in rows[-1 - len(args.cutoffs):]})
+
+    run_id = new_run_id()
+    os.makedirs(args.results_dir, exist_ok=True)
+    df = pd.DataFrame(rows)
+    df.to_csv(os.path.join(args.results_dir, f"mic_{run_id}.csv"), index=False)
+    sweep = threshold_sweep(df, np.arange(-45.0, -9.0, 3.0))
+    sweep.to_csv(os.path.join(args.results_dir, f"sweep_{run_id}.csv"), index=False)
+    summary = summarize(df)
+    summary_path = os.path.join(args.results_dir, f"summary_{run_id}.csv")
+    summary.to_csv(summary_path, index=False)
+    logger.info("Synthèse :\n" + summary.to_string(index=False))
+    logger.info("Seuil haute bande :\n" + sweep.round(3).to_string(index=False))
+    if "decode_share_pct" in df:
+        logger.info(f"Coût du détecteur : {df['decode_share_pct'].mean():.3f} % du temps de décodage Vosk")
+    logger.info(f"Synthèse enregistrée dans : {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
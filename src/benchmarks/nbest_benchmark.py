@@ -0,0 +1,143 @@
+"""
+nbest_benchmark.py
+------------------
+Précision vs coût de la correction médicale selon la source des candidats :
+
+    1best      : transcription Vosk brute, sans correction
+    phonetic   : 1-best + MedicalPostProcessorPhonetic (recherche phonétique
+                 dans tout le vocabulaire, top_n candidats par mot)
+    nbest<N>   : SetMaxAlternatives(N) ; le mot du 1-best et les alternatives Vosk
+                 alignées sont notés sans référence à la phrase d'origine
+                 (adéquation au contexte ou n-gramme) : une alternative ne
+                 remplace le mot que si elle bat son score
+
+Par fichier et par mode : WER / accuracy (metrics.compute_metrics), temps de
+décodage, temps de correction et nombre de candidats notés (--scorer). Résultats dans results/nbest/nbest_<run_id>.csv (+ synthèse).
+
+Exemple :
+    python -m src.benchmarks.nbest_benchmark --dataset medecin_v2 --alternatives 3 5 10
+"""
+
+import os
+import time
+import argparse
+import pandas as pd
+from vosk import Model
+
+from src.common.config import BENCHMARK_DATASETS, DEFAULT_MODEL_FR, NBEST_RESULTS_DIR, VOCAB_DATA_DIR
+from src.common.run_manifest import new_run_id
+from src.common.event_log import event, get_logger
+from src.benchmarks.datasets import load_dataset
+from src.benchmarks.metrics import compute_metrics
+from src.nlp.medical_postprocessor import SCORERS, MedicalPostProcessorPhonetic
+from src.speech.vosk_decode import convert_to_wav, decode_wav, decode_wav_nbest, is_vosk_ready, wav_duration
+
+logger = get_logger("NBest_Benchmark", "nbest_benchmark")
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _row(audio_file, mode, ref_text, transcript, duration, decode_sec, post_sec, scored):
+    metrics = compute_metrics(ref_text, transcript)
+    total = decode_sec + post_sec
+    return {
+        "audio_file": audio_file,
+        "mode": mode,
+        "duration_sec": round(duration, 3),
+        "decode_sec": round(decode_sec, 4),
+        "postprocess_sec": round(post_sec, 4),
+        "rtf": round(total / duration, 4) if duration else None,
+        "candidates_scored": scored,
+        "wer": metrics["wer"],
+        "accuracy": metrics["accuracy"],
+        "transcript": transcript,
+    }
+
+
+def benchmark_file(model, processor, audio_file, wav_path, ref_text, alternatives):
+    duration = wav_duration(wav_path)
+    rows = []
+
+    # 1-best, puis correction phonétique sur le vocabulaire complet
+    text, decode_sec = _timed(decode_wav, model, wav_path)
+    rows.append(_row(audio_file, "1best", ref_text, text, duration, decode_sec, 0.0, 0))
+    before = processor.candidates_scored
+    (corrected, _, _), post_sec = _timed(processor.process_sentence, text)
+    rows.append(_row(audio_file, "phonetic", ref_text, corrected, duration, decode_sec, post_sec,
+                     processor.candidates_scored - before))
+
+    # N-best : décodage avec alternatives, candidats = hypothèses Vosk
+    for n in alternatives:
+        segments, decode_sec = _timed(decode_wav_nbest, model, wav_path, max_alternatives=n)
+        before = processor.candidates_scored
+        (corrected, _, _), post_sec = _timed(processor.process_nbest, segments)
+        rows.append(_row(audio_file, f"nbest{n}", ref_text, corrected, duration, decode_sec, post_sec,
+                         processor.candidates_scored - before))
+    return rows
+
+
+def summarize(df):
+    grouped = df.groupby("mode", sort=False)
+    summary = pd.DataFrame({
+        "files": grouped["audio_file"].count(),
+        "wer_mean": grouped["wer"].mean(),
+        "accuracy_mean": grouped["accuracy"].mean(),
+        "decode_sec_mean": grouped["decode_sec"].mean(),
+        "postprocess_sec_mean": grouped["postprocess_sec"].mean(),
+        "rtf_mean": grouped["rtf"].mean(),
+        "candidates_scored_mean": grouped["candidates_scored"].mean(),
+    })
+    return summary.round(4).reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Correction médicale : 1-best vs recherche phonétique vs N-best Vosk")
+    parser.add_argument("--dataset", type=str, default="medecin_v2", choices=list(BENCHMARK_DATASETS))
+    parser.add_argument("--model", type=str, default=DEFAULT_MODEL_FR)
+    parser.add_argument("--vocab", type=str, default=os.path.join(VOCAB_DATA_DIR, "medical_vocab_phon.json"))
+    parser.add_argument("--alternatives", type=int, nargs="+", default=[3, 5, 10])
+    parser.add_argument("--scorer", type=str, default="camembert", choices=SCORERS)
+    parser.add_argument("--limit", type=int, default=None, help="Nombre maximal de fichiers")
+    parser.add_argument("--results_dir", type=str, default=NBEST_RESULTS_DIR)
+    args = parser.parse_args()
+
+    files = [f for f in load_dataset(args.dataset) if f[2]][:args.limit]
+    if not files:
+        logger.warning(f"Aucun fichier avec référence dans {args.dataset}")
+        return
+
+    model = Model(args.model)
+    # top_n le plus grand testé : le mode N-best n'est pas bridé par le post-traitement
+    processor = MedicalPostProcessorPhonetic(args.vocab, threshold=0.7, top_n=max(5, *args.alternatives),
+                                             scorer=args.scorer)
+
+    rows = []
+    for audio_file, audio_path, ref_text in files:
+        wav_path = audio_path if is_vosk_ready(audio_path) else convert_to_wav(audio_path)
+        try:
+            file_rows = benchmark_file(model, processor, audio_file, wav_path, ref_text, args.alternatives)
+        finally:
+            if wav_path != audio_path and os.path.exists(wav_path):
+                os.remove(wav_path)
+        rows.extend(file_rows)
+        for r in file_rows:
+            event(logger, "mode évalué", stage=r["mode"], file=audio_file, wer=r["wer"],
+                  duration=r["decode_sec"] + r["postprocess_sec"], candidates=r["candidates_scored"])
+
+    run_id = new_run_id()
+    os.makedirs(args.results_dir, exist_ok=True)
+    df = pd.DataFrame(rows)
+    df.to_csv(os.path.join(args.results_dir, f"nbest_{run_id}.csv"), index=False)
+    summary = summarize(df)
+    summary_path = os.path.join(args.results_dir, f"summary_{run_id}.csv")
+    summary.to_csv(summary_path, index=False)
+    logger.info("Synthèse :\n" + summary.to_string(index=False))
+    logger.info(f"Synthèse enregistrée dans : {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
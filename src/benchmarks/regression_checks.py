@@ -0,0 +1,144 @@
+"""
+regression_checks.py
+--------------------
+Contrôles de non-régression rapides, sans modèle ni données : cas limites
+corrigés en revue, rejoués sur de petits fichiers temporaires ou des tables
+de résultats attendus.
+
+    results_tail   reprise de BatchedResultWriter sur un CSV sans fin de ligne
+                   finale (ligne > 64 Kio, CSV ancien format, ligne tronquée)
+    g2p_rules      phonétisation par règles (g2p_fr) comparée à G2P_EXPECTED
+    ngram_bos      effectifs de <s> du modèle n-gramme (une fois par phrase)
+
+Exemples :
+    python -m src.benchmarks.regression_checks
+    python -m src.benchmarks.regression_checks --checks results_tail
+
+Code de sortie 1 si un contrôle échoue.
+"""
+
+import os
+import sys
+import csv
+import math
+import argparse
+import tempfile
+
+from src.common.run_manifest import TAIL_BLOCK, BatchedResultWriter, RunManifest
+from src.nlp.g2p_fr import g2p_rules
+from src.nlp.ngram_lm import NgramLM, _pack
+
+
+# ---------------------------------------------------------------------
+# Reprise du CSV de résultats (run_manifest.BatchedResultWriter)
+# ---------------------------------------------------------------------
+def _resume(tmp_dir, name, content):
+    """Écrit content (octets) puis ouvre un writer dessus ; renvoie les lignes relues."""
+    path = os.path.join(tmp_dir, f"{name}.csv")
+    with open(path, "wb") as f:
+        f.write(content)
+    writer = BatchedResultWriter(path, ["audio_file", "text"], manifest=RunManifest(path + ".manifest.json"),
+                                 store_dir=None)
+    writer.add(f"{name}-new", {"audio_file": "new.wav", "text": "ajout"})
+    writer.flush()
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def check_results_tail():
+    failures = []
+    header = b"audio_file,text,run_id,run_key\r\n"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Dernière ligne complète plus longue qu'un bloc relu, sans fin de ligne
+        long_text = "x" * (TAIL_BLOCK + 100)
+        rows = _resume(tmp_dir, "long", header + f"a.wav,{long_text},r1,long-a".encode())
+        if [r["run_key"] for r in rows] != ["long-a", "long-new"] or rows[0]["text"] != long_text:
+            failures.append(f"ligne longue sans fin de ligne : {[r['run_key'] for r in rows]}")
+        # CSV ancien format (fins de ligne \n, pas de fin de ligne finale)
+        legacy = b"audio_file,text,run_id,run_key\na.wav,un,r1,legacy-a\nb.wav,deux,r1,legacy-b"
+        rows = _resume(tmp_dir, "legacy", legacy)
+        if [r["run_key"] for r in rows] != ["legacy-a", "legacy-b", "legacy-new"]:
+            failures.append(f"CSV sans fin de ligne finale : {[r['run_key'] for r in rows]}")
+        # Ligne tronquée par un crash pendant l'ajout : retirée
+        rows = _resume(tmp_dir, "crash", header + b"a.wav,un,r1,crash-a\r\nb.wav,de")
+        if [r["run_key"] for r in rows] != ["crash-a", "crash-new"]:
+            failures.append(f"ligne tronquée : {[r['run_key'] for r in rows]}")
+    return failures
+
+
+# ---------------------------------------------------------------------
+# Phonétisation par règles (g2p_fr.g2p_rules), SAMPA attendu
+# ---------------------------------------------------------------------
+G2P_EXPECTED = {
+    # Monosyllabes en -es / est
+    "les": "l e", "des": "d e", "ces": "s e", "mes": "m e", "est": "E",
+    # -er : infinitifs et -ier muets, noms en /ER/
+    "parler": "p a R l e", "infirmier": "e~ f i R m j e",
+    "cathéter": "k a t e t E R", "cancer": "k a~ s E R", "laser": "l a z E R", "scanner": "s k a n E R",
+    # g final muet après une nasale
+    "sang": "s a~", "long": "l o~", "vingt": "v e~", "longue": "l o~ g",
+    # -ien
+    "chirurgien": "S i R y R Z j e~", "bien": "b j e~", "client": "k l j a~",
+    # ill : /il/ dans les exceptions, /ij/ sinon
+    "ville": "v i l", "mille": "m i l", "tranquille": "t R a~ k i l", "famille": "f a m i j", "fille": "f i j",
+    # s final prononcé
+    "bus": "b y s", "virus": "v i R y s", "tables": "t a b l", "gris": "g R i",
+}
+
+
+def check_g2p_rules():
+    failures = []
+    for word, expected in G2P_EXPECTED.items():
+        got = " ".join(g2p_rules(word))
+        if got != expected:
+            failures.append(f"{word} : {got!r} au lieu de {expected!r}")
+    return failures
+
+
+# ---------------------------------------------------------------------
+# Début de phrase du modèle n-gramme (ngram_lm.NgramLM.train)
+# ---------------------------------------------------------------------
+def check_ngram_bos():
+    failures = []
+    sentences = [["le", "patient"], ["le", "client"], ["patient"]]
+    for order in (2, 3):
+        lm = NgramLM.train(sentences, order=order)
+        bos = lm.bos_id
+        bos_count = lm._count(1, _pack([bos]))
+        if bos_count != len(sentences):
+            failures.append(f"ordre {order} : <s> compté {bos_count} fois pour {len(sentences)} phrases")
+        if order == 3 and lm._count(2, _pack([bos, bos])) != len(sentences):
+            failures.append(f"ordre 3 : historique (<s>, <s>) compté {lm._count(2, _pack([bos, bos]))} fois")
+        # P(le | <s>) = 2/3, P(patient | le) = 1/2, P(</s> | patient) = 1
+        expected = math.log10(2 / 3 * 1 / 2)
+        got = lm.score_sentence(["le", "patient"])
+        if abs(got - expected) > 1e-9:
+            failures.append(f"ordre {order} : log P(le patient) = {got:.4f} au lieu de {expected:.4f}")
+    return failures
+
+
+CHECKS = {
+    "results_tail": check_results_tail,
+    "g2p_rules": check_g2p_rules,
+    "ngram_bos": check_ngram_bos,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contrôles de non-régression rapides")
+    parser.add_argument("--checks", nargs="+", default=list(CHECKS), choices=list(CHECKS))
+    args = parser.parse_args()
+
+    failed = 0
+    for name in args.checks:
+        failures = CHECKS[name]()
+        failed += bool(failures)
+        print(f"{name:<24} {'ok' if not failures else 'ÉCHEC'}")
+        for failure in failures:
+            print(f"    {failure}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+rescoring_benchmark.py
+----------------------
+Compare les scorers de MedicalPostProcessorPhonetic sur les mêmes candidats :
+
+    camembert : similarité cosinus de la phrase complète (une passe transformer par candidat)
+    ngram     : gain de log-probabilité du modèle n-gramme sur la fenêtre du mot
+
+Entrée : transcriptions déjà calculées par le harnais (colonnes audio_file,
+reference_text, transcript de results/harness/<dataset>/<moteur>.csv), aucune
+reconnaissance n'est relancée. Par défaut le modèle n-gramme est réappris en
+excluant les fichiers évalués (leurs références ne doivent pas servir de corpus).
+
+Sortie : results/rescoring/rescoring_<run_id>.csv (une ligne par phrase et scorer)
++ synthèse : chargement, ms par phrase, µs par candidat, WER avant / après.
+
+Exemple :
+    python -m src.benchmarks.rescoring_benchmark --results_csv results/harness/medecin_v2/vosk-model-small-fr-0.22.csv
+"""
+
+import os
+import glob
+import time
+import argparse
+import pandas as pd
+
+from src.common.config import HARNESS_RESULTS_DIR, RESCORING_RESULTS_DIR, VOCAB_DATA_DIR
+from src.common.run_manifest import new_run_id
+from src.common.event_log import event, get_logger
+from src.benchmarks.metrics import compute_metrics
+from src.nlp.medical_postprocessor import SCORERS, MedicalPostProcessorPhonetic
+from src.nlp.ngram_lm import NgramLM, iter_sentences
+
+logger = get_logger("Rescoring_Benchmark", "rescoring_benchmark")
+
+
+def load_pairs(paths, limit=None):
+    frames = [pd.read_csv(p, usecols=["audio_file", "reference_text", "transcript"]) for p in paths]
+    if not frames:
+        return pd.DataFrame(columns=["audio_file", "reference_text", "transcript"])
+    df = pd.concat(frames, ignore_index=True).dropna()
+    df = df[df["transcript"].str.strip() != ""].drop_duplicates(["audio_file", "transcript"])
+    return df.head(limit) if limit else df
+
+
+def build_processor(scorer, vocab_path, lm):
+    start = time.perf_counter()
+    processor = MedicalPostProcessorPhonetic(vocab_path, threshold=0.7, top_n=5, scorer=scorer, lm=lm)
+    return processor, time.perf_counter() - start
+
+
+def evaluate(processor, scorer, pairs):
+    rows = []
+    for audio_file, ref_text, transcript in pairs.itertuples(index=False):
+        before = processor.candidates_scored
+        start = time.perf_counter()
+        corrected, replacements, _ = processor.process_sentence(transcript)
+        elapsed = time.perf_counter() - start
+        scored = processor.candidates_scored - before
+        rows.append({
+            "audio_file": audio_file,
+            "scorer": scorer,
+            "sentence_ms": round(1000 * elapsed, 3),
+            "candidates_scored": scored,
+            "candidate_us": round(1e6 * elapsed / scored, 2) if scored else None,
+            "replacements": len(replacements),
+            "wer_before": compute_metrics(ref_text, transcript)["wer"],
+            "wer_after": compute_metrics(ref_text, corrected)["wer"],
+            "corrected": corrected,
+        })
+    return rows
+
+
+def summarize(df, load_times):
+    grouped = df.groupby("scorer", sort=False)
+    summary = pd.DataFrame({
+        "sentences": grouped["audio_file"].count(),
+        "sentence_ms_mean": grouped["sentence_ms"].mean(),
+        "sentence_ms_p90": grouped["sentence_ms"].quantile(0.9),
+        "candidate_us_mean": grouped["candidate_us"].mean(),
+        "replacements": grouped["replacements"].sum(),
+        "wer_before": grouped["wer_before"].mean(),
+        "wer_after": grouped["wer_after"].mean(),
+    })
+    summary["load_sec"] = pd.Series(load_times)
+    return summary.round(4).reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scorers de correction médicale : CamemBERT vs n-gramme")
+    parser.add_argument("--results_csv", nargs="+", default=None,
+                        help="CSV du harnais (défaut : tous les CSV de results/harness/<dataset>/)")
+    parser.add_argument("--vocab", type=str, default=os.path.join(VOCAB_DATA_DIR, "medical_vocab_phon.json"))
+    parser.add_argument("--scorers", nargs="+", default=list(SCORERS), choices=SCORERS)
+    parser.add_argument("--saved_lm", action="store_true",
+                        help="Utiliser le modèle n-gramme sauvegardé au lieu d'un modèle appris sans les fichiers évalués")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--results_dir", type=str, default=RESCORING_RESULTS_DIR)
+    args = parser.parse_args()
+
+    paths = args.results_csv or sorted(glob.glob(os.path.join(HARNESS_RESULTS_DIR, "*", "*.csv")))
+    pairs = load_pairs(paths, args.limit)
+    if pairs.empty:
+        logger.warning("Aucune paire (référence, transcription) à évaluer")
+        return
+    logger.info(f"{len(pairs)} phrases issues de {len(paths)} fichier(s) de résultats")
+
+    lm = None
+    if "ngram" in args.scorers and not args.saved_lm:
+        held_out = {os.path.splitext(os.path.basename(f))[0] for f in pairs["audio_file"]}
+        lm = NgramLM.train(iter_sentences(exclude=held_out))
+        logger.info(f"Modèle n-gramme appris sans les {len(held_out)} fichiers évalués ({lm.total} tokens)")
+
+    rows, load_times = [], {}
+    for scorer in args.scorers:
+        processor, load_times[scorer] = build_processor(scorer, args.vocab, lm)
+        scorer_rows = evaluate(processor, scorer, pairs)
+        rows.extend(scorer_rows)
+        event(logger, "scorer évalué", stage=scorer, duration=round(sum(r["sentence_ms"] for r in scorer_rows) / 1000, 3),
+              sentences=len(scorer_rows), load_sec=round(load_times[scorer], 3))
+        del processor
+
+    run_id = new_run_id()
+    os.makedirs(args.results_dir, exist_ok=True)
+    df = pd.DataFrame(rows)
+    df.to_csv(os.path.join(args.results_dir, f"rescoring_{run_id}.csv"), index=False)
+    summary = summarize(df, load_times)
+    summary_path = os.path.join(args.results_dir, f"summary_{run_id}.csv")
+    summary.to_csv(summary_path, index=False)
+    logger.info("Synthèse :\n" + summary.to_string(index=False))
+    logger.info(f"Synthèse enregistrée dans : {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
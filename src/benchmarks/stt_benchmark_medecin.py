@@ -1,8 +1,6 @@
 import os
 import time
 import json
-import csv
-import logging
 import wave
 import subprocess
 import psutil
@@ -14,39 +12,24 @@ from nltk.translate.bleu_score import sentence_bleu
 from nltk.translate.meteor_score import meteor_score
 from rouge_score import rouge_scorer
 import sacrebleu
-import spacy
-import nltk
-nltk.download('wordnet')
-nltk.download('omw-1.4') 
 
 from src.common.config import WAV_DATA_DIR_v2, TRANSCRIPTS_DIR, RESULTS_DIR, DEFAULT_MODEL_FR
+from src.common.run_manifest import BatchedResultWriter, file_hash, make_run_key
+from src.common.profiling import profiled
+from src.benchmarks.metrics import ensure_nltk_data, get_nlp
+from src.common.event_log import event, get_logger
 
 # ---------------------------------------------------------------------
 # Logger
 # ---------------------------------------------------------------------
-LOG_PATH = os.path.join(RESULTS_DIR, "benchmark_v2.log")
-os.makedirs(RESULTS_DIR, exist_ok=True)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_PATH, mode="a", encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__, "benchmark_v2")
 
 # ---------------------------------------------------------------------
 # Lemmatisation
 # ---------------------------------------------------------------------
-try:
-    nlp = spacy.load("fr_core_news_md")
-except OSError:
-    nlp = spacy.load("fr_core_news_sm")
-
+@profiled("spacy.lemmatize")
 def lemmatize_text(text):
-    doc = nlp(text.lower())
+    doc = get_nlp()(text.lower())
     return " ".join([token.lemma_ for token in doc if not token.is_punct and not token.is_space])
 
 # ---------------------------------------------------------------------
@@ -60,6 +43,7 @@ def convert_to_wav(input_path, temp_filename="temp.wav"):
     )
     return temp_path
 
+@profiled("vosk.transcribe")
 def transcribe_audio(model, input_path):
     wav_path = convert_to_wav(input_path)
     result_text = ""
@@ -94,22 +78,17 @@ def load_reference_text(audio_file):
             return f.read().strip()
     return None
 
-def write_csv(result, output_csv):
-    header = [
-        "audio_file", "model", "latency_sec", "memory_mb", "wer",
-        "wer_token", "levenshtein", "levenshtein_pct", "accuracy",
-        "bleu3", "meteor", "chrf", "rougeL",
-        "reference_text", "reference_text_lemma",
-        "transcript", "transcript_lemma",
-        "tokens"
-    ]
-    file_exists = os.path.exists(output_csv)
-    os.makedirs(os.path.dirname(output_csv), exist_ok=True)
-    with open(output_csv, "a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=header)
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(result)
+CSV_HEADER = [
+    "audio_file", "model", "latency_sec", "memory_mb", "wer",
+    "wer_token", "levenshtein", "levenshtein_pct", "accuracy",
+    "bleu3", "meteor", "chrf", "rougeL",
+    "reference_text", "reference_text_lemma",
+    "transcript", "transcript_lemma",
+    "tokens"
+]
+
+# Paramètres qui influencent le résultat (entrent dans la clé du manifeste)
+RUN_CONFIG = {"sample_rate": 16000, "chunk_frames": 4000, "lemmatize": True}
 
 # ---------------------------------------------------------------------
 # Script principal
@@ -126,94 +105,110 @@ def main():
     logger.info(f"Benchmark du modèle : {DEFAULT_MODEL_FR}")
     logger.info(f"Nombre d'audios : {len(audio_files)} fichiers")
 
-    model = Model(DEFAULT_MODEL_FR)
-    scorer = rouge_scorer.RougeScorer(['rougeL'], use_stemmer=True)
-
-    for audio_file in tqdm(audio_files, desc="Benchmark", unit="fichier"):
+    writer = BatchedResultWriter(results_path, CSV_HEADER)
+    pending = []
+    for audio_file in audio_files:
         input_path = os.path.join(WAV_DATA_DIR_v2, audio_file)
-        mem_before = measure_memory()
-        transcript, latency = transcribe_audio(model, input_path)
-        mem_after = measure_memory()
-
-        ref_text = load_reference_text(audio_file)
-        num_tokens = len(transcript.split()) if transcript else 0
-
-        # Initialisation
-        if ref_text and transcript:
-            ref_text_lemma = lemmatize_text(ref_text)
-            transcript_lemma = lemmatize_text(transcript)
-            ref_words = ref_text_lemma.split()
-            hyp_words = transcript_lemma.split()
-            try:
-                # Character-level
-                wer_score = wer(ref_text_lemma, transcript_lemma)
-                levenshtein_score = Levenshtein.distance(ref_text_lemma, transcript_lemma)
-                levenshtein_pct = levenshtein_score / max(len(ref_text_lemma), 1)
-
-                # Token-level
-                correct_words = sum(r==h for r,h in zip(ref_words,hyp_words))
-                wer_token_score = 1 - sum(r!=h for r,h in zip(ref_words,hyp_words))/max(len(ref_words),1)
-                acc_score = correct_words / max(len(ref_words),1)
-
-                # BLEU3
-                try:
-                    bleu_score = sentence_bleu([ref_words], hyp_words, weights=(1/3,1/3,1/3,0))
-                except Exception as e:
-                    logger.warning(f"BLEU3 error {audio_file}: {e}")
-                    bleu_score = "N/A"
+        key = make_run_key(model_name, file_hash(input_path), config=RUN_CONFIG)
+        if not writer.is_done(key):
+            pending.append((audio_file, input_path, key))
 
-                # METEOR
-                try:
-                    meteor = meteor_score([ref_words], hyp_words)
-                except Exception as e:
-                    logger.warning(f"METEOR error {audio_file}: {e}")
-                    meteor = "N/A"
+    logger.info(f"Run {writer.run_id} : {len(pending)} fichiers à calculer, "
+                f"{len(audio_files) - len(pending)} déjà présents dans le manifeste")
+    if not pending:
+        return
 
-                # chrF
-                try:
-                    chrf_obj = sacrebleu.corpus_chrf([transcript_lemma], [[ref_text_lemma]])
-                    chrf_score = chrf_obj.score
-                except Exception as e:
-                    logger.warning(f"chrF error {audio_file}: {e}")
-                    chrf_score = "N/A"
+    ensure_nltk_data()
+    model = Model(DEFAULT_MODEL_FR)
+    scorer = rouge_scorer.RougeScorer(['rougeL'], use_stemmer=True)
 
-                # ROUGE-L
+    with writer:
+        for audio_file, input_path, key in tqdm(pending, desc="Benchmark", unit="fichier"):
+            mem_before = measure_memory()
+            transcript, latency = transcribe_audio(model, input_path)
+            mem_after = measure_memory()
+
+            ref_text = load_reference_text(audio_file)
+            num_tokens = len(transcript.split()) if transcript else 0
+
+            # Initialisation
+            if ref_text and transcript:
+                ref_text_lemma = lemmatize_text(ref_text)
+                transcript_lemma = lemmatize_text(transcript)
+                ref_words = ref_text_lemma.split()
+                hyp_words = transcript_lemma.split()
                 try:
-                    rouge_l_score = scorer.score(ref_text_lemma, transcript_lemma)['rougeL'].fmeasure
+                    # Character-level
+                    wer_score = wer(ref_text_lemma, transcript_lemma)
+                    levenshtein_score = Levenshtein.distance(ref_text_lemma, transcript_lemma)
+                    levenshtein_pct = levenshtein_score / max(len(ref_text_lemma), 1)
+
+                    # Token-level
+                    correct_words = sum(r==h for r,h in zip(ref_words,hyp_words))
+                    wer_token_score = 1 - sum(r!=h for r,h in zip(ref_words,hyp_words))/max(len(ref_words),1)
+                    acc_score = correct_words / max(len(ref_words),1)
+
+                    # BLEU3
+                    try:
+                        bleu_score = sentence_bleu([ref_words], hyp_words, weights=(1/3,1/3,1/3,0))
+                    except Exception as e:
+                        logger.warning(f"BLEU3 error {audio_file}: {e}")
+                        bleu_score = "N/A"
+
+                    # METEOR
+                    try:
+                        meteor = meteor_score([ref_words], hyp_words)
+                    except Exception as e:
+                        logger.warning(f"METEOR error {audio_file}: {e}")
+                        meteor = "N/A"
+
+                    # chrF
+                    try:
+                        chrf_obj = sacrebleu.corpus_chrf([transcript_lemma], [[ref_text_lemma]])
+                        chrf_score = chrf_obj.score
+                    except Exception as e:
+                        logger.warning(f"chrF error {audio_file}: {e}")
+                        chrf_score = "N/A"
+
+                    # ROUGE-L
+                    try:
+                        rouge_l_score = scorer.score(ref_text_lemma, transcript_lemma)['rougeL'].fmeasure
+                    except Exception as e:
+                        logger.warning(f"ROUGE-L error {audio_file}: {e}")
+                        rouge_l_score = "N/A"
+
                 except Exception as e:
-                    logger.warning(f"ROUGE-L error {audio_file}: {e}")
-                    rouge_l_score = "N/A"
+                    logger.warning(f"Métriques échouées pour {audio_file}: {e}")
+                    wer_score = wer_token_score = levenshtein_score = levenshtein_pct = acc_score = bleu_score = meteor = chrf_score = rouge_l_score = "N/A"
 
-            except Exception as e:
-                logger.warning(f"Métriques échouées pour {audio_file}: {e}")
+            else:
+                ref_text_lemma = transcript_lemma = ""
                 wer_score = wer_token_score = levenshtein_score = levenshtein_pct = acc_score = bleu_score = meteor = chrf_score = rouge_l_score = "N/A"
 
-        else:
-            ref_text_lemma = transcript_lemma = ""
-            wer_score = wer_token_score = levenshtein_score = levenshtein_pct = acc_score = bleu_score = meteor = chrf_score = rouge_l_score = "N/A"
-
-        result = {
-            "audio_file": audio_file,
-            "model": model_name,
-            "latency_sec": round(latency,3),
-            "memory_mb": round(mem_after-mem_before,2),
-            "wer": round(wer_score,3) if isinstance(wer_score,float) else wer_score,
-            "wer_token": round(wer_token_score,3) if isinstance(wer_token_score,float) else wer_token_score,
-            "levenshtein": round(levenshtein_score,3) if isinstance(levenshtein_score,float) else levenshtein_score,
-            "levenshtein_pct": round(levenshtein_pct,3) if isinstance(levenshtein_pct,float) else levenshtein_pct,
-            "accuracy": round(acc_score,3) if isinstance(acc_score,float) else acc_score,
-            "bleu3": round(bleu_score,3) if isinstance(bleu_score,float) else bleu_score,
-            "meteor": round(meteor,3) if isinstance(meteor,float) else meteor,
-            "chrf": round(chrf_score,3) if isinstance(chrf_score,float) else chrf_score,
-            "rougeL": round(rouge_l_score,3) if isinstance(rouge_l_score,float) else rouge_l_score,
-            "reference_text": ref_text if ref_text else "N/A",
-            "reference_text_lemma": ref_text_lemma if ref_text else "N/A",
-            "transcript": transcript if transcript else "N/A",
-            "transcript_lemma": transcript_lemma if transcript else "N/A",
-            "tokens": num_tokens
-        }
-
-        write_csv(result, results_path)
+            result = {
+                "audio_file": audio_file,
+                "model": model_name,
+                "latency_sec": round(latency,3),
+                "memory_mb": round(mem_after-mem_before,2),
+                "wer": round(wer_score,3) if isinstance(wer_score,float) else wer_score,
+                "wer_token": round(wer_token_score,3) if isinstance(wer_token_score,float) else wer_token_score,
+                "levenshtein": round(levenshtein_score,3) if isinstance(levenshtein_score,float) else levenshtein_score,
+                "levenshtein_pct": round(levenshtein_pct,3) if isinstance(levenshtein_pct,float) else levenshtein_pct,
+                "accuracy": round(acc_score,3) if isinstance(acc_score,float) else acc_score,
+                "bleu3": round(bleu_score,3) if isinstance(bleu_score,float) else bleu_score,
+                "meteor": round(meteor,3) if isinstance(meteor,float) else meteor,
+                "chrf": round(chrf_score,3) if isinstance(chrf_score,float) else chrf_score,
+                "rougeL": round(rouge_l_score,3) if isinstance(rouge_l_score,float) else rouge_l_score,
+                "reference_text": ref_text if ref_text else "N/A",
+                "reference_text_lemma": ref_text_lemma if ref_text else "N/A",
+                "transcript": transcript if transcript else "N/A",
+                "transcript_lemma": transcript_lemma if transcript else "N/A",
+                "tokens": num_tokens
+            }
+
+            writer.add(key, result)
+            event(logger, "fichier traité", stage="decode", file=audio_file, duration=round(latency, 4),
+                  model=DEFAULT_MODEL_FR, wer=result["wer"])
 
     logger.info(f"Toutes les métriques v2 ont été enregistrées dans : {results_path}")
 
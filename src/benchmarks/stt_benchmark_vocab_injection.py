@@ -1,8 +1,7 @@
 import os
+import functools
 import time
 import json
-import csv
-import logging
 import wave
 import subprocess
 import psutil
@@ -14,9 +13,12 @@ from nltk.translate.bleu_score import sentence_bleu
 from nltk.translate.meteor_score import meteor_score
 from rouge_score import rouge_scorer
 import sacrebleu
-import spacy
 
 # ----------------------- Configuration -----------------------
+from src.common.run_manifest import BatchedResultWriter, file_hash, make_run_key, obj_hash
+from src.common.profiling import profiled
+from src.benchmarks.metrics import get_nlp
+from src.nlp.vocabulary import Vocabulary
 from src.common.config import (
     WAV_DATA_DIR,
     TRANSCRIPTS_DIR,
@@ -25,46 +27,33 @@ from src.common.config import (
     SAMPLE_RATE,
     VOCAB_DATA_DIR
 )
+from src.common.event_log import event, get_logger
 
 # ----------------------- Logger -----------------------
-LOG_PATH = os.path.join(RESULTS_DIR, "benchmark_medical.log")
-os.makedirs(RESULTS_DIR, exist_ok=True)
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_PATH, mode="a", encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__, "benchmark_medical")
 
 # ----------------------- Lemmatisation -----------------------
-try:
-    nlp = spacy.load("fr_core_news_md")
-except OSError:
-    nlp = spacy.load("fr_core_news_sm")
-
+@profiled("spacy.lemmatize")
 def lemmatize_text(text):
-    doc = nlp(text.lower())
+    doc = get_nlp()(text.lower())
     return " ".join([token.lemma_ for token in doc if not token.is_punct and not token.is_space])
 
 # ----------------------- Charger et fusionner le vocabulaire -----------------------
 VOCAB_JSON_PATH = os.path.join(VOCAB_DATA_DIR, "words_clean.json")
-if os.path.exists(VOCAB_JSON_PATH):
-    with open(VOCAB_JSON_PATH, "r", encoding="utf-8") as f:
-        generated_vocab = json.load(f)
-else:
-    generated_vocab = []
 
-OPTIMIZED_VOCAB_PATH = os.path.join(VOCAB_DATA_DIR, "optimized_vocab.json")
-with open(OPTIMIZED_VOCAB_PATH, "r", encoding="utf-8") as f:
-    MEDICAL_VOCABULARY = json.load(f)
 
-# Fusionner vocabulaire manuel et généré
-# FULL_VOCABULARY = sorted(set(MEDICAL_VOCABULARY + generated_vocab))
-FULL_VOCABULARY = sorted(set(generated_vocab))
-logger.info(f"Taille du vocabulaire injecté : {len(FULL_VOCABULARY)} mots")
+@functools.lru_cache(maxsize=None)
+def load_full_vocabulary():
+    """Vocabulaire injecté, lu au premier appel. Renvoie (liste triée, grammaire JSON)."""
+    if os.path.exists(VOCAB_JSON_PATH):
+        with open(VOCAB_JSON_PATH, "r", encoding="utf-8") as f:
+            generated_vocab = json.load(f)
+    else:
+        generated_vocab = []
+
+    full_vocabulary = Vocabulary.from_words(generated_vocab).sorted()
+    return full_vocabulary, json.dumps(full_vocabulary)
+
 
 # ----------------------- Fonctions utilitaires -----------------------
 def convert_to_wav(input_path, temp_filename="temp.wav"):
@@ -75,13 +64,14 @@ def convert_to_wav(input_path, temp_filename="temp.wav"):
     )
     return temp_path
 
+@profiled("vosk.transcribe")
 def transcribe_with_vocab(model, audio_path):
     wav_path = convert_to_wav(audio_path)
     result_text = ""
     start_time = time.time()
     try:
         with wave.open(wav_path, "rb") as wf:
-            rec = KaldiRecognizer(model, wf.getframerate(), json.dumps(FULL_VOCABULARY))
+            rec = KaldiRecognizer(model, wf.getframerate(), load_full_vocabulary()[1])
             while True:
                 data = wf.readframes(4000)
                 if len(data) == 0:
@@ -109,22 +99,17 @@ def load_reference_text(audio_file):
             return f.read().strip()
     return None
 
-def write_csv(result, output_csv):
-    header = [
-        "audio_file", "model", "latency_sec", "memory_mb", "wer",
-        "wer_token", "levenshtein", "levenshtein_pct", "accuracy",
-        "bleu3", "meteor", "chrf", "rougeL",
-        "reference_text", "reference_text_lemma",
-        "transcript", "transcript_lemma",
-        "tokens"
-    ]
-    file_exists = os.path.exists(output_csv)
-    os.makedirs(os.path.dirname(output_csv), exist_ok=True)
-    with open(output_csv, "a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=header)
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(result)
+CSV_HEADER = [
+    "audio_file", "model", "latency_sec", "memory_mb", "wer",
+    "wer_token", "levenshtein", "levenshtein_pct", "accuracy",
+    "bleu3", "meteor", "chrf", "rougeL",
+    "reference_text", "reference_text_lemma",
+    "transcript", "transcript_lemma",
+    "tokens"
+]
+
+# Paramètres qui influencent le résultat (entrent dans la clé du manifeste)
+RUN_CONFIG = {"sample_rate": SAMPLE_RATE, "chunk_frames": 4000, "lemmatize": True, "grammar": True}
 
 # ----------------------- Script principal -----------------------
 def main():
@@ -139,76 +124,94 @@ def main():
     logger.info(f"Benchmark du modèle médical : {EXPERIMENTAL_MODEL_FR}")
     logger.info(f"Nombre d'audios : {len(audio_files)} fichiers")
 
+    writer = BatchedResultWriter(results_path, CSV_HEADER)
+    full_vocabulary = load_full_vocabulary()[0]
+    logger.info(f"Taille du vocabulaire injecté : {len(full_vocabulary)} mots")
+    vocab_hash = obj_hash(full_vocabulary)
+    pending = []
+    for audio_file in audio_files:
+        input_path = os.path.join(WAV_DATA_DIR, audio_file)
+        key = make_run_key(model_name, file_hash(input_path), vocab_hash, RUN_CONFIG)
+        if not writer.is_done(key):
+            pending.append((audio_file, input_path, key))
+
+    logger.info(f"Run {writer.run_id} : {len(pending)} fichiers à calculer, "
+                f"{len(audio_files) - len(pending)} déjà présents dans le manifeste")
+    if not pending:
+        return
+
     model = Model(EXPERIMENTAL_MODEL_FR)
     scorer = rouge_scorer.RougeScorer(['rougeL'], use_stemmer=True)
 
-    for audio_file in tqdm(audio_files, desc="Benchmark", unit="fichier"):
-        input_path = os.path.join(WAV_DATA_DIR, audio_file)
-        mem_before = measure_memory()
-        transcript, latency = transcribe_with_vocab(model, input_path)
-        mem_after = measure_memory()
-
-        ref_text = load_reference_text(audio_file)
-        num_tokens = len(transcript.split())
-
-        # Initialisation
-        wer_score = wer_token_score = levenshtein_score = levenshtein_pct = acc_score = bleu_score = meteor = chrf_score = rouge_l_score = 0.0
-        ref_text_lemma = transcript_lemma = ""
-
-        if ref_text and transcript:
-            try:
-                ref_text_lemma = lemmatize_text(ref_text)
-                transcript_lemma = lemmatize_text(transcript)
-
-                # Character-level
-                wer_score = wer(ref_text_lemma, transcript_lemma)
-                levenshtein_score = Levenshtein.distance(ref_text_lemma, transcript_lemma)
-                levenshtein_pct = levenshtein_score / max(len(ref_text_lemma),1)
-
-                # Token-level
-                ref_words = ref_text_lemma.split()
-                hyp_words = transcript_lemma.split()
-                correct_words = sum(r==h for r,h in zip(ref_words,hyp_words))
-                wer_token_score = 1 - sum(r!=h for r,h in zip(ref_words,hyp_words))/max(len(ref_words),1)
-                acc_score = correct_words / max(len(ref_words),1)
-
-                # BLEU3
-                bleu_score = sentence_bleu([ref_words], hyp_words, weights=(1/3,1/3,1/3,0))
-
-                # METEOR
-                meteor = meteor_score([ref_text_lemma], transcript_lemma)
-
-                # chrF
-                chrf_score = sacrebleu.corpus_chrf([transcript_lemma], [[ref_text_lemma]])
-
-                # ROUGE-L
-                rouge_l_score = scorer.score(ref_text_lemma, transcript_lemma)['rougeL'].fmeasure
-
-            except Exception as e:
-                logger.warning(f"Erreur métriques pour {audio_file}: {e}")
-
-        result = {
-            "audio_file": audio_file,
-            "model": model_name,
-            "latency_sec": round(latency,3),
-            "memory_mb": round(mem_after-mem_before,2),
-            "wer": round(wer_score,3),
-            "wer_token": round(wer_token_score,3),
-            "levenshtein": round(levenshtein_score,3),
-            "levenshtein_pct": round(levenshtein_pct,3),
-            "accuracy": round(acc_score,3),
-            "bleu3": round(bleu_score,3),
-            "meteor": round(meteor,3),
-            "chrf": round(chrf_score,3),
-            "rougeL": round(rouge_l_score,3),
-            "reference_text": ref_text if ref_text else "N/A",
-            "reference_text_lemma": ref_text_lemma if ref_text else "N/A",
-            "transcript": transcript,
-            "transcript_lemma": transcript_lemma,
-            "tokens": num_tokens
-        }
-
-        write_csv(result, results_path)
+    with writer:
+        for audio_file, input_path, key in tqdm(pending, desc="Benchmark", unit="fichier"):
+            mem_before = measure_memory()
+            transcript, latency = transcribe_with_vocab(model, input_path)
+            mem_after = measure_memory()
+
+            ref_text = load_reference_text(audio_file)
+            num_tokens = len(transcript.split())
+
+            # Initialisation
+            wer_score = wer_token_score = levenshtein_score = levenshtein_pct = acc_score = bleu_score = meteor = chrf_score = rouge_l_score = 0.0
+            ref_text_lemma = transcript_lemma = ""
+
+            if ref_text and transcript:
+                try:
+                    ref_text_lemma = lemmatize_text(ref_text)
+                    transcript_lemma = lemmatize_text(transcript)
+
+                    # Character-level
+                    wer_score = wer(ref_text_lemma, transcript_lemma)
+                    levenshtein_score = Levenshtein.distance(ref_text_lemma, transcript_lemma)
+                    levenshtein_pct = levenshtein_score / max(len(ref_text_lemma),1)
+
+                    # Token-level
+                    ref_words = ref_text_lemma.split()
+                    hyp_words = transcript_lemma.split()
+                    correct_words = sum(r==h for r,h in zip(ref_words,hyp_words))
+                    wer_token_score = 1 - sum(r!=h for r,h in zip(ref_words,hyp_words))/max(len(ref_words),1)
+                    acc_score = correct_words / max(len(ref_words),1)
+
+                    # BLEU3
+                    bleu_score = sentence_bleu([ref_words], hyp_words, weights=(1/3,1/3,1/3,0))
+
+                    # METEOR
+                    meteor = meteor_score([ref_text_lemma], transcript_lemma)
+
+                    # chrF
+                    chrf_score = sacrebleu.corpus_chrf([transcript_lemma], [[ref_text_lemma]])
+
+                    # ROUGE-L
+                    rouge_l_score = scorer.score(ref_text_lemma, transcript_lemma)['rougeL'].fmeasure
+
+                except Exception as e:
+                    logger.warning(f"Erreur métriques pour {audio_file}: {e}")
+
+            result = {
+                "audio_file": audio_file,
+                "model": model_name,
+                "latency_sec": round(latency,3),
+                "memory_mb": round(mem_after-mem_before,2),
+                "wer": round(wer_score,3),
+                "wer_token": round(wer_token_score,3),
+                "levenshtein": round(levenshtein_score,3),
+                "levenshtein_pct": round(levenshtein_pct,3),
+                "accuracy": round(acc_score,3),
+                "bleu3": round(bleu_score,3),
+                "meteor": round(meteor,3),
+                "chrf": round(chrf_score,3),
+                "rougeL": round(rouge_l_score,3),
+                "reference_text": ref_text if ref_text else "N/A",
+                "reference_text_lemma": ref_text_lemma if ref_text else "N/A",
+                "transcript": transcript,
+                "transcript_lemma": transcript_lemma,
+                "tokens": num_tokens
+            }
+
+            writer.add(key, result)
+            event(logger, "fichier traité", stage="decode", file=audio_file, duration=round(latency, 4),
+                  model=EXPERIMENTAL_MODEL_FR, wer=result["wer"])
 
     logger.info(f"Toutes les métriques ont été enregistrées dans : {results_path}")
 
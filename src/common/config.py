@@ -15,8 +15,8 @@ import os
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Dossier de reporting
+# (aucun dossier n'est créé à l'import : chaque script crée ceux qu'il écrit)
 REPORTING_DIR = os.path.join(BASE_DIR, "data", "reporting")
-os.makedirs(REPORTING_DIR, exist_ok=True)  # crée le dossier si nécessaire
 
 # Sous-dossiers
 DATA_DIR = os.path.join(BASE_DIR, "data")
@@ -33,11 +33,22 @@ RAW_DATA_DIR = os.path.join(DATA_DIR, "raw")
 MEDECIN_DATA_DIR = os.path.join(RAW_DATA_DIR, "enregistrements")
 PROCESSED_DATA_DIR = os.path.join(DATA_DIR, "processed")
 VOCAB_DATA_DIR = os.path.join(DATA_DIR, "vocabulaire")
+VOCAB_BUILDS_DIR = os.path.join(VOCAB_DATA_DIR, "builds")  # versions de vocab_pipeline.py
 WAV_DATA_DIR = os.path.join(PROCESSED_DATA_DIR, "temp_wav")
 WAV_DATA_DIR_v2 = os.path.join(PROCESSED_DATA_DIR, "wav_data_v2")
 NOISE_DIR = os.path.join(DATA_DIR, "noise")
 TRANSCRIPTS_DIR = os.path.join(DATA_DIR, "transcripts")
 TSV_DIR = os.path.join(DATA_DIR, "tsv")  
+# Cache des transcriptions Whisper (hash audio + modèle + options)
+TRANSCRIPT_CACHE_PATH = os.path.join(DATA_DIR, "cache", "whisper_transcripts.json")
+# Cache de la phonétisation (G2P) du vocabulaire médical
+G2P_CACHE_PATH = os.path.join(DATA_DIR, "cache", "g2p_fr.json")
+# Tries des lexiques Vosk normalisés (clé : SHA-1 de words.txt)
+LEXICON_CACHE_DIR = os.path.join(DATA_DIR, "cache", "lexicon")
+# Statistiques de corpus (unigrammes, bigrammes, df, OOV) de corpus_stats.py
+CORPUS_STATS_DIR = os.path.join(DATA_DIR, "corpus_stats")
+# Jeux audio synthétiques (bruit, réverbération, obstruction) de synthetic_generation.py
+SYNTHETIC_DATA_DIR = os.path.join(DATA_DIR, "synthetic")
 
 # ---------------------------------------------------------------------
 #  Fichiers résultats
@@ -46,17 +57,59 @@ TSV_DIR = os.path.join(DATA_DIR, "tsv")
 # BENCHMARK_CSV = os.path.join(RESULTS_DIR, "benchmarks.csv")
 WER_CSV = os.path.join(RESULTS_DIR, "wer_scores.csv")
 
+# Store Parquet des résultats (partitionné par modèle et run)
+RESULTS_STORE_DIR = os.path.join(RESULTS_DIR, "store")
+# Baselines de performance (contrôle de régression)
+BASELINES_DIR = os.path.join(RESULTS_DIR, "baselines")
+# Profils d'exécution (piles repliées pour flame graph)
+PROFILES_DIR = os.path.join(RESULTS_DIR, "profiles")
+# Journaux d'événements structurés (JSON lines)
+LOGS_DIR = os.path.join(RESULTS_DIR, "logs")
+
 # ---------------------------------------------------------------------
 # Autres constantes utiles
 # ---------------------------------------------------------------------
 
 SAMPLE_RATE = 16000  # fréquence d’échantillonnage standard
 DEFAULT_MODEL_FR = os.path.join(MODELS_DIR, "vosk-model-small-fr-0.22")
+DEFAULT_MODEL_EN = os.path.join(MODELS_DIR, "vosk-model-small-en-us-0.15")
+# Tablette cible (12 Go) : Android et les autres applications en gardent environ 4
+TABLET_RAM_MB = 12 * 1024
+MEMORY_BUDGET_MB = 8 * 1024
 
 # ---------------------------------------------------------------------
 #  Modèle expérimental (copie)
 # ---------------------------------------------------------------------
 EXPERIMENTAL_MODEL_FR = os.path.join(MODELS_DIR, "vosk-model-small-fr-0.22-med")
+# Modèle n-gramme de rescoring des corrections (src/nlp/ngram_lm.py)
+NGRAM_LM_DIR = os.path.join(MODELS_DIR, "ngram-medical-fr")
+
+
+# ---------------------------------------------------------------------
+# Jeux de données de benchmark (déclarés une seule fois)
+# ---------------------------------------------------------------------
+# audio_dir : fichiers audio ; references : "tsv" (Common Voice) ou dossier de .txt
+BENCHMARK_DATASETS = {
+    "commonvoice": {"audio_dir": RAW_DATA_DIR, "references": "tsv"},
+    "medecin": {"audio_dir": WAV_DATA_DIR, "references": TRANSCRIPTS_DIR},
+    "medecin_v2": {"audio_dir": WAV_DATA_DIR_v2, "references": TRANSCRIPTS_DIR},
+    "synthetic": {"audio_dir": os.path.join(SYNTHETIC_DATA_DIR, "default"), "references": "synthetic"},
+}
+HARNESS_RESULTS_DIR = os.path.join(RESULTS_DIR, "harness")
+# Comparaison 1-best / correction phonétique / rescoring N-best
+NBEST_RESULTS_DIR = os.path.join(RESULTS_DIR, "nbest")
+# Comparaison des scorers de correction (CamemBERT / n-gramme)
+RESCORING_RESULTS_DIR = os.path.join(RESULTS_DIR, "rescoring")
+# Détection de micro obstrué sur enregistrements filtrés passe-bas
+MIC_RESULTS_DIR = os.path.join(RESULTS_DIR, "mic_obstruction")
+# Gain de WER vs latence du débruitage en flux
+DENOISE_RESULTS_DIR = os.path.join(RESULTS_DIR, "denoise")
+# Routage bilingue FR / EN (choix de langue, surcoût, mémoire)
+BILINGUAL_RESULTS_DIR = os.path.join(RESULTS_DIR, "bilingual")
+# Empreinte mémoire par composant et prédiction sur tablette
+MEMORY_RESULTS_DIR = os.path.join(RESULTS_DIR, "memory")
+# Rappel des embeddings quantifiés (float16 / int8) par rapport au float32
+EMBEDDINGS_RESULTS_DIR = os.path.join(RESULTS_DIR, "embeddings")
 
 
 # ---------------------------------------------------------------------
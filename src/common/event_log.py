@@ -0,0 +1,187 @@
+"""
+event_log.py
+------------
+Journal d'événements structuré partagé par tous les scripts.
+
+    from src.common.event_log import get_logger, event, log_stage
+
+    logger = get_logger(__name__, "benchmark_v2")
+    event(logger, "fichier décodé", stage="decode", file=path, duration=0.42)
+    with log_stage(logger, "postprocess", file=path):
+        ...
+
+- Configuration paresseuse : rien n'est ouvert à l'import ; le premier
+  message émis installe les handlers (console lisible + JSON lines).
+- Asynchrone : le thread appelant ne fait que déposer l'enregistrement dans
+  une file (QueueHandler) ; mise en forme, mesure mémoire et écriture disque
+  se font dans le thread du QueueListener, hors de la boucle de décodage.
+- Sortie : results/logs/<nom>.jsonl, une ligne JSON par événement avec
+  ts, level, logger, msg, pid et les champs stage / file / duration / memory_mb
+  (plus tout champ passé à event()), agrégeable avec read_events() / pandas.
+- Seuls les points d'entrée (main) appellent get_logger ; les modules
+  importés par d'autres utilisent logging.getLogger(__name__). Les pools de
+  processus passent initializer=init_worker pour ne rien perdre à leur sortie.
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+from src.common.config import LOGS_DIR
+
+CONSOLE_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+DEFAULT_LOG_NAME = "events"
+
+# Attributs standard d'un LogRecord : tout le reste vient de extra= (champs structurés)
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__()
+        try:
+            import psutil
+            self._process = psutil.Process(os.getpid())
+        except ImportError:
+            self._process = None
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if "memory_mb" not in entry and self._process is not None:
+            entry["memory_mb"] = round(self._process.memory_info().rss / (1024 * 1024), 1)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _AsyncHandler(QueueHandler):
+    """
+    Handler racine. L'enregistrement est transmis tel quel (file du même processus,
+    aucune mise en forme dans le thread appelant) ; la sortie réelle (fichier +
+    console + thread d'écriture) n'est créée qu'au premier message.
+    """
+
+    def __init__(self, log_name, log_dir=LOGS_DIR):
+        super().__init__(queue.SimpleQueue())
+        self.log_name = log_name
+        self.log_dir = log_dir
+        self._listener = None
+        self._handlers = ()
+        self._pid = None
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            # Premier message, ou processus forké (le thread d'écriture n'existe pas dans l'enfant)
+            self.start()
+        if self._listener is None:
+            # Après shutdown (messages émis par d'autres handlers atexit) : écriture directe
+            for h in self._handlers:
+                h.handle(record)
+            return
+        self.queue.put_nowait(record)
+
+    def start(self):
+        with _lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.SimpleQueue()
+            os.makedirs(self.log_dir, exist_ok=True)
+            file_handler = logging.FileHandler(
+                os.path.join(self.log_dir, f"{self.log_name}.jsonl"), mode="a", encoding="utf-8"
+            )
+            file_handler.setFormatter(JsonFormatter())
+            console = logging.StreamHandler()
+            console.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+            self._handlers = (file_handler, console)
+            self._listener = QueueListener(self.queue, *self._handlers, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Vide la file et arrête le thread d'écriture (celui du processus courant)."""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+
+
+def _root_handler():
+    for h in logging.getLogger().handlers:
+        if isinstance(h, _AsyncHandler):
+            return h
+    return None
+
+
+def get_logger(name, log_name=DEFAULT_LOG_NAME, level=logging.INFO):
+    """
+    Logger nommé ; le premier appel choisit le fichier results/logs/<log_name>.jsonl.
+    Aucun fichier n'est ouvert avant le premier message.
+    """
+    root = logging.getLogger()
+    with _lock:
+        if _root_handler() is None:
+            root.addHandler(_AsyncHandler(log_name))
+            root.setLevel(level)
+    return logging.getLogger(name)
+
+
+def shutdown():
+    handler = _root_handler()
+    if handler is not None:
+        handler.stop()
+
+
+def init_worker():
+    """
+    Initialiseur de ProcessPoolExecutor : un worker se termine par os._exit, sans
+    exécuter atexit ; le finaliseur multiprocessing vide son journal à la sortie.
+    """
+    from multiprocessing.util import Finalize
+    Finalize(None, shutdown, exitpriority=100)
+
+
+def event(logger, msg, level=logging.INFO, **fields):
+    """Événement structuré ; le message reste constant, les valeurs vont dans les champs."""
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, extra=fields, stacklevel=2)
+
+
+@contextmanager
+def log_stage(logger, stage, level=logging.INFO, **fields):
+    """Émet un événement {stage, duration} à la sortie du bloc (même en cas d'erreur)."""
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        event(logger, stage, level=level, stage=stage, duration=round(time.perf_counter() - start, 6), **fields)
+
+
+def read_events(path, stage=None):
+    """Relit un fichier .jsonl (filtré par étape si demandé)."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if stage is None or entry.get("stage") == stage:
+                yield entry
@@ -0,0 +1,207 @@
+"""
+memory.py
+---------
+Empreinte mémoire par composant du pipeline (modèle Vosk, recognizer,
+grammaire, post-traitement...) pour dimensionner le déploiement sur la
+tablette cible (TABLET_RAM_MB, budget applicatif MEMORY_BUDGET_MB).
+
+    from src.common.memory import MemoryProfiler, predict_fit
+
+    profiler = MemoryProfiler()
+    with profiler.component("model_load.fr") as entry:
+        model = Model(DEFAULT_MODEL_FR)
+    prediction = predict_fit({"runtime": profiler.baseline_mb, "models": profiler.delta("model_load.fr")})
+
+Par composant :
+  - RSS avant / après : le delta est l'empreinte résidente conservée ;
+  - pic de RSS pendant l'étape, relevé par un thread d'échantillonnage (le pic
+    noyau du processus ne peut pas être remis à zéro entre deux étapes) ;
+    transitoire = pic - RSS après ;
+  - côté Python (tracemalloc) : mémoire allouée conservée, pic, et lignes de
+    code qui allouent le plus (comparaison d'instantanés avant / après).
+Les allocations natives (Kaldi, torch) ne sont visibles que dans le RSS.
+"""
+
+import os
+import gc
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+import psutil
+
+from src.common.config import MEMORY_BUDGET_MB, TABLET_RAM_MB
+from src.common.run_manifest import atomic_write_json
+
+MB = 1024 * 1024
+# Période d'échantillonnage du RSS (s) et profondeur des piles tracemalloc
+SAMPLE_SEC = 0.005
+TRACE_FRAMES = 1
+TOP_ALLOCATIONS = 10
+
+# Allocations de tracemalloc, du profileur lui-même (thread d'échantillonnage) et des imports : bruit
+_TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, threading.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+
+def rss_mb():
+    """RSS du processus courant (Mo)."""
+    return psutil.Process(os.getpid()).memory_info().rss / MB
+
+
+def peak_rss_mb():
+    """Pic de RSS du processus depuis son démarrage (Mo)."""
+    info = psutil.Process(os.getpid()).memory_info()
+    if hasattr(info, "peak_wset"):
+        # Windows
+        return info.peak_wset / MB
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Ko sous Linux / Android, octets sous macOS
+    return peak / (MB if sys.platform == "darwin" else 1024)
+
+
+class RssSampler:
+    """Thread relevant le RSS toutes les interval secondes : pic pendant un bloc de code."""
+
+    def __init__(self, interval=SAMPLE_SEC):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        process = psutil.Process(os.getpid())
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, process.memory_info().rss / MB)
+
+    def __enter__(self):
+        self.peak = rss_mb()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+        return False
+
+
+def top_allocations(before, after, limit=TOP_ALLOCATIONS):
+    """Lignes de code dont les allocations Python ont le plus augmenté entre deux instantanés."""
+    stats = after.filter_traces(_TRACE_FILTERS).compare_to(before.filter_traces(_TRACE_FILTERS), "lineno")
+    rows = []
+    for stat in stats[:limit]:
+        if stat.size_diff <= 0:
+            break
+        frame = stat.traceback[0]
+        rows.append({
+            "line": f"{frame.filename}:{frame.lineno}",
+            "size_mb": round(stat.size_diff / MB, 3),
+            "count": stat.count_diff,
+        })
+    return rows
+
+
+class MemoryProfiler:
+    def __init__(self, trace=True, interval=SAMPLE_SEC, top=TOP_ALLOCATIONS):
+        """
+        trace : suivi des allocations Python (tracemalloc, ralentit les étapes très
+        allocatrices) ; sans trace, seul le RSS est mesuré.
+        Le RSS à la création (interpréteur + imports) sert de référence : baseline_mb.
+        """
+        self.trace = trace
+        self.interval = interval
+        self.top = top
+        self.components = []
+        # composant -> lignes d'allocation Python (top_allocations)
+        self.allocations = {}
+        if trace and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+        gc.collect()
+        self.baseline_mb = rss_mb()
+
+    @contextmanager
+    def component(self, name, **info):
+        """
+        Mesure un composant ; l'entrée renvoyée peut être complétée dans le bloc
+        (taille de grammaire, taille de matrice...).
+        """
+        entry = {"component": name, **info}
+        gc.collect()
+        before = rss_mb()
+        if self.trace:
+            snapshot = tracemalloc.take_snapshot()
+            traced_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        with RssSampler(self.interval) as sampler:
+            yield entry
+        if self.trace:
+            traced, traced_peak = tracemalloc.get_traced_memory()
+        gc.collect()
+        after = rss_mb()
+        entry.update({
+            "rss_before_mb": round(before, 2),
+            "rss_after_mb": round(after, 2),
+            "rss_delta_mb": round(after - before, 2),
+            "rss_peak_mb": round(sampler.peak, 2),
+            "transient_mb": round(max(0.0, sampler.peak - after), 2),
+        })
+        if self.trace:
+            entry["python_mb"] = round((traced - traced_before) / MB, 3)
+            entry["python_peak_mb"] = round((traced_peak - traced_before) / MB, 3)
+            self.allocations[name] = top_allocations(snapshot, tracemalloc.take_snapshot(), self.top)
+        self.components.append(entry)
+
+    def entry(self, name):
+        for entry in self.components:
+            if entry["component"] == name:
+                return entry
+        return None
+
+    def delta(self, name):
+        """Empreinte résidente d'un composant (Mo, 0 s'il n'a pas été mesuré)."""
+        entry = self.entry(name)
+        return entry["rss_delta_mb"] if entry else 0.0
+
+    def report(self):
+        return {
+            "baseline_mb": round(self.baseline_mb, 2),
+            "rss_mb": round(rss_mb(), 2),
+            "peak_rss_mb": round(peak_rss_mb(), 2),
+            "components": self.components,
+            "allocations": self.allocations,
+        }
+
+    def save(self, path, **extra):
+        atomic_write_json(path, {**self.report(), **extra})
+        return path
+
+
+# ---------------------------------------------------------------------
+# Prédiction sur la tablette
+# ---------------------------------------------------------------------
+def predict_fit(parts, budget_mb=MEMORY_BUDGET_MB, ram_mb=TABLET_RAM_MB):
+    """
+    parts : {poste: Mo} d'une configuration (runtime, modèles, recognizers,
+    grammaire, post-traitement, transitoire...). Renvoie le total prédit, la
+    marge par rapport au budget et le verdict fits.
+    """
+    predicted = sum(parts.values())
+    return {
+        "parts_mb": {name: round(mb, 2) for name, mb in parts.items()},
+        "predicted_mb": round(predicted, 2),
+        "budget_mb": budget_mb,
+        "ram_mb": ram_mb,
+        "headroom_mb": round(budget_mb - predicted, 2),
+        "budget_pct": round(100 * predicted / budget_mb, 1) if budget_mb else None,
+        "fits": predicted <= budget_mb,
+    }
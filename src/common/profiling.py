@@ -0,0 +1,184 @@
+"""
+profiling.py
+------------
+Instrumentation optionnelle des étapes du pipeline STT (conversion ffmpeg,
+AcceptWaveform, parsing JSON, spaCy, CamemBERT, métriques...).
+
+Activation : variable d'environnement ALTUSAFE_PROFILE=1 (ou enable()).
+Désactivée, chaque point de mesure ne coûte qu'un test de booléen.
+
+    from src.common.profiling import profiled, stage
+
+    @profiled("metrics.compute")
+    def compute_metrics(...): ...
+
+    with stage("vosk.accept_waveform"):
+        rec.AcceptWaveform(data)
+
+Par étape : nombre d'appels, temps mur, temps CPU (processus, threads torch
+compris) et temps propre (hors sous-étapes). En fin de run (ou report()) :
+  - tableau récapitulatif dans les logs ;
+  - pile repliée results/profiles/<tag>_<pid>.folded, lisible par
+    flamegraph.pl ou speedscope (une ligne "a;b;c <µs>" par pile).
+"""
+
+import os
+import time
+import atexit
+import logging
+import functools
+import threading
+from contextlib import nullcontext
+
+from src.common.config import PROFILES_DIR
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENV = "ALTUSAFE_PROFILE"
+
+_enabled = os.environ.get(PROFILE_ENV, "") not in ("", "0")
+_atexit_registered = False
+_lock = threading.Lock()
+_local = threading.local()
+# pile (tuple de noms) -> [appels, mur, cpu, propre]
+_stats = {}
+_NULL = nullcontext()
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable():
+    global _enabled, _atexit_registered
+    _enabled = True
+    if not _atexit_registered:
+        atexit.register(report)
+        _atexit_registered = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+class _Stage:
+    __slots__ = ("name", "frame")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        path = (stack[-1][0] + (self.name,)) if stack else (self.name,)
+        # [pile, début mur, début cpu, temps mur des sous-étapes]
+        self.frame = [path, time.perf_counter(), time.process_time(), 0.0]
+        stack.append(self.frame)
+        return self
+
+    def __exit__(self, *exc):
+        path, t0, c0, children = self.frame
+        wall = time.perf_counter() - t0
+        cpu = time.process_time() - c0
+        stack = _local.stack
+        stack.pop()
+        if stack:
+            stack[-1][3] += wall
+        with _lock:
+            entry = _stats.get(path)
+            if entry is None:
+                entry = _stats[path] = [0, 0.0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += wall
+            entry[2] += cpu
+            entry[3] += wall - children
+        return False
+
+
+def stage(name):
+    """Context manager mesurant une étape (sans effet si le profilage est désactivé)."""
+    return _Stage(name) if _enabled else _NULL
+
+
+def profiled(name=None):
+    """Décorateur : mesure chaque appel de la fonction comme une étape."""
+    def decorator(fn):
+        label = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Stage(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ---------------------------------------------------------------------
+# Restitution
+# ---------------------------------------------------------------------
+def stage_totals():
+    """Agrège par nom d'étape : {nom: {calls, wall, cpu, self}}."""
+    totals = {}
+    with _lock:
+        items = list(_stats.items())
+    for path, (calls, wall, cpu, self_time) in items:
+        t = totals.setdefault(path[-1], {"calls": 0, "wall": 0.0, "cpu": 0.0, "self": 0.0})
+        t["calls"] += calls
+        t["self"] += self_time
+        # Une étape récursive n'est comptée qu'une fois dans le temps mur / cpu
+        if path[-1] not in path[:-1]:
+            t["wall"] += wall
+            t["cpu"] += cpu
+    return totals
+
+
+def summary_table():
+    totals = stage_totals()
+    if not totals:
+        return ""
+    root_wall = sum(wall for path, (_, wall, _, _) in _stats.items() if len(path) == 1) or 1e-9
+    lines = [f"{'étape':<32} {'appels':>8} {'mur (s)':>10} {'cpu (s)':>10} {'propre (s)':>11} {'moy (ms)':>10} {'% mur':>7}"]
+    for name, t in sorted(totals.items(), key=lambda kv: -kv[1]["wall"]):
+        lines.append(
+            f"{name[:32]:<32} {t['calls']:>8} {t['wall']:>10.3f} {t['cpu']:>10.3f} {t['self']:>11.3f} "
+            f"{1000 * t['wall'] / t['calls']:>10.2f} {100 * t['wall'] / root_wall:>6.1f}%"
+        )
+    return "\n".join(lines)
+
+
+def dump_folded(path):
+    """Piles repliées (format flamegraph.pl / speedscope), temps propre en microsecondes."""
+    with _lock:
+        items = sorted(_stats.items())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, (_, _, _, self_time) in items:
+            us = int(self_time * 1e6)
+            if us > 0:
+                f.write(f"{';'.join(stack)} {us}\n")
+    return path
+
+
+def report(tag="profile", out_dir=PROFILES_DIR, clear=True):
+    """Écrit le profil replié et logge le tableau récapitulatif. Renvoie le chemin ou None."""
+    if not _stats:
+        return None
+    path = dump_folded(os.path.join(out_dir, f"{tag}_{os.getpid()}.folded"))
+    logger.info(f"Profil des étapes ({tag}) :\n{summary_table()}")
+    logger.info(f"Flame graph : {path}")
+    if clear:
+        reset()
+    return path
+
+
+if _enabled:
+    enable()
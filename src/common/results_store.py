@@ -0,0 +1,197 @@
+"""
+results_store.py
+----------------
+Stockage colonnaire et typé des résultats de benchmark.
+
+Tous les benchmarks écrivent dans un dataset Parquet unique partitionné par
+modèle et par run (results/store/model=.../run_id=.../*.parquet).
+L'analyse charge uniquement les colonnes et partitions utiles (predicate
+pushdown pyarrow) au lieu de re-parser des CSV aux en-têtes différents.
+
+Les anciens CSV de results/ sont lus par `load_legacy_csv` et peuvent être
+importés une fois pour toutes :
+
+    python -m src.common.results_store --import-legacy
+"""
+
+import os
+import re
+import glob
+import uuid
+import argparse
+import numpy as np
+import pandas as pd
+
+from src.common.config import RESULTS_DIR, RESULTS_STORE_DIR
+
+# ---------------------------------------------------------------------
+# Schéma
+# ---------------------------------------------------------------------
+PARTITION_COLS = ["model", "run_id"]
+
+STRING_COLS = [
+    "audio_file", "model", "run_id", "run_key", "source", "dataset",
+    "reference_text", "reference_text_lemma", "transcript", "transcript_lemma",
+]
+FLOAT_COLS = [
+    "latency_sec", "memory_mb", "wer", "wer_token", "levenshtein", "levenshtein_pct",
+    "accuracy", "bleu3", "meteor", "chrf", "rougeL", "duration_sec",
+    "latency_per_sec", "memory_per_sec", "tokens_per_sec", "rtf", "model_load_mb",
+]
+INT_COLS = ["tokens"]
+SCHEMA_COLS = STRING_COLS + FLOAT_COLS + INT_COLS
+
+# En-têtes des anciens CSV -> nom canonique
+LEGACY_RENAMES = {
+    "WER": "wer",
+    "Accuracy": "accuracy",
+    "BLEU3": "bleu3",
+    "METEOR": "meteor",
+    "ROUGE-L": "rougeL",
+    "chrF": "chrf",
+    "reference_lemma": "reference_text_lemma",
+    "transcription_text": "transcript",
+}
+
+
+def _parse_chrf(value):
+    """chrF stocké en float ou sous la forme 'chrF2 = 66.73' (objet sacrebleu sérialisé)."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return np.nan
+    try:
+        return float(str(value).split("=")[-1])
+    except ValueError:
+        return np.nan
+
+
+def normalize_frame(df):
+    """Renomme, type et complète un DataFrame de résultats selon le schéma."""
+    df = df.rename(columns=LEGACY_RENAMES).copy()
+    # En-tête corrompu (ex. wer_scores.csv : 'python -m ...audio_file')
+    for col in list(df.columns):
+        if col != "audio_file" and col.endswith("audio_file") and "audio_file" not in df.columns:
+            df = df.rename(columns={col: "audio_file"})
+
+    for col in SCHEMA_COLS:
+        if col not in df.columns:
+            df[col] = np.nan
+
+    if "chrf" in df.columns and df["chrf"].dtype == object:
+        df["chrf"] = df["chrf"].map(_parse_chrf)
+    for col in FLOAT_COLS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    for col in INT_COLS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").round().astype("Int64")
+    for col in STRING_COLS:
+        df[col] = df[col].where(df[col].notna() & (df[col] != "N/A"), None).astype("string")
+
+    extra = [c for c in df.columns if c not in SCHEMA_COLS]
+    return df[SCHEMA_COLS + extra]
+
+
+# ---------------------------------------------------------------------
+# Écriture
+# ---------------------------------------------------------------------
+def append_results(rows, store_dir=RESULTS_STORE_DIR):
+    """
+    Ajoute des lignes (liste de dicts ou DataFrame) au dataset Parquet.
+    Chaque appel crée un nouveau fichier dans la partition model/run_id :
+    aucune réécriture des données existantes.
+    """
+    df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+    if df.empty:
+        return
+    df = normalize_frame(df)
+    df["model"] = df["model"].fillna("unknown")
+    df["run_id"] = df["run_id"].fillna("unknown")
+    os.makedirs(store_dir, exist_ok=True)
+    df.to_parquet(
+        store_dir,
+        engine="pyarrow",
+        partition_cols=PARTITION_COLS,
+        index=False,
+        basename_template=f"part-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+    )
+
+
+# ---------------------------------------------------------------------
+# Lecture
+# ---------------------------------------------------------------------
+def load_results(store_dir=RESULTS_STORE_DIR, models=None, run_ids=None, columns=None, filters=None):
+    """
+    Charge le dataset en ne lisant que les partitions et colonnes demandées.
+    models / run_ids : listes de valeurs à garder (filtrées au niveau des partitions).
+    filters : filtres pyarrow supplémentaires, ex. [("wer", "<", 0.5)].
+    """
+    if not os.path.isdir(store_dir):
+        return normalize_frame(pd.DataFrame(columns=SCHEMA_COLS))
+
+    predicates = list(filters or [])
+    if models:
+        predicates.append(("model", "in", list(models)))
+    if run_ids:
+        predicates.append(("run_id", "in", list(run_ids)))
+    if columns is not None:
+        columns = list(dict.fromkeys(list(columns) + PARTITION_COLS))
+
+    df = pd.read_parquet(store_dir, engine="pyarrow", columns=columns, filters=predicates or None)
+    for col in PARTITION_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype("string")
+    return df
+
+
+def list_runs(store_dir=RESULTS_STORE_DIR):
+    """Liste (modèle, run_id) présents dans le store, sans lire les données."""
+    runs = []
+    for path in glob.glob(os.path.join(store_dir, "model=*", "run_id=*")):
+        model = os.path.basename(os.path.dirname(path)).split("=", 1)[1]
+        run_id = os.path.basename(path).split("=", 1)[1]
+        runs.append((model, run_id))
+    return sorted(runs)
+
+
+def load_legacy_csv(path):
+    """Lit un ancien CSV de results/ et le ramène au schéma du store."""
+    df = pd.read_csv(path, dtype=str, keep_default_na=False, na_values=["N/A", ""])
+    name = os.path.splitext(os.path.basename(path))[0]
+    if "model" not in df.columns:
+        match = re.match(r"benchmark_(vosk-model[^_]+)", name)
+        df["model"] = match.group(1) if match else name
+    if "run_id" not in df.columns:
+        df["run_id"] = f"legacy-{name}"
+    df["source"] = os.path.basename(path)
+    return normalize_frame(df)
+
+
+def import_legacy(results_dir=RESULTS_DIR, store_dir=RESULTS_STORE_DIR):
+    """Importe tous les CSV de results/ (et sous-dossiers) dans le store."""
+    already = {run_id for _, run_id in list_runs(store_dir)}
+    imported = 0
+    for path in sorted(glob.glob(os.path.join(results_dir, "**", "*.csv"), recursive=True)):
+        df = load_legacy_csv(path)
+        # Ignore les CSV sans métrique (ex. transcriptions de référence)
+        if df.empty or not df[FLOAT_COLS].notna().any().any():
+            continue
+        if df["run_id"].iloc[0] in already:
+            continue
+        append_results(df, store_dir)
+        imported += 1
+        print(f"Importé : {path} ({len(df)} lignes)")
+    return imported
+
+
+# ---------------------------------------------------------------------
+# Exécution principale
+# ---------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Store Parquet des résultats de benchmark")
+    parser.add_argument("--import-legacy", action="store_true", help="Importer les CSV de results/")
+    parser.add_argument("--store_dir", type=str, default=RESULTS_STORE_DIR)
+    args = parser.parse_args()
+
+    if args.import_legacy:
+        n = import_legacy(store_dir=args.store_dir)
+        print(f"{n} fichiers CSV importés dans {args.store_dir}")
+    for model, run_id in list_runs(args.store_dir):
+        print(f"{model}\t{run_id}")
@@ -0,0 +1,246 @@
+"""
+run_manifest.py
+---------------
+Manifeste de run et écriture atomique des résultats de benchmark.
+
+Chaque transcription évaluée est identifiée par une clé
+(modèle, hash du contenu audio, hash du vocabulaire, config).
+Le manifeste garde la liste des clés déjà calculées : un benchmark relancé
+après un crash ne recalcule que le delta et n'ajoute pas de doublons au CSV.
+Chaque lot est aussi ajouté au store Parquet (voir results_store.py).
+"""
+
+import os
+import csv
+import json
+import uuid
+import hashlib
+import tempfile
+from datetime import datetime
+
+from src.common.config import RESULTS_STORE_DIR
+
+# ---------------------------------------------------------------------
+# Hash et identifiants
+# ---------------------------------------------------------------------
+RUN_COLUMNS = ["run_id", "run_key"]
+# Taille des blocs relus depuis la fin du CSV pour trouver la dernière ligne
+TAIL_BLOCK = 1 << 16
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-1 du contenu d'un fichier (lu par blocs)."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def obj_hash(obj):
+    """SHA-1 stable d'un objet JSON-sérialisable (vocabulaire, config...)."""
+    if isinstance(obj, (set, frozenset)):
+        obj = sorted(obj)
+    payload = json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def make_run_key(model, audio_hash, vocab_hash=None, config=None):
+    """Clé unique d'un calcul : (modèle, audio, vocabulaire, config)."""
+    parts = [model, audio_hash, vocab_hash or "-", obj_hash(config or {})]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def new_run_id():
+    """Identifiant de run lisible : horodatage + suffixe aléatoire."""
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+
+# ---------------------------------------------------------------------
+# Écriture atomique
+# ---------------------------------------------------------------------
+def atomic_replace(path, write_fn, mode="w", newline=None):
+    """Écrit via un fichier temporaire du même dossier puis os.replace."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, mode, encoding="utf-8", newline=newline) as f:
+            write_fn(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_json(path, data):
+    atomic_replace(path, lambda f: json.dump(data, f, ensure_ascii=False, indent=2))
+
+
+# ---------------------------------------------------------------------
+# Manifeste
+# ---------------------------------------------------------------------
+class RunManifest:
+    """Ensemble persistant des clés déjà calculées (fichier JSON)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("entries", {})
+
+    @classmethod
+    def for_results(cls, results_csv):
+        """Manifeste rangé à côté du CSV de résultats."""
+        return cls(os.path.splitext(results_csv)[0] + "_manifest.json")
+
+    def is_done(self, key):
+        return key in self.entries
+
+    def record(self, key, run_id, **info):
+        self.entries[key] = {"run_id": run_id, **info}
+
+    def save(self):
+        atomic_write_json(self.path, {"version": 1, "entries": self.entries})
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class BatchedResultWriter:
+    """
+    Accumule les lignes de résultats et les écrit par lots dans le CSV.
+
+    Chaque flush ajoute le lot en fin de CSV (coût proportionnel au lot, pas
+    au fichier), l'ajoute au store Parquet (store_dir=None pour désactiver)
+    puis met à jour le manifeste. Le CSV n'est réécrit de façon atomique
+    (fichier temporaire + os.replace) que si le lot remplace des clés déjà
+    présentes ou si l'en-tête a changé. Une ligne tronquée par un crash
+    pendant l'ajout est retirée à la reprise.
+    """
+
+    def __init__(self, output_csv, header, manifest=None, run_id=None, batch_size=20,
+                 store_dir=RESULTS_STORE_DIR):
+        self.output_csv = output_csv
+        self.header = list(header) + [c for c in RUN_COLUMNS if c not in header]
+        self.manifest = manifest or RunManifest.for_results(output_csv)
+        self.run_id = run_id or new_run_id()
+        self.batch_size = batch_size
+        self.store_dir = store_dir
+        self._pending = []
+        # Clés et en-tête du CSV sur disque (tenus à jour à chaque flush)
+        self._csv_keys = set()
+        self._csv_header = None
+        self._repair_tail()
+        self._reconcile()
+
+    def _read_existing(self):
+        if not os.path.exists(self.output_csv):
+            return []
+        with open(self.output_csv, "r", newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+
+    def _repair_tail(self):
+        """
+        Termine proprement la dernière ligne si elle n'a pas de fin de ligne : conservée
+        (fin de ligne ajoutée) si c'est une ligne complète, au nombre de colonnes de
+        l'en-tête, retirée sinon (crash pendant un ajout). Le fichier n'est jamais vidé.
+        """
+        if not os.path.exists(self.output_csv):
+            return
+        with open(self.output_csv, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # Dernière fin de ligne, en remontant le fichier par blocs
+            cut, end = -1, size
+            while end > 0 and cut < 0:
+                start = max(0, end - TAIL_BLOCK)
+                f.seek(start)
+                pos = f.read(end - start).rfind(b"\n")
+                cut = start + pos if pos >= 0 else -1
+                end = start
+            f.seek(0)
+            header = next(csv.reader([f.readline().decode("utf-8", "replace")]), [])
+            f.seek(cut + 1)
+            fragment = f.read().decode("utf-8", "replace")
+            try:
+                rows = list(csv.reader([fragment], strict=True))
+            except csv.Error:
+                rows = []
+            if cut < 0 or (len(rows) == 1 and len(rows[0]) == len(header)):
+                # En-tête seul ou dernière ligne complète : seule la fin de ligne manque
+                f.seek(0, os.SEEK_END)
+                f.write(b"\n" if fragment.endswith("\r") else b"\r\n")
+            else:
+                f.truncate(cut + 1)
+
+    def _reconcile(self):
+        """Ajoute au manifeste les clés déjà présentes dans le CSV (crash entre CSV et manifeste)."""
+        changed = False
+        if os.path.exists(self.output_csv):
+            with open(self.output_csv, "r", newline="", encoding="utf-8") as f:
+                self._csv_header = next(csv.reader(f), None)
+        for row in self._read_existing():
+            key = row.get("run_key")
+            self._csv_keys.add(key)
+            if key and not self.manifest.is_done(key):
+                self.manifest.record(key, row.get("run_id", ""), audio_file=row.get("audio_file", ""))
+                changed = True
+        if changed:
+            self.manifest.save()
+
+    def is_done(self, key):
+        return self.manifest.is_done(key) or any(r["run_key"] == key for r in self._pending)
+
+    def add(self, key, row):
+        row = dict(row, run_id=self.run_id, run_key=key)
+        self._pending.append(row)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        new_keys = {r["run_key"] for r in self._pending}
+        if self._csv_header == self.header and not new_keys & self._csv_keys:
+            with open(self.output_csv, "a", newline="", encoding="utf-8") as f:
+                csv.DictWriter(f, fieldnames=self.header, extrasaction="ignore").writerows(self._pending)
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            # Nouveau fichier, en-tête différent ou clés recalculées : réécriture complète dédoublonnée
+            rows = [r for r in self._read_existing() if r.get("run_key") not in new_keys]
+            rows.extend(self._pending)
+
+            def _write(f):
+                writer = csv.DictWriter(f, fieldnames=self.header, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(rows)
+
+            atomic_replace(self.output_csv, _write, newline="")
+            self._csv_header = list(self.header)
+        self._csv_keys |= new_keys
+        if self.store_dir:
+            # Import différé : le store charge pandas / numpy, inutiles aux simples
+            # utilisateurs des hash et de l'écriture atomique (g2p, vocabulaire...)
+            from src.common.results_store import append_results
+            append_results(self._pending, self.store_dir)
+        for r in self._pending:
+            self.manifest.record(r["run_key"], self.run_id, audio_file=r.get("audio_file", ""))
+        self.manifest.save()
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
@@ -0,0 +1,322 @@
+"""
+synthetic_generation.py
+-----------------------
+Génération de jeux de test audio synthétiques pour les benchmarks de débit et
+de robustesse au bruit, à partir des segments propres de wav_data_v2 :
+
+    - mélange avec les bruits de NOISE_DIR à un SNR tiré dans --snr (inf : sans bruit) ;
+    - réverbération par une réponse impulsionnelle synthétique (bruit à
+      décroissance exponentielle, durée RT60 tirée dans --rt60, 0 : sans) ;
+    - obstruction du micro par un filtre passe-bas (coupure tirée dans --cutoffs, 0 : sans).
+
+Chaque segment donne --variants éléments ; les paramètres d'un élément ne
+dépendent que de (--seed, numéro de l'élément), pas de l'ordre d'exécution.
+Les éléments sont générés par lots (un shard par lot) dans un pool de processus.
+
+Sortie : SYNTHETIC_DATA_DIR/<nom>/
+    shard_00000.npy ...   PCM int16 concaténé (np.load(mmap_mode="r"))
+    items.csv             item_id, shard, offset, length, source_file, reference_text,
+                          snr_db, rt60, cutoff_hz, seed
+    manifest.json         paramètres, sources (hash), shards, durée totale
+
+SyntheticDataset relit le jeu (tranches mémoire-mappées, sans copie) ; le jeu
+"synthetic" de BENCHMARK_DATASETS l'expose aux benchmarks (WAV exportés à la
+demande dans <nom>/wav/<run_id>/, supprimés à chaque régénération).
+
+    python -m src.data.synthetic_generation --name default --variants 4 --snr inf 20 10 5 0 \\
+        --rt60 0 0.3 0.6 --cutoffs 0 0 2000 --workers 8
+"""
+
+import os
+import logging
+import json
+import shutil
+import wave
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy.signal import butter, fftconvolve, sosfilt
+
+from src.common.config import NOISE_DIR, SAMPLE_RATE, SYNTHETIC_DATA_DIR, TRANSCRIPTS_DIR, WAV_DATA_DIR_v2
+from src.common.run_manifest import atomic_write_json, file_hash, new_run_id, obj_hash
+from src.common.event_log import get_logger, log_stage
+from src.speech.vosk_decode import convert_to_wav, is_vosk_ready
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+NOISE_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".m4a")
+ITEM_COLUMNS = ["item_id", "shard", "offset", "length", "source_file", "reference_text",
+                "snr_db", "rt60", "cutoff_hz", "seed"]
+
+
+# ---------------------------------------------------------------------
+# Lecture
+# ---------------------------------------------------------------------
+def read_wav(path):
+    """WAV (converti si besoin en mono 16 kHz) -> tableau int16."""
+    wav_path = path if is_vosk_ready(path) else convert_to_wav(path)
+    try:
+        with wave.open(wav_path, "rb") as wf:
+            return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    finally:
+        if wav_path != path and os.path.exists(wav_path):
+            os.remove(wav_path)
+
+
+def noise_files(noise_dir=NOISE_DIR):
+    if not os.path.isdir(noise_dir):
+        return []
+    return [os.path.join(noise_dir, f) for f in sorted(os.listdir(noise_dir)) if f.lower().endswith(NOISE_EXTENSIONS)]
+
+
+def load_noise(noise_dir=NOISE_DIR):
+    """Bruits de référence concaténés (int16), None si NOISE_DIR est vide."""
+    parts = [read_wav(path) for path in noise_files(noise_dir)]
+    return np.concatenate(parts) if parts else None
+
+
+# ---------------------------------------------------------------------
+# Dégradations (signal int16 -> int16)
+# ---------------------------------------------------------------------
+def mix_at_snr(speech, noise, snr_db, rng):
+    """
+    Mélange speech avec un extrait aléatoire de noise au SNR demandé. L'extrait est lu
+    circulairement (bruit plus court que la parole) sans copier tout le corpus de bruit.
+    """
+    start = int(rng.integers(0, len(noise)))
+    n = noise[(start + np.arange(len(speech))) % len(noise)].astype(np.float32)
+    s = speech.astype(np.float32)
+    gain = np.sqrt((s ** 2).mean() / max((n ** 2).mean(), 1e-10) / 10 ** (snr_db / 10))
+    return np.clip(s + gain * n, -32768, 32767).astype(np.int16)
+
+
+def synthetic_rir(rt60, rng, rate=SAMPLE_RATE):
+    """Réponse impulsionnelle : trajet direct + queue de bruit décroissant de 60 dB en rt60 secondes."""
+    t = np.arange(int(rt60 * rate)) / rate
+    rir = rng.standard_normal(len(t)).astype(np.float32) * np.exp(-6.908 * t / rt60).astype(np.float32)
+    rir[0] = 1.0
+    return rir / np.sqrt((rir ** 2).sum())
+
+
+def reverberate(samples, rt60, rng, rate=SAMPLE_RATE):
+    x = samples.astype(np.float32)
+    y = fftconvolve(x, synthetic_rir(rt60, rng, rate))[:len(x)]
+    # Niveau RMS conservé
+    y *= np.sqrt((x ** 2).mean() / max((y ** 2).mean(), 1e-10))
+    return np.clip(y, -32768, 32767).astype(np.int16)
+
+
+def lowpass(samples, cutoff, rate=SAMPLE_RATE, order=6):
+    """Obstruction du micro : filtre passe-bas Butterworth."""
+    sos = butter(order, cutoff, btype="low", fs=rate, output="sos")
+    return np.clip(sosfilt(sos, samples.astype(np.float32)), -32768, 32767).astype(np.int16)
+
+
+def degrade(speech, noise, snr_db, rt60, cutoff, rng, rate=SAMPLE_RATE):
+    """Chaîne d'une prise de son dégradée : salle, puis bruit ambiant, puis micro obstrué."""
+    x = speech
+    if rt60 > 0:
+        x = reverberate(x, rt60, rng, rate)
+    if noise is not None and np.isfinite(snr_db):
+        x = mix_at_snr(x, noise, snr_db, rng)
+    if cutoff > 0:
+        x = lowpass(x, cutoff, rate)
+    return x
+
+
+# ---------------------------------------------------------------------
+# Génération d'un shard (processus du pool)
+# ---------------------------------------------------------------------
+_NOISE = None
+
+
+def _init_worker(noise_dir):
+    global _NOISE
+    _NOISE = load_noise(noise_dir)
+
+
+def _generate_shard(out_dir, shard, items, seed):
+    """items : (item_id, chemin source, snr, rt60, coupure) ; écrit shard_<n>.npy, renvoie les lignes."""
+    sources = {}
+    parts, rows, offset = [], [], 0
+    for item_id, source, snr_db, rt60, cutoff in items:
+        if source not in sources:
+            # Une seule source en mémoire : les éléments d'un segment sont consécutifs
+            sources = {source: read_wav(source)}
+        rng = np.random.default_rng([seed, item_id])
+        audio = degrade(sources[source], _NOISE, snr_db, rt60, cutoff, rng)
+        parts.append(audio)
+        rows.append({"item_id": item_id, "shard": shard, "offset": offset, "length": len(audio),
+                     "source_file": os.path.basename(source), "snr_db": snr_db if _NOISE is not None else float("inf"),
+                     "rt60": rt60, "cutoff_hz": cutoff, "seed": seed})
+        offset += len(audio)
+    data = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int16)
+    path = os.path.join(out_dir, f"shard_{shard:05d}.npy")
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, data)
+    os.replace(tmp_path, path)
+    return rows
+
+
+def plan_items(sources, variants, snrs, rt60s, cutoffs, seed):
+    """Paramètres de chaque élément, tirés de façon reproductible."""
+    rng = np.random.default_rng(seed)
+    n = len(sources) * variants
+    return list(zip(
+        range(n),
+        np.repeat(sources, variants).tolist(),
+        rng.choice(snrs, n).tolist(),
+        rng.choice(rt60s, n).tolist(),
+        rng.choice(cutoffs, n).astype(int).tolist(),
+    ))
+
+
+def _reference(source, transcripts_dir=TRANSCRIPTS_DIR):
+    path = os.path.join(transcripts_dir, os.path.splitext(os.path.basename(source))[0] + ".txt")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def generate(name="default", clean_dir=WAV_DATA_DIR_v2, noise_dir=NOISE_DIR, variants=4,
+             snrs=(float("inf"), 20.0, 10.0, 5.0, 0.0), rt60s=(0.0, 0.3, 0.6), cutoffs=(0, 0, 2000),
+             shard_items=256, workers=None, seed=0, out_root=SYNTHETIC_DATA_DIR):
+    sources = sorted(os.path.join(clean_dir, f) for f in os.listdir(clean_dir) if f.lower().endswith(".wav")) \
+        if os.path.isdir(clean_dir) else []
+    if not sources:
+        raise FileNotFoundError(f"Aucun segment propre dans {clean_dir}")
+    out_dir = os.path.join(out_root, name)
+    os.makedirs(out_dir, exist_ok=True)
+    # WAV exportés depuis la génération précédente : ils ne correspondent plus aux shards
+    shutil.rmtree(os.path.join(out_dir, "wav"), ignore_errors=True)
+
+    items = plan_items(sources, variants, list(snrs), list(rt60s), list(cutoffs), seed)
+    shards = [items[i:i + shard_items] for i in range(0, len(items), shard_items)]
+    rows = []
+    with log_stage(logger, "synthetic.generate", items=len(items), shards=len(shards)) as fields:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(noise_dir,)) as pool:
+            futures = [pool.submit(_generate_shard, out_dir, i, shard, seed) for i, shard in enumerate(shards)]
+            for future in futures:
+                rows.extend(future.result())
+        fields.update(samples=sum(r["length"] for r in rows))
+
+    references = {os.path.basename(s): _reference(s) for s in sources}
+    df = pd.DataFrame(rows)
+    df["reference_text"] = df["source_file"].map(references)
+    df = df[ITEM_COLUMNS]
+    df.to_csv(os.path.join(out_dir, "items.csv"), index=False)
+
+    params = {"variants": variants, "snr_db": list(map(float, snrs)), "rt60": list(map(float, rt60s)),
+              "cutoff_hz": list(map(int, cutoffs)), "shard_items": shard_items, "seed": seed}
+    manifest = {
+        "version": FORMAT_VERSION,
+        "name": name,
+        "run_id": new_run_id(),
+        "rate": SAMPLE_RATE,
+        "dtype": "int16",
+        "params": params,
+        "params_hash": obj_hash(params),
+        "sources": {"clean_dir": clean_dir, "files": len(sources)},
+        "noise": [{"path": p, "sha1": file_hash(p)} for p in noise_files(noise_dir)],
+        "shards": [{"file": f"shard_{i:05d}.npy", "items": len(s)} for i, s in enumerate(shards)],
+        "items": len(df),
+        "total_sec": round(float(df["length"].sum()) / SAMPLE_RATE, 2),
+    }
+    atomic_write_json(os.path.join(out_dir, "manifest.json"), manifest)
+    # Shards d'une génération précédente plus grande : absents du nouveau manifeste
+    listed = {shard["file"] for shard in manifest["shards"]}
+    for name in os.listdir(out_dir):
+        if name.startswith("shard_") and name.endswith(".npy") and name not in listed:
+            os.remove(os.path.join(out_dir, name))
+    return out_dir
+
+
+# ---------------------------------------------------------------------
+# Lecture d'un jeu généré
+# ---------------------------------------------------------------------
+class SyntheticDataset:
+    def __init__(self, path):
+        self.path = path
+        manifest_path = os.path.join(path, "manifest.json")
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Format de jeu synthétique incompatible : {path}")
+        self.rate = self.manifest["rate"]
+        self.items = pd.read_csv(os.path.join(path, "items.csv"))
+        self._shards = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def _shard(self, shard):
+        if shard not in self._shards:
+            self._shards[shard] = np.load(os.path.join(self.path, f"shard_{shard:05d}.npy"), mmap_mode="r")
+        return self._shards[shard]
+
+    def audio(self, i):
+        """PCM int16 de l'élément i (vue mémoire-mappée, sans copie)."""
+        row = self.items.iloc[i]
+        return self._shard(int(row["shard"]))[int(row["offset"]):int(row["offset"]) + int(row["length"])]
+
+    def item_name(self, i):
+        row = self.items.iloc[i]
+        return f"syn{int(row['item_id']):06d}_{os.path.splitext(row['source_file'])[0]}.wav"
+
+    def export_wav(self, i, path):
+        with wave.open(path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(self.rate)
+            wf.writeframes(np.ascontiguousarray(self.audio(i)).tobytes())
+        return path
+
+    def as_benchmark_files(self):
+        """
+        (nom, chemin WAV, référence) par élément, comme datasets.load_dataset ; WAV
+        exportés une fois par génération (dossier wav/<run_id> du manifeste).
+        """
+        wav_dir = os.path.join(self.path, "wav", self.manifest["run_id"])
+        os.makedirs(wav_dir, exist_ok=True)
+        files = []
+        for i in range(len(self)):
+            name = self.item_name(i)
+            path = os.path.join(wav_dir, name)
+            if not os.path.exists(path):
+                self.export_wav(i, path)
+            ref = self.items.iloc[i]["reference_text"]
+            files.append((name, path, ref if isinstance(ref, str) else None))
+        return files
+
+
+# ---------------------------------------------------------------------
+# Programme principal
+# ---------------------------------------------------------------------
+def main():
+    get_logger(__name__, "synthetic_generation")
+    parser = argparse.ArgumentParser(description="Génération de jeux audio synthétiques (bruit, réverbération, obstruction)")
+    parser.add_argument("--name", type=str, default="default")
+    parser.add_argument("--clean_dir", type=str, default=WAV_DATA_DIR_v2)
+    parser.add_argument("--noise_dir", type=str, default=NOISE_DIR)
+    parser.add_argument("--variants", type=int, default=4, help="Éléments générés par segment propre")
+    parser.add_argument("--snr", type=float, nargs="+", default=[float("inf"), 20.0, 10.0, 5.0, 0.0],
+                        help="SNR tirés (dB) ; inf : sans bruit")
+    parser.add_argument("--rt60", type=float, nargs="+", default=[0.0, 0.3, 0.6], help="RT60 tirés (s) ; 0 : sans")
+    parser.add_argument("--cutoffs", type=int, nargs="+", default=[0, 0, 2000], help="Coupures passe-bas (Hz) ; 0 : sans")
+    parser.add_argument("--shard_items", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    out_dir = generate(args.name, args.clean_dir, args.noise_dir, args.variants, args.snr, args.rt60, args.cutoffs,
+                       args.shard_items, args.workers, args.seed)
+    dataset = SyntheticDataset(out_dir)
+    logger.info(f"{len(dataset)} éléments, {dataset.manifest['total_sec']} s, "
+                f"{len(dataset.manifest['shards'])} shard(s) -> {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
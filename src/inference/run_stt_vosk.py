@@ -1,39 +1,20 @@
 import os
 import csv
 import json
-import wave
-import logging
 import argparse
-from vosk import Model, KaldiRecognizer
+from vosk import Model
 import Levenshtein  # pip install python-Levenshtein
 
 from src.common.config import INFERENCE_DIR, TRANSCRIPTS_DIR, MODELS_DIR, VOCAB_DATA_DIR
-from src.nlp.medical_postprocessor import MedicalPostProcessorPhonetic
+from src.nlp.medical_postprocessor import PRECISIONS, SCORERS, MedicalPostProcessorPhonetic
+from src.speech.vosk_decode import decode_wav, decode_wav_nbest, decode_wav_words
+from src.micro_detection.mic_obstruction import MicObstructionDetector
+from src.speech.denoise import StreamingDenoiser, noise_profile
+from src.speech.bilingual import STRATEGIES, BilingualRecognizer
+from src.common.profiling import stage
+from src.common.event_log import event, get_logger, log_stage
 
-# ---------------------------------------------------------------------
-# Parser pour le dossier ou fichier audio
-# ---------------------------------------------------------------------
-parser = argparse.ArgumentParser(description="Transcrire des fichiers audio avec Vosk + post-traitement médical")
-parser.add_argument("audio_path", type=str, help="Chemin vers le fichier audio ou le dossier contenant des .wav")
-args = parser.parse_args()
-audio_path = args.audio_path
-
-if not os.path.exists(audio_path):
-    raise FileNotFoundError(f"Le chemin spécifié n'existe pas : {audio_path}")
-
-# ---------------------------------------------------------------------
-# Config / Logs
-# ---------------------------------------------------------------------
-os.makedirs(INFERENCE_DIR, exist_ok=True)
-os.makedirs(TRANSCRIPTS_DIR, exist_ok=True)
-
-LOG_PATH = os.path.join(INFERENCE_DIR, "transcription_inference_vosk.log")
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[logging.FileHandler(LOG_PATH, mode="a", encoding="utf-8"), logging.StreamHandler()]
-)
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__, "transcription_inference_vosk")
 
 # ---------------------------------------------------------------------
 # Chemins
@@ -42,80 +23,109 @@ CSV_PATH = os.path.join(INFERENCE_DIR, "transcription_inference_vosk.csv")
 vosk_model_path = os.path.join(MODELS_DIR, "vosk-model-small-fr-0.22")
 vocab_path = os.path.join(VOCAB_DATA_DIR, "medical_vocab_phon.json")
 
-# ---------------------------------------------------------------------
-# Chargement du modèle Vosk
-# ---------------------------------------------------------------------
-logger.info(f"Chargement du modèle Vosk : {vosk_model_path}")
-model = Model(vosk_model_path)
+CSV_HEADER = [
+    "audio_file",
+    "transcript_file_brut",
+    "transcription_brute",
+    "transcript_file_corrige",
+    "transcription_corrigee",
+    "levenshtein_distance",
+    "levenshtein_distance_normalized",
+    "replacements",
+    "cosine_scores"
+]
 
-# ---------------------------------------------------------------------
-# Chargement du post-traitement médical phonétique
-# ---------------------------------------------------------------------
-processor = MedicalPostProcessorPhonetic(vocab_json_path=vocab_path, threshold=0.7, top_n=5)
 
 # ---------------------------------------------------------------------
 # Liste des fichiers audio à traiter
 # ---------------------------------------------------------------------
-if os.path.isfile(audio_path) and audio_path.endswith(".wav"):
-    audio_files = [audio_path]
-elif os.path.isdir(audio_path):
-    audio_files = [os.path.join(audio_path, f) for f in os.listdir(audio_path) if f.endswith(".wav")]
-else:
+def list_audio_files(audio_path):
+    if not os.path.exists(audio_path):
+        raise FileNotFoundError(f"Le chemin spécifié n'existe pas : {audio_path}")
+    if os.path.isfile(audio_path) and audio_path.endswith(".wav"):
+        return [audio_path]
+    if os.path.isdir(audio_path):
+        return [os.path.join(audio_path, f) for f in os.listdir(audio_path) if f.endswith(".wav")]
     raise ValueError("Le chemin spécifié n'est pas un fichier .wav ou un dossier valide")
 
+
 # ---------------------------------------------------------------------
-# CSV : création si nécessaire
+# Chargement du modèle Vosk + post-traitement médical phonétique
 # ---------------------------------------------------------------------
-csv_exists = os.path.exists(CSV_PATH)
-with open(CSV_PATH, mode="a", newline="", encoding="utf-8") as csv_file:
-    writer = csv.writer(csv_file)
-    if not csv_exists:
-        writer.writerow([
-            "audio_file",
-            "transcript_file_brut",
-            "transcription_brute",
-            "transcript_file_corrige",
-            "transcription_corrigee",
-            "levenshtein_distance",
-            "levenshtein_distance_normalized",
-            "replacements",
-            "cosine_scores"
-        ])
+def load_pipeline(model_path=vosk_model_path, vocab_json_path=vocab_path, scorer="camembert",
+                  embeddings_precision="float32"):
+    logger.info(f"Chargement du modèle Vosk : {model_path}")
+    with stage("vosk.model_load"):
+        model = Model(model_path)
+    with stage("postprocess.load"):
+        processor = MedicalPostProcessorPhonetic(vocab_json_path=vocab_json_path, threshold=0.7, top_n=5, scorer=scorer,
+                                                 embeddings_precision=embeddings_precision)
+    return model, processor
+
 
 # ---------------------------------------------------------------------
-# Boucle sur les fichiers audio
+# Traitement d'un fichier
 # ---------------------------------------------------------------------
-for audio_file in audio_files:
-    logger.info(f"Transcription de {audio_file}")
-
+def process_file(model, processor, audio_file, words=False, nbest=0, mic_check=False, denoiser=None, router=None):
+    """
+    words : active SetWords ; timings / confiances enregistrés dans <nom>_words.json
+    et utilisés pour ne corriger que les mots peu sûrs.
+    nbest : N hypothèses Vosk (SetMaxAlternatives) ; la correction ne départage
+    que ces alternatives au lieu de chercher dans tout le vocabulaire.
+    mic_check : détection de micro obstrué sur les blocs audio envoyés à Vosk
+    (alerte dans le journal d'événements).
+    denoiser : StreamingDenoiser appliqué aux blocs audio avant Vosk (remis à zéro par fichier).
+    router : BilingualRecognizer (modèles FR + EN) ; la langue est choisie par fichier
+    et seul le français passe par le post-traitement médical. Remplace model,
+    words / nbest / mic_check / denoiser ne s'appliquent alors pas.
+    """
     # Transcription brute avec Vosk
-    wf = wave.open(audio_file, "rb")
-    rec = KaldiRecognizer(model, wf.getframerate())
-    text = ""
-    while True:
-        data = wf.readframes(4000)
-        if len(data) == 0:
-            break
-        if rec.AcceptWaveform(data):
-            res = json.loads(rec.Result())
-            text += res.get("text", "") + " "
-    res = json.loads(rec.FinalResult())
-    text += res.get("text", "")
-    text = text.strip()
+    timings = segments = None
+    language = "fr"
+    monitor = MicObstructionDetector(file=audio_file) if mic_check else None
+    if denoiser is not None:
+        denoiser.reset()
+    with log_stage(logger, "decode", file=audio_file):
+        if router is not None:
+            text, language, info = router.transcribe(audio_file)
+            event(logger, "langue détectée", stage="language", file=audio_file, language=language, **info)
+        elif nbest:
+            segments = decode_wav_nbest(model, audio_file, max_alternatives=nbest, monitor=monitor,
+                                        frontend=denoiser)
+            text = " ".join(hypotheses[0][0] for hypotheses in segments)
+        elif words:
+            text, timings = decode_wav_words(model, audio_file, monitor=monitor, frontend=denoiser)
+        else:
+            text = decode_wav(model, audio_file, monitor=monitor, frontend=denoiser)
+    if monitor is not None:
+        event(logger, "contrôle du micro", stage="mic_obstruction", file=audio_file, **monitor.status())
 
     # Sauvegarde de la transcription brute
     base_name = os.path.splitext(os.path.basename(audio_file))[0]
     transcript_path_brut = os.path.join(TRANSCRIPTS_DIR, f"{base_name}_brut.txt")
     with open(transcript_path_brut, "w", encoding="utf-8") as f:
         f.write(text)
-    logger.info(f"Transcription brute sauvegardée : {transcript_path_brut}")
+    event(logger, "transcription brute sauvegardée", stage="save", file=transcript_path_brut)
+    if timings is not None:
+        words_path = os.path.join(TRANSCRIPTS_DIR, f"{base_name}_words.json")
+        timings.save(words_path)
+        event(logger, "timings des mots", stage="words", file=words_path, **timings.stats(processor.conf_threshold))
 
     # Post-traitement médical contextuel
-    corrected_text, replacements, cosine_scores = processor.process_sentence(text)
+    with log_stage(logger, "postprocess", file=audio_file):
+        if language != "fr":
+            # Vocabulaire et modèles de correction français uniquement
+            corrected_text, replacements, cosine_scores = text, {}, {}
+        elif segments is not None:
+            corrected_text, replacements, cosine_scores = processor.process_nbest(segments)
+        else:
+            corrected_text, replacements, cosine_scores = processor.process_sentence(
+                text, confidences=timings.conf if timings is not None else None
+            )
     transcript_path_corrige = os.path.join(TRANSCRIPTS_DIR, f"{base_name}_corrige.txt")
     with open(transcript_path_corrige, "w", encoding="utf-8") as f:
         f.write(corrected_text)
-    logger.info(f"Transcription corrigée sauvegardée : {transcript_path_corrige}")
+    event(logger, "transcription corrigée sauvegardée", stage="save", file=transcript_path_corrige)
 
     # Calcul de la distance de Levenshtein
     lev_dist = Levenshtein.distance(text, corrected_text)
@@ -124,19 +134,70 @@ for audio_file in audio_files:
     # Conversion JSON-safe
     cosine_scores = {k: float(v) for k, v in cosine_scores.items()}
 
-    # Mise à jour du CSV
+    return [
+        audio_file,
+        transcript_path_brut,
+        text,
+        transcript_path_corrige,
+        corrected_text,
+        lev_dist,
+        lev_dist_norm,
+        json.dumps(replacements, ensure_ascii=False),
+        json.dumps(cosine_scores, ensure_ascii=False)
+    ]
+
+
+def append_row(row):
+    csv_exists = os.path.exists(CSV_PATH)
     with open(CSV_PATH, mode="a", newline="", encoding="utf-8") as csv_file:
         writer = csv.writer(csv_file)
-        writer.writerow([
-            audio_file,
-            transcript_path_brut,
-            text,
-            transcript_path_corrige,
-            corrected_text,
-            lev_dist,
-            lev_dist_norm,
-            json.dumps(replacements, ensure_ascii=False),
-            json.dumps(cosine_scores, ensure_ascii=False)
-        ])
-
-    logger.info(f"CSV mis à jour : {CSV_PATH}")
+        if not csv_exists:
+            writer.writerow(CSV_HEADER)
+        writer.writerow(row)
+
+
+# ---------------------------------------------------------------------
+# Programme principal
+# ---------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Transcrire des fichiers audio avec Vosk + post-traitement médical")
+    parser.add_argument("audio_path", type=str, help="Chemin vers le fichier audio ou le dossier contenant des .wav")
+    parser.add_argument("--words", action="store_true", help="Timings et confiances par mot (SetWords)")
+    parser.add_argument("--nbest", type=int, default=0,
+                        help="Nombre d'hypothèses Vosk (SetMaxAlternatives) utilisées comme candidats de correction")
+    parser.add_argument("--scorer", type=str, default="camembert", choices=SCORERS,
+                        help="Rescoring des candidats : CamemBERT ou modèle n-gramme (python -m src.nlp.ngram_lm)")
+    parser.add_argument("--embeddings_precision", type=str, default="float32", choices=PRECISIONS,
+                        help="Stockage des embeddings du vocabulaire (float16 / int8 : mémoire ÷2 / ÷4)")
+    parser.add_argument("--mic_check", action="store_true", help="Alerte si le micro semble obstrué (aigus atténués)")
+    parser.add_argument("--denoise", action="store_true",
+                        help="Débruitage en flux (Wiener) avant Vosk, bruit initialisé par les enregistrements de NOISE_DIR")
+    parser.add_argument("--bilingual", type=str, default=None, choices=STRATEGIES,
+                        help="Modèles FR + EN résidents, langue choisie par fichier (sonde lid ou décodage parallèle)")
+    args = parser.parse_args()
+    if args.bilingual:
+        # Le routeur décode lui-même chaque fichier : ces options ne s'appliquent pas à son décodage
+        ignored = [f"--{name}" for name in ("words", "nbest", "mic_check", "denoise") if getattr(args, name)]
+        if ignored:
+            parser.error(f"--bilingual ne se combine pas avec {', '.join(ignored)}")
+
+    audio_files = list_audio_files(args.audio_path)
+    os.makedirs(INFERENCE_DIR, exist_ok=True)
+    os.makedirs(TRANSCRIPTS_DIR, exist_ok=True)
+
+    model, processor = load_pipeline(scorer=args.scorer, embeddings_precision=args.embeddings_precision)
+    denoiser = StreamingDenoiser(noise_psd=noise_profile()) if args.denoise else None
+    # Le modèle français déjà chargé est réutilisé : seul le modèle anglais s'ajoute
+    router = None
+    if args.bilingual:
+        router = BilingualRecognizer(strategy=args.bilingual)
+        router.models["fr"] = model
+        router.load()
+    for audio_file in audio_files:
+        append_row(process_file(model, processor, audio_file, words=args.words, nbest=args.nbest,
+                                mic_check=args.mic_check, denoiser=denoiser, router=router))
+        event(logger, "CSV mis à jour", stage="save", file=CSV_PATH)
+
+
+if __name__ == "__main__":
+    main()
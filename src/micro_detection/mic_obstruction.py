@@ -0,0 +1,235 @@
+"""
+mic_obstruction.py
+------------------
+Détection en flux d'un micro partiellement obstrué (coque, doigt, tissu).
+
+Un micro couvert se comporte comme un filtre passe-bas : la parole garde son
+énergie sous ~1,5 kHz mais perd les aigus. Le détecteur reçoit les mêmes blocs
+PCM 16 bits que KaldiRecognizer (vosk_decode._decode, paramètre monitor) et
+calcule, vectorisé en NumPy sur les trames de FRAME échantillons du bloc :
+
+    energy_db    énergie de la trame (dB)
+    hf_ratio_db  part de l'énergie au-dessus de HIGH_BAND_HZ (dB)
+    tilt_db_oct  pente spectrale (régression du spectre en dB sur log2(f), dB/octave)
+
+Le plancher de bruit est le 10e centile des énergies récentes ; seules les
+trames de parole (énergie > plancher + SPEECH_MARGIN_DB) alimentent la
+décision, prise sur les dernières WINDOW_FRAMES trames de parole :
+
+    obstrué si hf_ratio_db < hf_threshold_db et tilt_db_oct < tilt_threshold,
+    avec un RSB estimé d'au moins min_snr_db (sinon le bruit masque les aigus).
+
+Le passage à l'état obstrué (et le retour à la normale, avec HYSTERESIS_DB)
+émet un événement "mic_obstruction" dans le journal. Seuils à calibrer avec
+src/benchmarks/mic_obstruction_benchmark.py (balayage sur enregistrements
+filtrés passe-bas).
+
+    from src.micro_detection.mic_obstruction import MicObstructionDetector
+    detector = MicObstructionDetector(file=wav_path)
+    text = decode_wav(model, wav_path, monitor=detector)
+    detector.status()
+
+    python -m src.micro_detection.mic_obstruction data/processed/wav_data_v2/*.wav
+"""
+
+import wave
+import logging
+import argparse
+import numpy as np
+
+from src.common.config import SAMPLE_RATE
+from src.common.profiling import stage
+from src.common.event_log import event, get_logger
+from src.speech.vosk_decode import CHUNK_FRAMES
+
+logger = logging.getLogger(__name__)
+
+FRAME = 512                     # 32 ms à 16 kHz
+HIGH_BAND_HZ = 3000
+TILT_BAND_HZ = (200, 7000)
+HISTORY_FRAMES = 300            # ~10 s pour le plancher de bruit
+WINDOW_FRAMES = 150             # ~5 s de parole pour la décision
+SPEECH_MARGIN_DB = 10.0
+HYSTERESIS_DB = 3.0
+EPS = 1e-10
+
+
+# ---------------------------------------------------------------------
+# Caractéristiques spectrales par trame
+# ---------------------------------------------------------------------
+class SpectralFeatures:
+    """Fenêtre, masques de bandes et projection de la pente, calculés une fois."""
+
+    def __init__(self, rate=SAMPLE_RATE, frame=FRAME):
+        self.frame = frame
+        self.window = np.hanning(frame).astype(np.float32)
+        freqs = np.fft.rfftfreq(frame, 1.0 / rate)
+        self.high = freqs >= HIGH_BAND_HZ
+        self.band = (freqs >= 100) & (freqs <= rate / 2 - 500)
+        tilt = (freqs >= TILT_BAND_HZ[0]) & (freqs <= TILT_BAND_HZ[1])
+        x = np.log2(freqs[tilt])
+        x -= x.mean()
+        # Pente des moindres carrés : spectre_db[tilt] @ proj (dB par octave)
+        self.tilt_idx = np.flatnonzero(tilt)
+        self.tilt_proj = (x / (x ** 2).sum()).astype(np.float32)
+
+    def __call__(self, frames):
+        """frames : (n, frame) float32 -> (énergie totale, énergie haute bande, pente) par trame."""
+        spec = np.fft.rfft(frames * self.window, axis=1)
+        power = spec.real ** 2 + spec.imag ** 2
+        total = power[:, self.band].sum(axis=1)
+        high = power[:, self.high].sum(axis=1)
+        tilt = (10.0 * np.log10(power[:, self.tilt_idx] + EPS)) @ self.tilt_proj
+        return total, high, tilt
+
+
+# ---------------------------------------------------------------------
+# Détecteur en flux
+# ---------------------------------------------------------------------
+class MicObstructionDetector:
+    def __init__(self, rate=SAMPLE_RATE, hf_threshold_db=-28.0, tilt_threshold=-12.0, min_snr_db=15.0,
+                 min_speech_sec=2.0, file=None, log=logger):
+        self.rate = rate
+        self.hf_threshold_db = hf_threshold_db
+        self.tilt_threshold = tilt_threshold
+        self.min_snr_db = min_snr_db
+        self.min_speech_frames = int(min_speech_sec * rate / FRAME)
+        self.file = file
+        self.log = log
+        self.features = SpectralFeatures(rate)
+        self.reset()
+
+    def reset(self):
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._energy = np.zeros(HISTORY_FRAMES, dtype=np.float32)
+        self.noise_floor_db = 0.0
+        # Trames de parole : énergie totale, énergie haute bande, pente
+        self._speech = np.zeros((WINDOW_FRAMES, 3), dtype=np.float64)
+        self._n_frames = 0
+        self._n_speech = 0
+        self.obstructed = False
+        self.alerts = []
+
+    # ------------------ Flux ------------------
+    def update(self, data):
+        """Bloc PCM 16 bits mono (bytes, comme AcceptWaveform) ; renvoie l'état obstrué courant."""
+        with stage("mic.features"):
+            samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+            if len(self._pending):
+                samples = np.concatenate([self._pending, samples])
+            n = len(samples) // FRAME
+            self._pending = samples[n * FRAME:]
+            if n:
+                self._push(samples[:n * FRAME].reshape(n, FRAME))
+        return self.obstructed
+
+    def _push(self, frames):
+        total, high, tilt = self.features(frames)
+        energy_db = 10.0 * np.log10(total + EPS)
+        idx = (self._n_frames + np.arange(len(frames))) % HISTORY_FRAMES
+        self._energy[idx] = energy_db
+        self._n_frames += len(frames)
+        # 10e centile par sélection partielle (np.percentile trie tout l'historique)
+        history = self._energy[:min(self._n_frames, HISTORY_FRAMES)]
+        self.noise_floor_db = float(np.partition(history, len(history) // 10)[len(history) // 10])
+
+        speech = energy_db > self.noise_floor_db + SPEECH_MARGIN_DB
+        k = int(speech.sum())
+        if k:
+            rows = np.column_stack([total[speech], high[speech], tilt[speech]])[-WINDOW_FRAMES:]
+            idx = (self._n_speech + np.arange(len(rows))) % WINDOW_FRAMES
+            self._speech[idx] = rows
+            self._n_speech += k
+            self._decide()
+
+    def _window(self):
+        return self._speech[:min(self._n_speech, WINDOW_FRAMES)]
+
+    def snr_db(self):
+        window = self._window()
+        if not len(window):
+            return 0.0
+        return float(10.0 * np.log10(window[:, 0].mean() + EPS) - self.noise_floor_db)
+
+    def hf_ratio_db(self):
+        window = self._window()
+        return float(10.0 * np.log10((window[:, 1].sum() + EPS) / (window[:, 0].sum() + EPS)))
+
+    def tilt(self):
+        window = self._window()
+        return float(window[:, 2].mean()) if len(window) else 0.0
+
+    # ------------------ Décision ------------------
+    def _decide(self):
+        if self._n_speech < self.min_speech_frames:
+            return
+        hf_ratio, tilt, snr = self.hf_ratio_db(), self.tilt(), self.snr_db()
+        if not self.obstructed:
+            if snr >= self.min_snr_db and hf_ratio < self.hf_threshold_db and tilt < self.tilt_threshold:
+                self._set(True, hf_ratio, tilt, snr)
+        elif hf_ratio > self.hf_threshold_db + HYSTERESIS_DB:
+            self._set(False, hf_ratio, tilt, snr)
+
+    def _set(self, obstructed, hf_ratio, tilt, snr):
+        self.obstructed = obstructed
+        at_sec = round(self._n_frames * FRAME / self.rate, 2)
+        self.alerts.append((at_sec, obstructed))
+        if self.log is not None:
+            msg = "micro obstrué : aigus atténués" if obstructed else "micro dégagé"
+            event(self.log, msg, level=logging.WARNING if obstructed else logging.INFO,
+                  stage="mic_obstruction", file=self.file, obstructed=obstructed, at_sec=at_sec,
+                  hf_ratio_db=round(hf_ratio, 2), tilt_db_oct=round(tilt, 2), snr_db=round(snr, 1))
+
+    def status(self):
+        speech = self._n_speech > 0
+        return {
+            "obstructed": self.obstructed,
+            "alerts": len([a for a in self.alerts if a[1]]),
+            "first_alert_sec": next((t for t, o in self.alerts if o), None),
+            "speech_sec": round(self._n_speech * FRAME / self.rate, 2),
+            "hf_ratio_db": round(self.hf_ratio_db(), 2) if speech else None,
+            "tilt_db_oct": round(self.tilt(), 2) if speech else None,
+            "snr_db": round(self.snr_db(), 1) if speech else None,
+        }
+
+
+def analyze_pcm(data, detector, chunk_frames=CHUNK_FRAMES):
+    """Passe un signal PCM 16 bits (bytes) au détecteur par blocs de chunk_frames échantillons."""
+    step = 2 * chunk_frames
+    for i in range(0, len(data), step):
+        detector.update(data[i:i + step])
+    return detector.status()
+
+
+def analyze_wav(wav_path, chunk_frames=CHUNK_FRAMES, **kwargs):
+    """Analyse d'un WAV mono 16 bits hors reconnaissance (même découpage que vosk_decode)."""
+    with wave.open(wav_path, "rb") as wf:
+        detector = MicObstructionDetector(rate=wf.getframerate(), file=wav_path, **kwargs)
+        while True:
+            data = wf.readframes(chunk_frames)
+            if not data:
+                break
+            detector.update(data)
+    return detector.status()
+
+
+# ---------------------------------------------------------------------
+# Programme principal
+# ---------------------------------------------------------------------
+def main():
+    get_logger(__name__, "mic_obstruction")
+    parser = argparse.ArgumentParser(description="Détection de micro obstrué (caractéristiques spectrales en flux)")
+    parser.add_argument("wav_files", nargs="+")
+    parser.add_argument("--hf_threshold_db", type=float, default=-28.0)
+    parser.add_argument("--tilt_threshold", type=float, default=-12.0)
+    parser.add_argument("--min_snr_db", type=float, default=15.0)
+    args = parser.parse_args()
+
+    for path in args.wav_files:
+        status = analyze_wav(path, hf_threshold_db=args.hf_threshold_db,
+                             tilt_threshold=args.tilt_threshold, min_snr_db=args.min_snr_db)
+        print(f"{path} : {status}")
+
+
+if __name__ == "__main__":
+    main()
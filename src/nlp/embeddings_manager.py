@@ -1,67 +1,218 @@
 # src/nlp/embeddings_manager.py
 import os
 import json
-import torch
 import numpy as np
-from transformers import AutoTokenizer, AutoModel
-from sklearn.metrics.pairwise import cosine_similarity
+
+from src.common.profiling import profiled
+from src.nlp.vocabulary import Vocabulary
+
+# Stockage de la matrice d'embeddings : float32 (référence), float16 (÷2),
+# int8 avec une échelle par vecteur (÷4)
+PRECISIONS = ("float32", "float16", "int8")
+# Lignes converties en float32 à la fois pour le calcul des similarités
+# (mémoire transitoire bornée quelle que soit la taille du vocabulaire)
+BLOCK_ROWS = 8192
+
+
+def quantized_path(cache_path, precision):
+    """Cache dérivé d'une précision : <vocab>_embeddings.<precision>.npy"""
+    return cache_path if precision == "float32" else os.path.splitext(cache_path)[0] + f".{precision}.npy"
+
+
+def quantize(matrix, precision):
+    """
+    Matrice float32 -> (données, échelle par ligne ou None).
+    int8 : q = round(x / s) avec s = max|x| / 127 par vecteur, x ≈ q * s.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if precision == "float32":
+        return matrix, None
+    if precision == "float16":
+        return matrix.astype(np.float16), None
+    if precision == "int8":
+        scale = np.abs(matrix).max(axis=1) / 127.0 if len(matrix) else np.zeros(0, dtype=np.float32)
+        scale[scale == 0] = 1.0
+        q = np.clip(np.rint(matrix / scale[:, None]), -127, 127).astype(np.int8)
+        return q, scale.astype(np.float32)
+    raise ValueError(f"Précision inconnue : {precision} (disponibles : {', '.join(PRECISIONS)})")
+
+
+def dequantize(data, scale=None):
+    """Lignes quantifiées -> float32 (scale : échelles des mêmes lignes)."""
+    rows = np.asarray(data, dtype=np.float32)
+    return rows if scale is None else rows * np.asarray(scale, dtype=np.float32)[:, None]
+
+
+def row_norms(data, block=BLOCK_ROWS):
+    """Norme de chaque ligne (float32), par blocs."""
+    norms = np.empty(len(data), dtype=np.float32)
+    for start in range(0, len(data), block):
+        norms[start:start + block] = np.linalg.norm(np.asarray(data[start:start + block], dtype=np.float32), axis=1)
+    return norms
+
+
+def cosine_scores(queries, data, norms=None, block=BLOCK_ROWS):
+    """
+    Similarités cosinus (requêtes, lignes) avec une matrice float32, float16 ou
+    int8, par blocs convertis en float32. L'échelle int8 d'une ligne se
+    simplifie dans le cosinus : seules les lignes quantifiées et leurs normes
+    (norms, calculées si absentes) interviennent, sans déquantification.
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    q_norms = np.linalg.norm(queries, axis=1)
+    scores = np.zeros((len(queries), len(data)), dtype=np.float32)
+    for start in range(0, len(data), block):
+        rows = np.asarray(data[start:start + block], dtype=np.float32)
+        r_norms = norms[start:start + block] if norms is not None else np.linalg.norm(rows, axis=1)
+        denom = np.outer(q_norms, r_norms)
+        np.divide(queries @ rows.T, denom, out=scores[:, start:start + len(rows)], where=denom > 0)
+    return scores
+
 
 class EmbeddingsManager:
-    def __init__(self, vocab_path, model_name="camembert-base", cache_dir=None):
+    def __init__(self, vocab_path, model_name="camembert-base", cache_dir=None, precision="float32"):
         """
         vocab_path : chemin vers le fichier JSON contenant le vocabulaire
         model_name : modèle Hugging Face à utiliser (ici français biomédical)
         cache_dir : chemin pour sauvegarder le cache des embeddings
+        precision : stockage de la matrice en mémoire (PRECISIONS) ; float16 / int8
+                    sont dérivés du cache float32 et mis en cache à côté
+        La matrice n'est chargée (ou calculée) qu'au premier appel de embedding() /
+        find_best_match : la correction phonétique, qui ne passe que par
+        _get_embedding, n'en porte pas le coût.
         """
+        if precision not in PRECISIONS:
+            raise ValueError(f"Précision inconnue : {precision} (disponibles : {', '.join(PRECISIONS)})")
         self.vocab_path = vocab_path
+        self.precision = precision
         self.model_name = model_name
-        self.cache_path = cache_dir or os.path.splitext(vocab_path)[0] + "_embeddings.pt"
+        self.cache_path = cache_dir or os.path.splitext(vocab_path)[0] + "_embeddings.npy"
+        self.legacy_cache_path = os.path.splitext(vocab_path)[0] + "_embeddings.pt"
 
-        # Charger vocabulaire
-        with open(vocab_path, "r", encoding="utf-8") as f:
-            self.vocab = list(json.load(f))
+        # Charger vocabulaire (ids stables : ligne i de la matrice = mot d'id i)
+        self.vocab = Vocabulary.from_json(vocab_path)
 
-        # Charger modèle Transformers français
+        # Charger modèle Transformers français (import différé : torch/transformers sont lourds)
+        from transformers import AutoTokenizer, AutoModel
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model = AutoModel.from_pretrained(model_name)
 
-        # Charger ou générer embeddings
-        self.embeddings = self._load_or_build_embeddings()
+        # Matrice (mots, dimension) dans la précision demandée (+ échelle par ligne en int8),
+        # chargée au premier accès ; normes des lignes calculées au premier appariement
+        self._embeddings = None
+        self.scale = None
+        self.norms = None
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            self._embeddings = self._load_or_build_embeddings()
+        return self._embeddings
+
+    @property
+    def loaded(self):
+        return self._embeddings is not None
 
+    def release(self, precision=None):
+        """Libère la matrice ; rechargée au prochain accès (dans precision si elle est donnée)."""
+        if precision is not None:
+            if precision not in PRECISIONS:
+                raise ValueError(f"Précision inconnue : {precision} (disponibles : {', '.join(PRECISIONS)})")
+            self.precision = precision
+        self._embeddings = None
+        self.scale = None
+        self.norms = None
+
+    @profiled("camembert.embedding")
     def _get_embedding(self, text):
         """Retourne l'embedding vectoriel moyen d'un texte/mot"""
+        import torch
         inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True)
         with torch.no_grad():
             outputs = self.model(**inputs)
         return outputs.last_hidden_state.mean(dim=1).cpu().numpy()
 
+    def _cache_meta(self):
+        return {"vocab_hash": self.vocab.hash, "model": self.model_name, "words": len(self.vocab)}
+
+    def _load_legacy(self):
+        """Ancien cache .pt {mot: embedding}, réutilisé pour ne pas tout recalculer."""
+        if not os.path.exists(self.legacy_cache_path):
+            return {}
+        import torch
+        import numpy
+        with torch.serialization.safe_globals([numpy._core.multiarray._reconstruct]):
+            return torch.load(self.legacy_cache_path, weights_only=False)
+
     def _load_or_build_embeddings(self):
-        """Charge le cache si présent ou calcule les embeddings"""
-        if os.path.exists(self.cache_path):
-            print(f"Chargement des embeddings depuis le cache : {self.cache_path}")
-            import numpy
-            with torch.serialization.safe_globals([numpy._core.multiarray._reconstruct]):
-                return torch.load(self.cache_path, weights_only=False)
+        """Matrice dans la précision demandée : cache quantifié à jour, sinon dérivé du cache float32."""
+        if self.precision == "float32":
+            return self._load_or_build_float32()
+        path = quantized_path(self.cache_path, self.precision)
+        scale_path = os.path.splitext(path)[0] + ".scale.npy"
+        meta = {**self._cache_meta(), "precision": self.precision}
+        if os.path.exists(path) and os.path.exists(path + ".json") and \
+                (self.precision != "int8" or os.path.exists(scale_path)):
+            with open(path + ".json", "r", encoding="utf-8") as f:
+                if json.load(f) == meta:
+                    print(f"Chargement des embeddings {self.precision} depuis le cache : {path}")
+                    self.scale = np.load(scale_path) if self.precision == "int8" else None
+                    return np.load(path, mmap_mode="r")
+
+        data, self.scale = quantize(self._load_or_build_float32(), self.precision)
+        np.save(path, data)
+        if self.scale is not None:
+            np.save(scale_path, self.scale)
+        with open(path + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        print(f"✅ Embeddings {self.precision} sauvegardés dans : {path}")
+        return data
+
+    def _load_or_build_float32(self):
+        """Charge le cache si présent et à jour (même vocabulaire, même modèle) ou calcule les embeddings"""
+        meta_path = self.cache_path + ".json"
+        if os.path.exists(self.cache_path) and os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                if json.load(f) == self._cache_meta():
+                    print(f"Chargement des embeddings depuis le cache : {self.cache_path}")
+                    return np.load(self.cache_path, mmap_mode="r")
 
         print("Calcul des embeddings du vocabulaire...")
-        embeddings = {}
-        for word in self.vocab:
-            embeddings[word] = self._get_embedding(word)
-        torch.save(embeddings, self.cache_path)
+        legacy = self._load_legacy()
+        rows = []
+        for word in self.vocab.words:
+            emb = legacy.get(word)
+            rows.append(np.asarray(emb if emb is not None else self._get_embedding(word), dtype=np.float32).reshape(-1))
+        hidden = self.model.config.hidden_size
+        embeddings = np.vstack(rows) if rows else np.zeros((0, hidden), dtype=np.float32)
+        np.save(self.cache_path, embeddings)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(self._cache_meta(), f, indent=2)
         print(f"✅ Embeddings sauvegardés dans : {self.cache_path}")
         return embeddings
 
+    def embedding(self, word):
+        """Embedding (1, dim) d'un mot du vocabulaire, None s'il est absent."""
+        idx = self.vocab.id(word)
+        if idx is None:
+            return None
+        rows = self.embeddings[idx:idx + 1]
+        return dequantize(rows, None if self.scale is None else self.scale[idx:idx + 1])
+
     def find_best_match(self, word):
         """Trouve le mot du vocabulaire le plus proche selon la similarité cosine"""
         try:
             word_emb = self._get_embedding(word)
         except Exception:
             return word, 0.0
+        if not len(self.vocab):
+            return word, 0.0
 
-        best_word, best_score = word, 0.0
-        for vocab_word, vocab_emb in self.embeddings.items():
-            score = cosine_similarity(word_emb, vocab_emb)[0][0]
-            if score > best_score:
-                best_score = score
-                best_word = vocab_word
-        return best_word, best_score
+        # Multiplication matricielle par blocs sur tout le vocabulaire, dans la précision stockée
+        if self.norms is None:
+            self.norms = row_norms(self.embeddings)
+        scores = cosine_scores(word_emb, self.embeddings, self.norms)[0]
+        best = int(np.argmax(scores))
+        if scores[best] <= 0.0:
+            return word, 0.0
+        return self.vocab.word(best), float(scores[best])
@@ -0,0 +1,348 @@
+"""
+g2p_fr.py
+---------
+Phonétisation (graphème -> phonème) du français pour le vocabulaire médical.
+
+Deux moteurs :
+  - "rules"      : règles de réécriture du français (aucune dépendance, rapide) ;
+  - "phonemizer" : espeak-ng via phonemizer (optionnel), IPA converti vers le même jeu.
+
+Les phonèmes suivent la notation SAMPA des lexiques Kaldi français
+(a e E i o O u y 2 9 @ a~ e~ o~ 9~ j w H p b t d k g f v s z S Z m n J N l R),
+séparés par des espaces : directement utilisables par lexicon_extra.py.
+
+Les résultats sont mis en cache par mot et par moteur (G2P_CACHE_PATH) ;
+seuls les mots nouveaux sont phonétisés, en parallèle.
+
+Pour la recherche de candidats, chaque prononciation est réduite à une clé
+compacte (un caractère par phonème) indexée par bigrammes (PhoneticIndex).
+"""
+
+import os
+import json
+import unicodedata
+from functools import lru_cache
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import Levenshtein
+
+from src.common.config import G2P_CACHE_PATH
+from src.common.run_manifest import atomic_write_json
+
+BACKENDS = ("rules", "phonemizer")
+RULES_VERSION = 3
+
+# ------------------ Jeu de phonèmes ------------------
+PHONES = (
+    "a", "e", "E", "i", "o", "O", "u", "y", "2", "9", "@", "a~", "e~", "o~", "9~",
+    "j", "w", "H", "p", "b", "t", "d", "k", "g", "f", "v", "s", "z", "S", "Z",
+    "m", "n", "J", "N", "l", "R",
+)
+PHONE_SET = set(PHONES)
+# Un caractère par phonème : les voyelles nasales reçoivent une lettre libre
+KEY_OF = {p: p for p in PHONES if len(p) == 1}
+KEY_OF.update({"a~": "A", "e~": "I", "o~": "U", "9~": "Y"})
+
+IPA_TO_SAMPA = {
+    "a": "a", "ɑ": "a", "e": "e", "ɛ": "E", "i": "i", "o": "o", "ɔ": "O", "u": "u", "y": "y",
+    "ø": "2", "œ": "9", "ə": "@", "ɑ̃": "a~", "ɛ̃": "e~", "ɔ̃": "o~", "œ̃": "9~",
+    "j": "j", "w": "w", "ɥ": "H", "p": "p", "b": "b", "t": "t", "d": "d", "k": "k",
+    "g": "g", "ɡ": "g", "f": "f", "v": "v", "s": "s", "z": "z", "ʃ": "S", "ʒ": "Z",
+    "m": "m", "n": "n", "ɲ": "J", "ŋ": "N", "l": "l", "ʁ": "R", "r": "R",
+}
+
+
+# ------------------ Règles ------------------
+VOWELS = set("aeiouyàâäéèêëîïôöùûüœæ")
+ONSET_SECOND = set("rlh")
+
+
+def _at(word, k):
+    return word[k] if 0 <= k < len(word) else ""
+
+
+def _final(word, j):
+    """Fin de mot, marque du pluriel comprise."""
+    return j >= len(word) or word[j:] == "s"
+
+
+def _nasal(word, i, j):
+    nxt = _at(word, j)
+    return nxt not in VOWELS and nxt not in ("n", "m")
+
+
+def _before_eiy(word, i, j):
+    return _at(word, j) in ("e", "i", "y", "é", "è", "ê")
+
+
+def _closed_e(word, i, j):
+    """'e' suivi de deux consonnes (hors attaque) ou d'une consonne finale prononcée."""
+    c1, c2 = _at(word, j), _at(word, j + 1)
+    if c1 and c1 not in VOWELS and c2 and c2 not in VOWELS:
+        return c2 not in ONSET_SECOND
+    return c1 in ("c", "f", "l", "r") and j + 1 == len(word)
+
+
+# Noms en « -er » prononcé /ER/ (termes médicaux, emprunts) : pas d'infinitif
+ER_NOUNS = frozenset({
+    "cancer", "cathéter", "laser", "scanner", "sphincter", "holter", "doppler", "pacemaker",
+    "alzheimer", "asperger", "blister", "stripper", "flutter", "éther", "ester", "polyester",
+    "master", "poster", "cluster", "starter", "reporter", "leader", "container", "joker",
+    "hamster", "revolver", "bunker", "docker", "poker", "hiver", "enfer", "amer", "cher",
+    "fier", "hier", "mer", "fer", "ver", "super",
+})
+
+
+def _silent_r(word, i, j):
+    """« -er » final d'infinitif ou de « -ier » (parler, infirmier), hors ER_NOUNS."""
+    if not _final(word, j) or len(word) <= 4:
+        return False
+    return word[:j] not in ER_NOUNS
+
+
+# « ill » prononcé /il/ (et non /ij/) : début de mot jusqu'au « ill » compris
+ILL_L_PREFIXES = frozenset({
+    "vill", "mill", "tranquill", "bacill", "capill", "distill", "oscill", "pupill", "axill", "lill",
+})
+
+# Mots dont le « s » final se prononce (termes latins, emprunts, mots courts)
+FINAL_S_WORDS = frozenset({
+    "bus", "as", "os", "fils", "sens", "hélas", "mars", "ours", "vis", "lys", "iris", "oasis", "atlas",
+    "virus", "sinus", "tonus", "utérus", "humérus", "fœtus", "foetus", "lupus", "thymus", "pubis",
+    "pelvis", "anus", "plexus", "mucus", "pus", "tétanus", "cubitus", "rhésus", "hiatus", "stimulus",
+    "processus", "consensus", "bonus", "campus", "cactus", "terminus", "pancréas", "psoriasis",
+    "sepsis", "phimosis", "syphilis", "herpès", "biceps", "triceps", "forceps", "tennis",
+})
+
+
+def _ill_l(word, i, j):
+    return word[:j] in ILL_L_PREFIXES
+
+
+def _silent_final_s(word, i, j):
+    return j == len(word) and len(word) > 2 and word not in FINAL_S_WORDS
+
+
+def _silent_g(word, i, j):
+    """« g » final muet après une nasale (sang, long), y compris devant « t » final (vingt)."""
+    return _at(word, i - 1) == "n" and (j >= len(word) or word[j:] in ("t", "ts", "s"))
+
+
+def _glide(word, i, j):
+    """'i'/'y' devant une voyelle prononcée (pas le 'e' muet final de « -ie »)."""
+    nxt = _at(word, j)
+    return nxt in VOWELS and not (nxt == "e" and _final(word, j + 1))
+
+
+# (graphie, phonèmes, condition(mot, début, fin)) : la première règle applicable l'emporte
+RULES = [
+    ("eaux", "o", lambda w, i, j: _final(w, j)),
+    ("eau", "o", None),
+    ("tion", "s j o~", lambda w, i, j: _at(w, i - 1) not in ("s", "x")),
+    ("sch", "S", None),
+    ("chr", "k R", None),
+    ("chl", "k l", None),
+    ("ch", "S", None),
+    ("ph", "f", None),
+    ("th", "t", None),
+    ("rh", "R", None),
+    ("gn", "J", None),
+    ("qu", "k", None),
+    ("gu", "g", _before_eiy),
+    ("aill", "a j", None), ("eill", "E j", None), ("ouill", "u j", None),
+    ("ill", "i l", _ill_l),
+    ("ill", "j", lambda w, i, j: _at(w, i - 1) in VOWELS),
+    ("ill", "i j", lambda w, i, j: i > 0),
+    ("ain", "e~", _nasal), ("aim", "e~", _nasal), ("ein", "e~", _nasal),
+    ("oin", "w e~", _nasal),
+    ("an", "a~", _nasal), ("am", "a~", _nasal), ("en", "a~", _nasal), ("em", "a~", _nasal),
+    ("ien", "j e~", lambda w, i, j: i > 0 and _nasal(w, i, j) and _at(w, j) not in ("t", "c")),
+    ("in", "e~", _nasal), ("im", "e~", _nasal), ("yn", "e~", _nasal), ("ym", "e~", _nasal),
+    ("on", "o~", _nasal), ("om", "o~", _nasal),
+    ("un", "9~", _nasal), ("um", "9~", lambda w, i, j: _nasal(w, i, j) and not _final(w, j)),
+    ("ai", "E", None), ("aî", "E", None), ("ei", "E", None), ("au", "o", None),
+    ("oi", "w a", None), ("oî", "w a", None),
+    ("ou", "u", None), ("où", "u", None), ("oû", "u", None),
+    ("œu", "2", None), ("eu", "2", None), ("ui", "H i", None),
+    ("er", "e", _silent_r),
+    ("ez", "e", lambda w, i, j: _final(w, j)),
+    # Monosyllabes en « -es » (les, des, ces...) et « est »
+    ("es", "e", lambda w, i, j: i == 1 and j == len(w) and w[0] not in VOWELS),
+    ("est", "E", lambda w, i, j: w == "est"),
+    ("et", "E", lambda w, i, j: _final(w, j) and i > 0),
+    ("cc", "k s", _before_eiy), ("cc", "k", None),
+    ("ss", "s", None),
+    ("c", "s", _before_eiy), ("c", "k", None), ("ç", "s", None),
+    ("g", "", _silent_g), ("g", "Z", _before_eiy), ("g", "g", None),
+    ("s", "z", lambda w, i, j: _at(w, i - 1) in VOWELS and _at(w, j) in VOWELS),
+    ("s", "", _silent_final_s),
+    ("ex", "E g z", lambda w, i, j: i == 0 and _at(w, j) in VOWELS),
+    ("ex", "E k s", lambda w, i, j: i == 0),
+    ("x", "", lambda w, i, j: j == len(w) and len(w) > 2),
+    ("x", "k s", None),
+    ("y", "j", _glide),
+    ("i", "j", lambda w, i, j: i > 0 and _glide(w, i, j)),
+    ("e", "", lambda w, i, j: _final(w, j) and len(w) > 2),
+    ("e", "E", _closed_e),
+    ("e", "@", None),
+    ("t", "", lambda w, i, j: _final(w, j) and len(w) > 2),
+    ("d", "", lambda w, i, j: _final(w, j) and len(w) > 2),
+]
+SINGLE = {
+    "a": "a", "à": "a", "â": "a", "ä": "a", "é": "e", "è": "E", "ê": "E", "ë": "E",
+    "i": "i", "î": "i", "ï": "i", "y": "i", "o": "o", "ô": "o", "ö": "o",
+    "u": "y", "ù": "y", "û": "y", "ü": "y", "œ": "9", "æ": "e", "h": "",
+    "b": "b", "d": "d", "f": "f", "j": "Z", "k": "k", "l": "l", "m": "m", "n": "n",
+    "p": "p", "q": "k", "r": "R", "s": "s", "t": "t", "v": "v", "w": "w", "z": "z",
+}
+DOUBLABLE = set("bdfglmnprtz")
+
+_RULES_BY_CHAR = defaultdict(list)
+for _pattern, _phones, _cond in RULES:
+    _RULES_BY_CHAR[_pattern[0]].append((_pattern, _phones.split(), _cond))
+
+
+def normalize_word(word):
+    return unicodedata.normalize("NFC", word.strip().lower())
+
+
+@lru_cache(maxsize=100_000)
+def g2p_rules(word):
+    """Phonétisation par règles. Renvoie un tuple de phonèmes."""
+    w = normalize_word(word)
+    phones = []
+    i = 0
+    while i < len(w):
+        ch = w[i]
+        if ch in DOUBLABLE and _at(w, i + 1) == ch:
+            i += 1
+            continue
+        for pattern, out, cond in _RULES_BY_CHAR.get(ch, ()):
+            j = i + len(pattern)
+            if w.startswith(pattern, i) and (cond is None or cond(w, i, j)):
+                phones.extend(out)
+                i = j
+                break
+        else:
+            if SINGLE.get(ch):
+                phones.append(SINGLE[ch])
+            i += 1
+    return tuple(phones)
+
+
+def ipa_to_phones(ipa):
+    phones = []
+    for token in ipa.replace("ː", "").split():
+        phone = IPA_TO_SAMPA.get(unicodedata.normalize("NFC", token))
+        if phone:
+            phones.append(phone)
+    return tuple(phones)
+
+
+def g2p_phonemizer(words, workers=1):
+    try:
+        from phonemizer import phonemize
+        from phonemizer.separator import Separator
+    except ImportError as e:
+        raise ImportError("Le moteur 'phonemizer' nécessite phonemizer et espeak-ng") from e
+    ipa = phonemize(
+        list(words), language="fr-fr", backend="espeak", strip=True,
+        separator=Separator(phone=" ", word=" ", syllable=""), njobs=max(workers, 1),
+    )
+    # Repli sur les règles si espeak ne produit rien d'exploitable
+    return [ipa_to_phones(p) or g2p_rules(w) for w, p in zip(words, ipa)]
+
+
+def phones_for(word, stored=None):
+    """Prononciation stockée si elle est dans le jeu de phonèmes, sinon règles (ex. ancien format {w: w})."""
+    if stored:
+        phones = stored.replace(".", " ").split()
+        if phones and set(phones) <= PHONE_SET:
+            return tuple(phones)
+    return g2p_rules(word)
+
+
+# ------------------ Cache + traitement par lots ------------------
+class G2PCache:
+    def __init__(self, path=G2P_CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("rules_version") == RULES_VERSION:
+                self.entries = data.get("entries", {})
+
+    def table(self, backend):
+        return self.entries.setdefault(backend, {})
+
+    def save(self):
+        atomic_write_json(self.path, {"rules_version": RULES_VERSION, "entries": self.entries})
+
+
+def phonetize(words, backend="rules", workers=None, cache_path=G2P_CACHE_PATH, force=False):
+    """
+    Phonétise une liste de mots. Renvoie {mot: "p h o n è m e s"}.
+    Seuls les mots absents du cache sont calculés (en parallèle).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Moteur G2P inconnu : {backend} (attendu : {', '.join(BACKENDS)})")
+    cache = G2PCache(cache_path)
+    table = cache.table(backend)
+    todo = sorted({w for w in words if force or w not in table})
+
+    if todo:
+        workers = workers or os.cpu_count() or 1
+        if backend == "phonemizer":
+            results = g2p_phonemizer(todo, workers)
+        elif workers > 1 and len(todo) > 1000:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(g2p_rules, todo, chunksize=256))
+        else:
+            results = [g2p_rules(w) for w in todo]
+        for w, phones in zip(todo, results):
+            table[w] = " ".join(phones)
+        cache.save()
+
+    return {w: table[w] for w in words}
+
+
+# ------------------ Clés compactes + index ------------------
+def phonetic_key(phones):
+    if isinstance(phones, str):
+        phones = phones.split()
+    return "".join(KEY_OF.get(p, "") for p in phones)
+
+
+def key_distance(key1, key2):
+    """Distance de Levenshtein normalisée entre deux clés phonétiques."""
+    return Levenshtein.distance(key1, key2) / max(len(key1), len(key2), 1)
+
+
+def _bigrams(key):
+    padded = f"^{key}$"
+    return {padded[k:k + 2] for k in range(len(padded) - 1)}
+
+
+class PhoneticIndex:
+    """
+    Index inversé bigramme -> mots. La recherche ne calcule la distance d'édition
+    que sur la présélection des mots partageant le plus de bigrammes.
+    """
+
+    def __init__(self, keys):
+        self.words = list(keys)
+        self.keys = [keys[w] for w in self.words]
+        self.postings = defaultdict(list)
+        for idx, key in enumerate(self.keys):
+            for gram in _bigrams(key):
+                self.postings[gram].append(idx)
+
+    def candidates(self, key, top_n=5, shortlist=50):
+        counts = Counter()
+        for gram in _bigrams(key):
+            counts.update(self.postings.get(gram, ()))
+        ids = [idx for idx, _ in counts.most_common(shortlist)]
+        ids.sort(key=lambda idx: (key_distance(key, self.keys[idx]), self.words[idx]))
+        return [self.words[idx] for idx in ids[:top_n]]
@@ -1,6 +1,8 @@
 import json
 import os
+import argparse
 from src.common.config import VOCAB_DATA_DIR  # chemin centralisé
+from src.nlp.g2p_fr import BACKENDS, phonetize
 
 # Nom du fichier vocab
 vocab_file = "medical_vocab_filtered.json"
@@ -8,23 +10,39 @@ vocab_file = "medical_vocab_filtered.json"
 # Chemin complet vers le vocab
 vocab_path = os.path.join(VOCAB_DATA_DIR, vocab_file)
 
-# Charger le vocabulaire
-try:
-    with open(vocab_path, "r", encoding="utf-8") as f:
-        vocab = json.load(f)  # vocab attendu comme liste de mots
-except FileNotFoundError:
-    raise FileNotFoundError(f"Fichier vocab non trouvé : {vocab_path}")
+# Sauvegarde du dictionnaire phonétique
+phon_file = "medical_vocab_phon.json"
+phon_path = os.path.join(VOCAB_DATA_DIR, phon_file)
 
-if not vocab:
-    raise ValueError(f"Vocabulaire vide dans {vocab_path}")
 
-# Créer dictionnaire phonétique (sans phonemizer)
-vocab_phon = {w: w for w in vocab}  # mot lui-même comme “phonétique”
+def main():
+    parser = argparse.ArgumentParser(description="Dictionnaire phonétique {mot: phonèmes} du vocabulaire médical")
+    parser.add_argument("--backend", type=str, default="rules", choices=BACKENDS)
+    parser.add_argument("--workers", type=int, default=None, help="Processus de phonétisation (défaut : tous les cœurs)")
+    parser.add_argument("--force", action="store_true", help="Ignorer le cache G2P")
+    args = parser.parse_args()
+
+    # Charger le vocabulaire
+    try:
+        with open(vocab_path, "r", encoding="utf-8") as f:
+            vocab = json.load(f)  # vocab attendu comme liste de mots
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Fichier vocab non trouvé : {vocab_path}")
+
+    if not vocab:
+        raise ValueError(f"Vocabulaire vide dans {vocab_path}")
+
+    # Phonèmes SAMPA séparés par des espaces (seuls les mots hors cache sont calculés)
+    vocab_phon = phonetize(vocab, backend=args.backend, workers=args.workers, force=args.force)
+    empty = [w for w, p in vocab_phon.items() if not p]
+    if empty:
+        print(f"{len(empty)} mots sans phonétisation (ex. : {', '.join(empty[:5])})")
+
+    with open(phon_path, "w", encoding="utf-8") as f:
+        json.dump(vocab_phon, f, ensure_ascii=False, indent=2)
+
+    print(f"Dictionnaire phonétique sauvegardé dans {phon_path}")
 
-# Sauvegarder dictionnaire phonétique
-phon_file = "medical_vocab_phon.json"
-phon_path = os.path.join(VOCAB_DATA_DIR, phon_file)
-with open(phon_path, "w", encoding="utf-8") as f:
-    json.dump(vocab_phon, f, ensure_ascii=False, indent=2)
 
-print(f"Dictionnaire phonétique sauvegardé dans {phon_path}")
+if __name__ == "__main__":
+    main()
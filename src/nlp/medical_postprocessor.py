@@ -1,68 +1,177 @@
 # src/nlp/medical_postprocessor.py
 import json
-import Levenshtein
+from difflib import SequenceMatcher
+import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
-from .embeddings_manager import EmbeddingsManager
+from .embeddings_manager import PRECISIONS, EmbeddingsManager, cosine_scores as matrix_cosine
+from src.common.profiling import profiled, stage
+from .g2p_fr import PhoneticIndex, g2p_rules, key_distance, phones_for, phonetic_key
+from .ngram_lm import NgramLM
+from .vocabulary import Vocabulary
+
+SCORERS = ("camembert", "ngram")
+
+
+def nbest_candidates(segments):
+    """
+    Aligne les hypothèses N-best de Vosk (decode_wav_nbest) sur le 1-best.
+    segments : [[(texte, score), ...], ...], la première hypothèse de chaque segment étant le 1-best.
+    Renvoie (phrase 1-best, {position du mot: [mots alternatifs, par rang d'hypothèse]}) :
+    seules les substitutions mot à mot sont retenues comme candidats.
+    """
+    words, candidates = [], {}
+    for hypotheses in segments:
+        best = hypotheses[0][0].split()
+        offset = len(words)
+        for text, _ in hypotheses[1:]:
+            alt = text.split()
+            matcher = SequenceMatcher(None, best, alt, autojunk=False)
+            for op, i1, i2, j1, j2 in matcher.get_opcodes():
+                if op != "replace" or i2 - i1 != j2 - j1:
+                    continue
+                for k in range(i2 - i1):
+                    cands = candidates.setdefault(offset + i1 + k, [])
+                    if alt[j1 + k] not in cands:
+                        cands.append(alt[j1 + k])
+        words.extend(best)
+    return " ".join(words), candidates
+
 
 class MedicalPostProcessorPhonetic:
-    def __init__(self, vocab_json_path, threshold=0.5, top_n=5):
+    def __init__(self, vocab_json_path, threshold=0.5, top_n=5, conf_threshold=0.9,
+                 scorer="camembert", lm=None, lm_margin=0.0, embeddings_precision="float32"):
         """
         Post-traitement phonétique + sémantique avec vocabulaire pré-calculé.
-        vocab_json_path : chemin vers le JSON phonétique {mot: phonétique}
+        vocab_json_path : chemin vers le JSON phonétique {mot: phonèmes} (generate_vocab_phon.py)
+        conf_threshold : avec les confiances Vosk, les mots au-dessus de ce seuil ne sont pas corrigés
+        scorer : "camembert" (similarité cosinus de la phrase, seuil threshold) ou
+                 "ngram" (gain de log10-probabilité du modèle n-gramme par rapport
+                 au mot d'origine, remplacement si gain > lm_margin)
+                 En N-best, le mot du 1-best est lui-même candidat : voir _nbest_scores
+        lm : NgramLM déjà chargé (défaut : NgramLM.load() depuis NGRAM_LM_DIR)
+        embeddings_precision : stockage de la matrice d'embeddings du vocabulaire
+                               (PRECISIONS : float32, float16, int8)
         """
+        if scorer not in SCORERS:
+            raise ValueError(f"Scorer inconnu : {scorer} (disponibles : {', '.join(SCORERS)})")
         with open(vocab_json_path, "r", encoding="utf-8") as f:
             self.vocab_phon = json.load(f)
+        # Appartenance au vocabulaire médical (trie) : ces mots sont déjà corrects
+        self.vocab = Vocabulary.from_words(self.vocab_phon)
 
-        self.emb_manager = EmbeddingsManager(vocab_json_path)
+        # Clés phonétiques compactes (un caractère par phonème) + index de recherche
+        self.vocab_keys = {w: phonetic_key(phones_for(w, p)) for w, p in self.vocab_phon.items()}
+        self.index = PhoneticIndex(self.vocab_keys)
+
+        # CamemBERT n'est chargé que s'il sert au rescoring
+        self.scorer = scorer
+        self.emb_manager = EmbeddingsManager(vocab_json_path, precision=embeddings_precision) \
+            if scorer == "camembert" else None
+        self.lm = (lm or NgramLM.load()) if scorer == "ngram" else None
+        self.lm_margin = lm_margin
         self.threshold = threshold
         self.top_n = top_n
+        self.conf_threshold = conf_threshold
+        # Nombre de phrases candidates évaluées par le scorer (coût du rescoring)
+        self.candidates_scored = 0
+
+    def _phonetic_key(self, word):
+        key = self.vocab_keys.get(word)
+        return key if key is not None else phonetic_key(g2p_rules(word))
 
     def _phonetic_distance(self, word1, word2):
         """Distance Levenshtein normalisée entre deux représentations phonétiques"""
-        phon1 = self.vocab_phon.get(word1, word1)
-        phon2 = self.vocab_phon.get(word2, word2)
-        dist = Levenshtein.distance(phon1, phon2)
-        max_len = max(len(phon1), len(phon2), 1)
-        return dist / max_len
+        return key_distance(self._phonetic_key(word1), self._phonetic_key(word2))
 
-    def process_sentence(self, sentence: str):
+    @profiled("postprocess.sentence")
+    def process_sentence(self, sentence: str, confidences=None, candidates=None):
         """
         Corrige une phrase selon la similarité phonétique et sémantique contextuelle.
+        confidences : confiance Vosk de chaque mot (WordTimings.conf) ; les mots
+        sûrs sont conservés sans recherche de candidats ni passe CamemBERT.
+        candidates : {position: [mots]} (nbest_candidates) ; remplace la recherche
+        phonétique dans le vocabulaire, les positions absentes sont conservées.
+        Une alternative ne remplace le mot du 1-best que si elle bat son score.
         """
         words = sentence.split()
+        if confidences is not None and len(confidences) != len(words):
+            confidences = None
+        if candidates is not None and not candidates:
+            # N-best unanime : rien à départager
+            return sentence, {}, {}
         corrected_words = []
         replacements = {}
         cosine_scores = {}
 
         # Embedding de la phrase originale
-        phrase_emb_original = self.emb_manager._get_embedding(sentence)
+        if self.emb_manager is not None and candidates is None:
+            phrase_emb_original = self.emb_manager._get_embedding(sentence)
 
         for i, word in enumerate(words):
-            # Sélection des N mots phonétiquement les plus proches
-            candidates = sorted(
-                self.vocab_phon.keys(),
-                key=lambda w: self._phonetic_distance(word, w)
-            )[:self.top_n]
+            if confidences is not None and confidences[i] >= self.conf_threshold:
+                corrected_words.append(word)
+                continue
+            if candidates is None and word in self.vocab:
+                # Mot médical connu : le meilleur candidat serait lui-même
+                corrected_words.append(word)
+                continue
+
+            if candidates is not None:
+                # Le mot du 1-best concourt avec les alternatives alignées
+                alternatives = [c for c in candidates.get(i, []) if c != word][:self.top_n]
+                if not alternatives:
+                    corrected_words.append(word)
+                    continue
+                scores = self._nbest_scores(words, i, [word] + alternatives)
+                best = max(range(len(scores)), key=scores.__getitem__)
+                margin = self.lm_margin if self.lm is not None else 0.0
+                if best > 0 and scores[best] - scores[0] > margin:
+                    corrected_words.append(alternatives[best - 1])
+                    replacements[word] = alternatives[best - 1]
+                    cosine_scores[word] = float(scores[best])
+                else:
+                    corrected_words.append(word)
+                continue
+
+            # Candidats : les N mots phonétiquement les plus proches (via l'index de bigrammes)
+            with stage("postprocess.candidates"):
+                word_candidates = self.index.candidates(self._phonetic_key(word), self.top_n)
+                if not word_candidates:
+                    word_candidates = sorted(
+                        self.vocab_phon.keys(),
+                        key=lambda w: self._phonetic_distance(word, w)
+                    )[:self.top_n]
+            if not word_candidates:
+                corrected_words.append(word)
+                continue
 
             best_word = word
             best_score = -1.0
+            if self.lm is not None:
+                # Seuls les n-grammes contenant le mot i changent d'une variante à l'autre
+                original_lm_score = self.lm.score_window(words, i)
+                best_score = float("-inf")
 
             #  Test contextuel : remplace le mot dans la phrase et compare l'embedding global
-            for candidate in candidates:
-                test_phrase = " ".join(
-                    words[:i] + [candidate] + words[i + 1 :]
-                )
-                phrase_emb_candidate = self.emb_manager._get_embedding(test_phrase)
-                score = cosine_similarity(
-                    phrase_emb_candidate, phrase_emb_original
-                )[0][0]
+            #  (ou la probabilité n-gramme locale)
+            for candidate in word_candidates:
+                self.candidates_scored += 1
+                test_words = words[:i] + [candidate] + words[i + 1 :]
+                if self.lm is not None:
+                    score = self.lm.score_window(test_words, i) - original_lm_score
+                else:
+                    phrase_emb_candidate = self.emb_manager._get_embedding(" ".join(test_words))
+                    score = cosine_similarity(
+                        phrase_emb_candidate, phrase_emb_original
+                    )[0][0]
 
                 if score > best_score:
                     best_score = score
                     best_word = candidate
 
             # Appliquer le remplacement si le score dépasse le seuil
-            if best_score >= self.threshold:
+            accepted = best_score > self.lm_margin if self.lm is not None else best_score >= self.threshold
+            if accepted:
                 corrected_words.append(best_word)
                 if best_word != word:
                     replacements[word] = best_word
@@ -72,3 +181,26 @@ class MedicalPostProcessorPhonetic:
 
         corrected_sentence = " ".join(corrected_words)
         return corrected_sentence, replacements, cosine_scores
+
+    def _nbest_scores(self, words, i, word_candidates):
+        """
+        Score absolu de chaque candidat à la position i, sans référence au 1-best
+        (la similarité à la phrase d'origine favoriserait toujours son propre mot) :
+        log10-probabilité n-gramme locale, ou adéquation au contexte = cosinus entre
+        l'embedding de la phrase privée du mot i et celui du candidat (ligne de la
+        matrice du vocabulaire, CamemBERT pour un mot hors vocabulaire).
+        """
+        self.candidates_scored += len(word_candidates)
+        if self.lm is not None:
+            return [self.lm.score_window(words[:i] + [c] + words[i + 1:], i) for c in word_candidates]
+        context = self.emb_manager._get_embedding(" ".join(words[:i] + words[i + 1:]))
+        rows = []
+        for candidate in word_candidates:
+            emb = self.emb_manager.embedding(candidate)
+            rows.append(emb if emb is not None else self.emb_manager._get_embedding(candidate))
+        return matrix_cosine(context, np.vstack(rows))[0].tolist()
+
+    def process_nbest(self, segments):
+        """Corrige le 1-best en ne départageant que les alternatives N-best de Vosk (decode_wav_nbest)."""
+        sentence, candidates = nbest_candidates(segments)
+        return self.process_sentence(sentence, candidates=candidates)
@@ -0,0 +1,302 @@
+"""
+ngram_lm.py
+-----------
+Modèle de langue n-gramme compact (ordre 3 par défaut) appris sur les
+transcriptions (results/transcriptions.csv + .txt de TRANSCRIPTS_DIR), utilisé
+comme score de rescoring des candidats de correction à la place de CamemBERT.
+
+Stockage (dossier NGRAM_LM_DIR) :
+    vocab.json          mot -> id
+    meta.json           ordre, alpha, total, version
+    keys_<n>.npy        clés uint64 triées des n-grammes d'ordre n
+    counts_<n>.npy      effectifs uint32 alignés sur les clés
+Les tables sont mémoire-mappées (np.load(mmap_mode="r")) : plusieurs processus
+partagent les mêmes pages, le chargement ne lit rien de plus que vocab.json.
+
+Clé d'un n-gramme : ids empaquetés sur 21 bits (ordre <= 3, vocabulaire < 2M mots),
+donc sans collision. Lissage "stupid backoff" (Brants et al. 2007) : il ne
+demande que des effectifs, une recherche dichotomique par ordre suffit.
+
+    python -m src.nlp.ngram_lm --order 3
+"""
+
+import os
+import re
+import csv
+import json
+import math
+import argparse
+from collections import Counter
+import numpy as np
+
+from src.common.config import NGRAM_LM_DIR, RESULTS_DIR, TRANSCRIPTS_DIR
+from src.common.profiling import profiled
+
+CORPUS_CSV = os.path.join(RESULTS_DIR, "transcriptions.csv")
+TOKEN_RE = re.compile(r"[a-zàâäçéèêëîïôöùûüÿœæ'-]+")
+
+FORMAT_VERSION = 2
+BITS = 21
+MAX_ORDER = 3
+BOS, EOS, UNK = "<s>", "</s>", "<unk>"
+CACHE_SIZE = 1 << 20
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def iter_sentences(csv_path=CORPUS_CSV, transcripts_dir=TRANSCRIPTS_DIR, exclude=()):
+    """
+    Phrases tokenisées du corpus. exclude : noms de base (sans extension) des
+    fichiers à écarter, pour évaluer sur des transcriptions non vues.
+    """
+    exclude = set(exclude)
+    if csv_path and os.path.exists(csv_path):
+        with open(csv_path, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                names = {os.path.splitext(os.path.basename(v or ""))[0] for k, v in row.items() if k and k.endswith("audio_file")}
+                if names & exclude:
+                    continue
+                for sentence in re.split(r"[.!?\n]+", row.get("transcription_text", "")):
+                    tokens = tokenize(sentence)
+                    if tokens:
+                        yield tokens
+    if transcripts_dir and os.path.isdir(transcripts_dir):
+        for name in sorted(os.listdir(transcripts_dir)):
+            # Les sorties de run_stt_vosk (_brut / _corrige) ne sont pas des références
+            base, ext = os.path.splitext(name)
+            if ext != ".txt" or base in exclude or base.endswith(("_brut", "_corrige")):
+                continue
+            with open(os.path.join(transcripts_dir, name), "r", encoding="utf-8") as f:
+                for sentence in re.split(r"[.!?\n]+", f.read()):
+                    tokens = tokenize(sentence)
+                    if tokens:
+                        yield tokens
+
+
+def _pack(ids):
+    key = 0
+    for i in ids:
+        key = (key << BITS) | i
+    return key
+
+
+def _window_keys(ids, n):
+    """Clés de toutes les fenêtres de longueur n (une par position de départ)."""
+    count = len(ids) - n + 1
+    keys = np.zeros(max(count, 0), dtype=np.uint64)
+    for k in range(n):
+        keys = (keys << np.uint64(BITS)) | ids[k:k + count]
+    return keys
+
+
+class NgramLM:
+    def __init__(self, vocab, tables, total, order=MAX_ORDER, alpha=0.4):
+        """
+        vocab : {mot: id} ; tables : {n: (clés uint64 triées, effectifs)} ;
+        total : nombre de tokens du corpus (dénominateur des unigrammes).
+        """
+        self.vocab = vocab
+        self.tables = tables
+        self.total = total
+        self.order = order
+        self.alpha = alpha
+        self.unk_id = vocab[UNK]
+        self.bos_id = vocab[BOS]
+        self.eos_id = vocab[EOS]
+        self._log_alpha = math.log10(alpha)
+        # Cache des effectifs déjà lus : les candidats d'un même mot partagent leur contexte
+        self._cache = {}
+        # Mot inconnu : masse d'un demi-token au niveau unigramme, pénalité de repli maximale
+        self.unk_logprob = (order - 1) * self._log_alpha + math.log10(0.5 / (total + len(vocab)))
+
+    # ------------------ Apprentissage ------------------
+    @classmethod
+    def train(cls, sentences, order=MAX_ORDER, min_count=1, alpha=0.4):
+        if not 1 <= order <= MAX_ORDER:
+            raise ValueError(f"Ordre non supporté : {order} (1 à {MAX_ORDER})")
+        sentences = [s for s in sentences if s]
+        freqs = Counter(w for s in sentences for w in s)
+        vocab = {BOS: 0, EOS: 1, UNK: 2}
+        for word, count in freqs.most_common():
+            if count >= min_count:
+                vocab[word] = len(vocab)
+        if len(vocab) >= 1 << BITS:
+            raise ValueError(f"Vocabulaire trop grand pour des ids sur {BITS} bits : {len(vocab)}")
+
+        counters = {n: Counter() for n in range(1, order + 1)}
+        total = 0
+        for s in sentences:
+            ids = [0] * (order - 1) + [vocab.get(w, 2) for w in s] + [1]
+            total += len(s) + 1
+            # Seuls les n-grammes finissant sur le dernier <s> ou après : <s> et (<s>, <s>) sont
+            # comptés une fois par phrase, comme historiques des premiers mots
+            for n in range(1, order + 1):
+                counter = counters[n]
+                for p in range(max(0, order - 1 - n), len(ids) - n + 1):
+                    counter[_pack(ids[p:p + n])] += 1
+
+        tables = {}
+        for n, counter in counters.items():
+            keys = np.fromiter(sorted(counter), dtype=np.uint64, count=len(counter))
+            counts = np.array([min(counter[int(k)], 0xFFFFFFFF) for k in keys], dtype=np.uint32)
+            tables[n] = (keys, counts)
+        return cls(vocab, tables, total, order=order, alpha=alpha)
+
+    @classmethod
+    def from_corpus_stats(cls, stats, alpha=0.4):
+        """
+        Modèle bigramme directement depuis les tables de corpus_stats.py (mêmes ids,
+        marqueurs compris), sans relire le corpus.
+        """
+        if len(stats.words) >= 1 << BITS:
+            raise ValueError(f"Vocabulaire trop grand pour des ids sur {BITS} bits : {len(stats.words)}")
+        unigram_keys = np.arange(len(stats.words), dtype=np.uint64)
+        keys = np.asarray(stats.bigram_keys, dtype=np.uint64)
+        # id1 << 32 | id2 -> id1 << BITS | id2 (l'ordre de tri est conservé)
+        bigram_keys = ((keys >> np.uint64(32)) << np.uint64(BITS)) | (keys & np.uint64(0xFFFFFFFF))
+        tables = {
+            1: (unigram_keys, np.asarray(stats.unigram_counts, dtype=np.uint32)),
+            2: (bigram_keys, np.asarray(stats.bigram_counts, dtype=np.uint32)),
+        }
+        total = int(stats.meta["tokens"]) + int(stats.meta["sentences"])
+        return cls(dict(stats.ids), tables, total, order=2, alpha=alpha)
+
+    # ------------------ Persistance ------------------
+    def save(self, path=NGRAM_LM_DIR):
+        os.makedirs(path, exist_ok=True)
+        for n, (keys, counts) in self.tables.items():
+            np.save(os.path.join(path, f"keys_{n}.npy"), keys)
+            np.save(os.path.join(path, f"counts_{n}.npy"), counts)
+        with open(os.path.join(path, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(self.vocab, f, ensure_ascii=False)
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": FORMAT_VERSION, "order": self.order, "alpha": self.alpha,
+                       "total": self.total, "bits": BITS,
+                       "ngrams": {n: len(k) for n, (k, _) in self.tables.items()}}, f, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, path=NGRAM_LM_DIR, mmap=True):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION or meta.get("bits") != BITS:
+            raise ValueError(f"Format de modèle n-gramme incompatible : {path}")
+        with open(os.path.join(path, "vocab.json"), "r", encoding="utf-8") as f:
+            vocab = json.load(f)
+        mode = "r" if mmap else None
+        tables = {
+            n: (np.load(os.path.join(path, f"keys_{n}.npy"), mmap_mode=mode),
+                np.load(os.path.join(path, f"counts_{n}.npy"), mmap_mode=mode))
+            for n in range(1, meta["order"] + 1)
+        }
+        return cls(vocab, tables, meta["total"], order=meta["order"], alpha=meta["alpha"])
+
+    # ------------------ Score ------------------
+    def _ids(self, words):
+        get, unk = self.vocab.get, self.unk_id
+        return [get(w, unk) for w in words]
+
+    def _counts(self, n, keys):
+        table_keys, table_counts = self.tables[n]
+        if not len(table_keys):
+            return np.zeros(len(keys), dtype=np.float64)
+        idx = np.minimum(np.searchsorted(table_keys, keys), len(table_keys) - 1)
+        found = table_keys[idx] == keys
+        return np.where(found, table_counts[idx], 0).astype(np.float64)
+
+    def _count(self, n, key):
+        cache_key = (n, key)
+        count = self._cache.get(cache_key)
+        if count is None:
+            table_keys, table_counts = self.tables[n]
+            idx = int(np.searchsorted(table_keys, np.uint64(key)))
+            count = int(table_counts[idx]) if idx < len(table_keys) and int(table_keys[idx]) == key else 0
+            if len(self._cache) >= CACHE_SIZE:
+                self._cache.clear()
+            self._cache[cache_key] = count
+        return count
+
+    def _logprob_at(self, ids, t):
+        """Version scalaire (fenêtres courtes) : log10 P(ids[t] | ids[t-order+1:t])."""
+        for n in range(self.order, 0, -1):
+            c = self._count(n, _pack(ids[t - n + 1:t + 1]))
+            if not c:
+                continue
+            h = self._count(n - 1, _pack(ids[t - n + 1:t])) if n > 1 else self.total
+            if h:
+                return math.log10(c / h) + (self.order - n) * self._log_alpha
+        return self.unk_logprob
+
+    def _logprobs(self, ids):
+        """log10 P(mot | historique) pour chaque position >= order-1 de la séquence d'ids."""
+        ids = np.asarray(ids, dtype=np.uint64)
+        order = self.order
+        targets = len(ids) - order + 1
+        if targets <= 0:
+            return np.zeros(0)
+        # Effectifs de toutes les fenêtres de longueur 1..order, alignés sur la cible
+        counts = {}
+        for n in range(1, order + 1):
+            start = order - n
+            counts[n] = self._counts(n, _window_keys(ids[start:], n))[:targets]
+        hist = {n: self._counts(n, _window_keys(ids[order - n - 1:len(ids) - 1], n))[:targets]
+                for n in range(1, order)}
+
+        logp = np.full(targets, self.unk_logprob)
+        done = np.zeros(targets, dtype=bool)
+        for n in range(order, 0, -1):
+            c = counts[n]
+            h = hist[n - 1] if n > 1 else np.full(targets, float(self.total))
+            hit = ~done & (c > 0) & (h > 0)
+            if hit.any():
+                logp[hit] = np.log10(c[hit] / h[hit]) + (order - n) * self._log_alpha
+                done |= hit
+        return logp
+
+    @profiled("ngram.score")
+    def score_sentence(self, words):
+        """log10 de la probabilité de la phrase (avec <s> et </s>)."""
+        ids = [self.bos_id] * (self.order - 1) + self._ids(words) + [self.eos_id]
+        return float(self._logprobs(ids).sum())
+
+    def score_window(self, words, i):
+        """
+        Somme des log-probabilités qui dépendent du mot i (les `order` n-grammes qui
+        le contiennent) : suffit pour comparer deux variantes ne différant qu'en i.
+        """
+        pad = self.order - 1
+        padded = [BOS] * pad + list(words) + [EOS]
+        get, unk = self.vocab.get, self.unk_id
+        ids = [get(w, unk) for w in padded[i:i + 2 * pad + 1]]
+        return sum(self._logprob_at(ids, t) for t in range(pad, len(ids)))
+
+
+# ---------------------------------------------------------------------
+# Programme principal
+# ---------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Apprentissage du modèle n-gramme de rescoring")
+    parser.add_argument("--csv", type=str, default=CORPUS_CSV)
+    parser.add_argument("--transcripts_dir", type=str, default=TRANSCRIPTS_DIR)
+    parser.add_argument("--order", type=int, default=MAX_ORDER)
+    parser.add_argument("--min_count", type=int, default=1)
+    parser.add_argument("--output_dir", type=str, default=NGRAM_LM_DIR)
+    parser.add_argument("--from_stats", type=str, default=None,
+                        help="Dossier de corpus_stats.py : modèle bigramme construit depuis les tables persistées")
+    args = parser.parse_args()
+
+    if args.from_stats:
+        # Bigramme sans relecture du corpus (python -m src.processing_data.corpus_stats)
+        from src.processing_data.corpus_stats import CorpusStats
+        lm = NgramLM.from_corpus_stats(CorpusStats.load(args.from_stats, mmap=False))
+    else:
+        lm = NgramLM.train(iter_sentences(args.csv, args.transcripts_dir), order=args.order, min_count=args.min_count)
+    path = lm.save(args.output_dir)
+    sizes = ", ".join(f"{n}-grammes : {len(k)}" for n, (k, _) in lm.tables.items())
+    print(f"Modèle n-gramme ({len(lm.vocab)} mots, {lm.total} tokens ; {sizes}) sauvegardé dans {path}")
+
+
+if __name__ == "__main__":
+    main()
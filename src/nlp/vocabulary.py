@@ -0,0 +1,116 @@
+"""
+vocabulary.py
+-------------
+Type de vocabulaire partagé (post-traitement, construction de vocabulaire,
+grammaires Vosk), adossé à un marisa_trie.Trie :
+
+    - appartenance en O(longueur du mot), sans liste ni set de chaînes Python ;
+    - énumération par préfixe (keys) et préfixes d'un mot (prefixes) ;
+    - ids entiers stables 0..n-1 (ceux du trie) : index des lignes d'un tableau
+      numpy aligné (embeddings, effectifs...). Les ids ne dépendent que de
+      l'ensemble des mots : même fichier -> mêmes ids ;
+    - stockage .marisa relu par mmap (partagé entre processus).
+
+    from src.nlp.vocabulary import Vocabulary
+    vocab = Vocabulary.from_json("data/vocabulaire/medical_vocab.json")
+    "pneumonie" in vocab ; vocab.id("pneumonie") ; vocab.prefix("pneumo")
+    vocab.save("medical_vocab.marisa") ; Vocabulary.load("medical_vocab.marisa")
+"""
+
+import os
+import json
+import numpy as np
+import marisa_trie
+
+from src.common.run_manifest import obj_hash
+
+
+class Vocabulary:
+    __slots__ = ("trie", "_words")
+
+    def __init__(self, trie=None):
+        self.trie = trie if trie is not None else marisa_trie.Trie()
+        self._words = None
+
+    # ------------------ Construction ------------------
+    @classmethod
+    def from_words(cls, words):
+        return cls(marisa_trie.Trie(w for w in words if w))
+
+    @classmethod
+    def from_json(cls, path):
+        """Liste JSON de mots ou dict {mot: ...} (vocabulaire phonétique)."""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls.from_words(data if isinstance(data, list) else data.keys())
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        trie = marisa_trie.Trie()
+        if mmap:
+            trie.mmap(path)
+        else:
+            trie.load(path)
+        return cls(trie)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.trie.save(tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    # ------------------ Accès ------------------
+    def __len__(self):
+        return len(self.trie)
+
+    def __contains__(self, word):
+        return word in self.trie
+
+    def __iter__(self):
+        """Mots dans l'ordre des ids."""
+        return iter(self.words)
+
+    @property
+    def words(self):
+        """Liste des mots indexée par id (construite une fois)."""
+        if self._words is None:
+            restore = self.trie.restore_key
+            self._words = [restore(i) for i in range(len(self.trie))]
+        return self._words
+
+    def id(self, word, default=None):
+        return self.trie.get(word, default)
+
+    def word(self, idx):
+        return self.trie.restore_key(idx)
+
+    def ids(self, words, missing=-1):
+        """Ids d'une suite de mots (tableau int32, `missing` pour les mots absents)."""
+        get = self.trie.get
+        return np.fromiter((get(w, missing) for w in words), dtype=np.int32)
+
+    def prefix(self, prefix):
+        """Mots commençant par prefix."""
+        return self.trie.keys(prefix)
+
+    def prefixes(self, word):
+        """Mots du vocabulaire qui sont des préfixes de word."""
+        return self.trie.prefixes(word)
+
+    # ------------------ Ensembles ------------------
+    def intersection(self, other):
+        """Mots présents dans les deux (other : Vocabulary, trie, set...)."""
+        small, large = (self, other) if len(self) <= len(other) else (other, self)
+        return Vocabulary.from_words(w for w in small if w in large)
+
+    def union(self, words):
+        return Vocabulary.from_words(list(self.words) + [w for w in words if w not in self])
+
+    def sorted(self):
+        return sorted(self.words)
+
+    @property
+    def hash(self):
+        """Empreinte indépendante de l'ordre (clé de cache des tableaux alignés)."""
+        return obj_hash(self.sorted())
@@ -1,22 +1,14 @@
 import os
-import logging
 import subprocess
 import soundfile as sf
 import numpy as np
 from src.common.config import MEDECIN_DATA_DIR, PROCESSED_DIR
+from src.common.event_log import get_logger
 
 # --------------------
 # Configuration du logger
 # --------------------
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("processing.log", encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__, "processing")
 
 # --------------------
 # Paramètres
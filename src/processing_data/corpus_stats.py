@@ -0,0 +1,284 @@
+"""
+corpus_stats.py
+---------------
+Statistiques de corpus calculées en parallèle sur les transcriptions
+(.txt de TRANSCRIPTS_DIR + colonne transcription_text des CSV) :
+
+    - effectifs des unigrammes et des bigrammes (phrases bornées par <s> / </s>) ;
+    - fréquence documentaire (nombre de documents contenant le mot) ;
+    - taux OOV par rapport au lexique Vosk (words.txt), en tokens et en types.
+
+Le corpus est découpé en lots (fichiers .txt ou lignes CSV) traités par un pool
+de processus ; les tables partielles sont fusionnées puis écrites sous forme
+compacte dans CORPUS_STATS_DIR :
+
+    vocab.txt            un mot par ligne (id = numéro de ligne ; <s>, </s>, <unk> en tête)
+    unigrams.npy         effectifs uint32 par id
+    df.npy               fréquences documentaires uint32 par id
+    bigram_keys.npy      clés uint64 triées (id1 << 32 | id2)
+    bigram_counts.npy    effectifs uint32 alignés
+    meta.json            documents, phrases, tokens, OOV, sources (hash)
+
+Les tableaux sont relus mémoire-mappés (CorpusStats.load) par vocab_pipeline.py
+(source "stats") et ngram_lm.py (NgramLM.from_corpus_stats, modèle bigramme).
+
+    python -m src.processing_data.corpus_stats --workers 8
+"""
+
+import os
+import logging
+import re
+import csv
+import json
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from src.common.config import CORPUS_STATS_DIR, RESULTS_DIR, TRANSCRIPTS_DIR
+from src.common.run_manifest import file_hash
+from src.common.event_log import get_logger, log_stage
+from src.nlp.ngram_lm import BOS, EOS, UNK, tokenize
+from src.speech.vosk_lexicon import WORDS_TXT, load_lexicon
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+CORPUS_CSVS = [os.path.join(RESULTS_DIR, "transcriptions.csv")]
+SENTENCE_RE = re.compile(r"[.!?\n]+")
+MARKERS = (BOS, EOS, UNK)
+BATCH_FILES = 64
+BATCH_ROWS = 2000
+
+
+# ---------------------------------------------------------------------
+# Comptage d'un lot (processus du pool)
+# ---------------------------------------------------------------------
+def _count_texts(texts):
+    unigrams, bigrams, df = Counter(), Counter(), Counter()
+    docs = sentences = 0
+    for text in texts:
+        seen = set()
+        for sentence in SENTENCE_RE.split(text):
+            tokens = tokenize(sentence)
+            if not tokens:
+                continue
+            sentences += 1
+            unigrams.update(tokens)
+            seen.update(tokens)
+            bigrams.update(zip([BOS] + tokens, tokens + [EOS]))
+        if seen:
+            docs += 1
+            df.update(seen)
+    return unigrams, bigrams, df, docs, sentences
+
+
+def _count_files(paths):
+    texts = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            texts.append(f.read())
+    return _count_texts(texts)
+
+
+# ---------------------------------------------------------------------
+# Découpage du corpus en lots
+# ---------------------------------------------------------------------
+def transcript_files(directory=TRANSCRIPTS_DIR):
+    if not os.path.isdir(directory):
+        return []
+    # Sorties de run_stt_vosk (_brut / _corrige) : pas des références
+    return [
+        os.path.join(directory, name) for name in sorted(os.listdir(directory))
+        if name.endswith(".txt") and not os.path.splitext(name)[0].endswith(("_brut", "_corrige"))
+    ]
+
+
+def iter_batches(transcripts_dir=TRANSCRIPTS_DIR, csv_paths=CORPUS_CSVS):
+    """(fonction, lot) : les .txt sont lus par les workers, les lignes CSV envoyées par lots."""
+    files = transcript_files(transcripts_dir)
+    for i in range(0, len(files), BATCH_FILES):
+        yield _count_files, files[i:i + BATCH_FILES]
+    for path in csv_paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            batch = []
+            for row in csv.DictReader(f):
+                batch.append(row.get("transcription_text", "") or "")
+                if len(batch) >= BATCH_ROWS:
+                    yield _count_texts, batch
+                    batch = []
+            if batch:
+                yield _count_texts, batch
+
+
+def count_corpus(transcripts_dir=TRANSCRIPTS_DIR, csv_paths=CORPUS_CSVS, workers=None):
+    """Comptage parallèle et fusion des tables partielles."""
+    unigrams, bigrams, df = Counter(), Counter(), Counter()
+    docs = sentences = 0
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Soumission au fil de l'eau : au plus 2 lots en attente par worker
+        pending = []
+        batches = iter_batches(transcripts_dir, csv_paths)
+        while True:
+            for fn, batch in batches:
+                pending.append(pool.submit(fn, batch))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            u, b, d, n_docs, n_sentences = pending.pop(0).result()
+            unigrams.update(u)
+            bigrams.update(b)
+            df.update(d)
+            docs += n_docs
+            sentences += n_sentences
+    return unigrams, bigrams, df, docs, sentences
+
+
+def model_lexicon(path=WORDS_TXT):
+    """Mots du lexique Vosk (trie en cache, entrées brutes), None si absent."""
+    if not path or not os.path.exists(path):
+        return None
+    return load_lexicon(path, normalize=False)
+
+
+def oov_stats(unigrams, lexicon, top=50):
+    if lexicon is None:
+        return None
+    tokens = sum(unigrams.values()) or 1
+    oov = Counter({w: c for w, c in unigrams.items() if w not in lexicon})
+    return {
+        "token_rate": round(sum(oov.values()) / tokens, 5),
+        "type_rate": round(len(oov) / max(len(unigrams), 1), 5),
+        "types": len(oov),
+        "top": oov.most_common(top),
+    }
+
+
+# ---------------------------------------------------------------------
+# Format compact
+# ---------------------------------------------------------------------
+class CorpusStats:
+    def __init__(self, words, unigrams, df, bigram_keys, bigram_counts, meta):
+        self.words = words
+        self.ids = {w: i for i, w in enumerate(words)}
+        self.unigram_counts = unigrams
+        self.df_counts = df
+        self.bigram_keys = bigram_keys
+        self.bigram_counts = bigram_counts
+        self.meta = meta
+
+    @classmethod
+    def from_counts(cls, unigrams, bigrams, df, meta):
+        # Marqueurs en tête (mêmes ids que NgramLM), puis fréquence décroissante
+        words = list(MARKERS) + [w for w, _ in unigrams.most_common()]
+        ids = {w: i for i, w in enumerate(words)}
+        n_sentences = meta.get("sentences", 0)
+        counts = np.zeros(len(words), dtype=np.uint32)
+        counts[0] = counts[1] = n_sentences
+        df_arr = np.zeros(len(words), dtype=np.uint32)
+        for w, c in unigrams.items():
+            counts[ids[w]] = c
+            df_arr[ids[w]] = df.get(w, 0)
+        keys = np.fromiter(((ids[a] << 32) | ids[b] for a, b in bigrams), dtype=np.uint64, count=len(bigrams))
+        values = np.fromiter(bigrams.values(), dtype=np.uint32, count=len(bigrams))
+        order = np.argsort(keys)
+        return cls(words, counts, df_arr, keys[order], values[order], meta)
+
+    def save(self, path=CORPUS_STATS_DIR):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "vocab.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(self.words) + "\n")
+        np.save(os.path.join(path, "unigrams.npy"), self.unigram_counts)
+        np.save(os.path.join(path, "df.npy"), self.df_counts)
+        np.save(os.path.join(path, "bigram_keys.npy"), self.bigram_keys)
+        np.save(os.path.join(path, "bigram_counts.npy"), self.bigram_counts)
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({**self.meta, "version": FORMAT_VERSION}, f, ensure_ascii=False, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, path=CORPUS_STATS_DIR, mmap=True):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Format de statistiques incompatible : {path}")
+        with open(os.path.join(path, "vocab.txt"), "r", encoding="utf-8") as f:
+            words = f.read().splitlines()
+        mode = "r" if mmap else None
+        arrays = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+                  for name in ("unigrams", "df", "bigram_keys", "bigram_counts")]
+        return cls(words, *arrays, meta)
+
+    # ------------------ Accès ------------------
+    def unigrams(self):
+        """{mot: effectif}, marqueurs exclus."""
+        return {w: int(c) for w, c in zip(self.words[len(MARKERS):], self.unigram_counts[len(MARKERS):])}
+
+    def count(self, word):
+        i = self.ids.get(word)
+        return int(self.unigram_counts[i]) if i is not None else 0
+
+    def df(self, word):
+        i = self.ids.get(word)
+        return int(self.df_counts[i]) if i is not None else 0
+
+    def bigram_count(self, w1, w2):
+        i, j = self.ids.get(w1), self.ids.get(w2)
+        if i is None or j is None:
+            return 0
+        key = np.uint64((i << 32) | j)
+        idx = int(np.searchsorted(self.bigram_keys, key))
+        if idx < len(self.bigram_keys) and self.bigram_keys[idx] == key:
+            return int(self.bigram_counts[idx])
+        return 0
+
+
+def build_stats(transcripts_dir=TRANSCRIPTS_DIR, csv_paths=CORPUS_CSVS, words_txt=WORDS_TXT, workers=None):
+    with log_stage(logger, "corpus_stats.count") as fields:
+        unigrams, bigrams, df, docs, sentences = count_corpus(transcripts_dir, csv_paths, workers)
+        fields.update(docs=docs, sentences=sentences, types=len(unigrams))
+    sources = [{"path": p, "sha1": file_hash(p)} for p in csv_paths if os.path.exists(p)]
+    sources.append({"path": transcripts_dir, "files": len(transcript_files(transcripts_dir))})
+    meta = {
+        "docs": docs,
+        "sentences": sentences,
+        "tokens": sum(unigrams.values()),
+        "types": len(unigrams),
+        "bigrams": len(bigrams),
+        "oov": oov_stats(unigrams, model_lexicon(words_txt)),
+        "lexicon": words_txt,
+        "sources": sources,
+    }
+    return CorpusStats.from_counts(unigrams, bigrams, df, meta)
+
+
+# ---------------------------------------------------------------------
+# Programme principal
+# ---------------------------------------------------------------------
+def main():
+    get_logger(__name__, "corpus_stats")
+    parser = argparse.ArgumentParser(description="Statistiques de corpus parallèles (unigrammes, bigrammes, df, OOV)")
+    parser.add_argument("--transcripts_dir", type=str, default=TRANSCRIPTS_DIR)
+    parser.add_argument("--csv", nargs="*", default=CORPUS_CSVS, help="CSV avec une colonne transcription_text")
+    parser.add_argument("--words_txt", type=str, default=WORDS_TXT, help="Lexique Vosk pour le taux OOV")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output_dir", type=str, default=CORPUS_STATS_DIR)
+    args = parser.parse_args()
+
+    stats = build_stats(args.transcripts_dir, args.csv, args.words_txt, args.workers)
+    path = stats.save(args.output_dir)
+    meta = stats.meta
+    logger.info(f"{meta['docs']} documents, {meta['sentences']} phrases, {meta['tokens']} tokens, "
+                f"{meta['types']} types, {meta['bigrams']} bigrammes -> {path}")
+    if meta["oov"]:
+        oov = meta["oov"]
+        logger.info(f"OOV / {os.path.basename(args.words_txt)} : {100 * oov['token_rate']:.2f} % des tokens, "
+                    f"{100 * oov['type_rate']:.2f} % des types ({', '.join(w for w, _ in oov['top'][:10])}...)")
+
+
+if __name__ == "__main__":
+    main()
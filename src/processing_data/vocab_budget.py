@@ -0,0 +1,194 @@
+"""
+vocab_budget.py
+---------------
+Choix de la taille de grammaire Vosk (top-K mots) selon un budget de latence.
+
+1. Classement des mots candidats :
+   fréquence dans le corpus (transcriptions.csv, comme build_optimized_vocab.py)
+   + bonus pour les termes médicaux (medical_vocab.json),
+   en excluant les mots absents du lexique du modèle (OOV) : Vosk les ignore
+   dans une grammaire, ils ne font qu'alourdir le graphe.
+2. Balayage de K : décodage du jeu de données avec la grammaire top-K,
+   mesure latence / RTF / WER, front de Pareto (RTF, WER).
+3. Sélection : meilleur WER parmi les K qui respectent le budget de RTF ;
+   la grammaire retenue est écrite dans VOCAB_DATA_DIR/grammar_top<K>.json.
+
+Exemple :
+    python -m src.processing_data.vocab_budget --ks 100 250 500 1000 2000 --rtf-budget 0.15
+"""
+
+import os
+import re
+import csv
+import json
+import math
+import time
+import argparse
+from collections import Counter
+from vosk import Model
+
+from src.common.config import RESULTS_DIR, VOCAB_DATA_DIR, EXPERIMENTAL_MODEL_FR
+from src.benchmarks.datasets import load_dataset
+from src.benchmarks.metrics import compute_metrics
+from src.speech.vosk_decode import decode_wav, wav_duration
+from src.speech.vosk_lexicon import load_lexicon
+from src.common.event_log import get_logger
+
+logger = get_logger(__name__, "vocab_budget")
+
+# -----------------------------
+# Chemins
+# -----------------------------
+CORPUS_CSV = os.path.join(RESULTS_DIR, "transcriptions.csv")
+MEDICAL_PATH = os.path.join(VOCAB_DATA_DIR, "medical_vocab.json")
+SWEEP_CSV = os.path.join(RESULTS_DIR, "vocab_budget_sweep.csv")
+TOKEN_RE = re.compile(r"[a-zA-ZÀ-ÿ'-]+")
+UNK = "[unk]"
+
+
+# -----------------------------
+# Classement des mots
+# -----------------------------
+def corpus_frequencies(csv_path=CORPUS_CSV):
+    counter = Counter()
+    if not os.path.exists(csv_path):
+        logger.warning(f"Corpus introuvable : {csv_path}")
+        return counter
+    with open(csv_path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            counter.update(TOKEN_RE.findall(row.get("transcription_text", "").lower()))
+    return counter
+
+
+def load_model_words(model_dir, fallback=os.path.join(VOCAB_DATA_DIR, "words.txt")):
+    """Lexique du modèle (graph/words.txt, trie en cache), None si indisponible."""
+    for path in (os.path.join(model_dir, "graph", "words.txt"), fallback):
+        if os.path.exists(path):
+            return load_lexicon(path, normalize=False)
+    return None
+
+
+def rank_vocabulary(freqs, medical_terms, model_words=None, medical_boost=2.0):
+    """
+    Score = log(1 + fréquence) + bonus médical. Renvoie (mots triés, taux OOV du corpus).
+    """
+    candidates = set(freqs) | set(medical_terms)
+    oov_rate = 0.0
+    if model_words is not None:
+        total = sum(freqs.values()) or 1
+        oov_rate = sum(c for w, c in freqs.items() if w not in model_words) / total
+        candidates = {w for w in candidates if w in model_words}
+
+    def score(w):
+        return math.log1p(freqs.get(w, 0)) + (medical_boost if w in medical_terms else 0.0)
+
+    return sorted(candidates, key=lambda w: (-score(w), w)), oov_rate
+
+
+def grammar_for(ranked, k):
+    """Grammaire top-K ; [unk] absorbe la parole hors grammaire au lieu de la forcer."""
+    return ranked[:k] + [UNK]
+
+
+# -----------------------------
+# Balayage
+# -----------------------------
+def evaluate_grammar(model, items, grammar):
+    latencies, durations, wers = [], [], []
+    for _, audio_path, ref_text in items:
+        duration = wav_duration(audio_path)
+        start = time.perf_counter()
+        transcript = decode_wav(model, audio_path, grammar=grammar)
+        latencies.append(time.perf_counter() - start)
+        durations.append(duration)
+        wer_value = compute_metrics(ref_text, transcript)["wer"]
+        if wer_value is not None:
+            wers.append(wer_value)
+    n = max(len(latencies), 1)
+    return {
+        "latency_mean": sum(latencies) / n,
+        "rtf": sum(latencies) / max(sum(durations), 1e-9),
+        "wer_mean": sum(wers) / len(wers) if wers else float("nan"),
+    }
+
+
+def pareto_front(rows):
+    """Lignes non dominées sur (rtf, wer_mean), à minimiser toutes les deux."""
+    front = []
+    for r in rows:
+        dominated = any(
+            o["rtf"] <= r["rtf"] and o["wer_mean"] <= r["wer_mean"]
+            and (o["rtf"] < r["rtf"] or o["wer_mean"] < r["wer_mean"])
+            for o in rows
+        )
+        if not dominated:
+            front.append(r)
+    return front
+
+
+def select_k(rows, rtf_budget):
+    within = [r for r in rows if r["rtf"] <= rtf_budget and not math.isnan(r["wer_mean"])]
+    if not within:
+        return None
+    return min(within, key=lambda r: (r["wer_mean"], r["k"]))
+
+
+# -----------------------------
+# Programme principal
+# -----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Budget de vocabulaire pour la grammaire Vosk")
+    parser.add_argument("--model_dir", type=str, default=EXPERIMENTAL_MODEL_FR)
+    parser.add_argument("--dataset", type=str, default="medecin_v2")
+    parser.add_argument("--ks", type=int, nargs="+", default=[100, 250, 500, 1000, 2000, 5000])
+    parser.add_argument("--rtf-budget", type=float, default=0.2, help="RTF maximal accepté")
+    parser.add_argument("--medical-boost", type=float, default=2.0)
+    args = parser.parse_args()
+
+    freqs = corpus_frequencies()
+    with open(MEDICAL_PATH, "r", encoding="utf-8") as f:
+        medical_terms = set(json.load(f))
+    model_words = load_model_words(args.model_dir)
+    if model_words is None:
+        logger.warning("Lexique du modèle introuvable : pas de filtrage OOV")
+
+    ranked, oov_rate = rank_vocabulary(freqs, medical_terms, model_words, args.medical_boost)
+    logger.info(f"{len(ranked)} mots candidats, taux OOV du corpus : {oov_rate:.2%}")
+
+    items = [it for it in load_dataset(args.dataset) if it[1].lower().endswith(".wav")]
+    if not items:
+        logger.warning(f"Aucun WAV dans le jeu de données {args.dataset}")
+        return
+
+    model = Model(args.model_dir)
+    rows = []
+    for k in sorted(set(args.ks)):
+        if k > len(ranked) and rows and rows[-1]["grammar_size"] == len(ranked):
+            break
+        grammar = grammar_for(ranked, k)
+        stats = evaluate_grammar(model, items, grammar)
+        row = {"k": k, "grammar_size": len(grammar) - 1, **{m: round(v, 4) for m, v in stats.items()}}
+        rows.append(row)
+        logger.info(f"K={k} : latence={row['latency_mean']}s RTF={row['rtf']} WER={row['wer_mean']}")
+
+    front = {r["k"] for r in pareto_front(rows)}
+    for r in rows:
+        r["pareto"] = r["k"] in front
+    with open(SWEEP_CSV, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    logger.info(f"Balayage enregistré dans : {SWEEP_CSV} (front de Pareto : K={sorted(front)})")
+
+    best = select_k(rows, args.rtf_budget)
+    if best is None:
+        logger.warning(f"Aucun K ne respecte le budget RTF={args.rtf_budget}")
+        return
+    out_path = os.path.join(VOCAB_DATA_DIR, f"grammar_top{best['k']}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(grammar_for(ranked, best["k"]), f, ensure_ascii=False, indent=2)
+    logger.info(f"K retenu : {best['k']} (RTF={best['rtf']}, WER={best['wer_mean']}) -> {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,501 @@
+"""
+vocab_pipeline.py
+-----------------
+Construction de vocabulaire en flux, en une seule passe sur les sources.
+
+Une construction = des sources + une suite d'étapes composables :
+
+    sources : csv[:chemin]         colonne transcription_text de transcriptions.csv
+              transcripts[:dossier] .txt de TRANSCRIPTS_DIR
+              lexicon[:chemin]     première colonne d'un words.txt Vosk
+              json:<chemin>        liste JSON de mots
+              spacy                lexèmes du modèle spaCy français
+              stats[:dossier]      effectifs persistés par corpus_stats.py (sans relire le corpus)
+    étapes  : clean                minuscules, sans chiffres ni caractères interdits pour Vosk
+              ascii                clean + réparation d'encodage et translittération ASCII (vosk_lexicon)
+              filter[:spacy|minimal|none][,min_len=<n>][,common=none][,elisions=keep]
+                                   mots vides, mots courants (COMMON_WORDS), mots < min_len
+                                   lettres (3), élisions ; options pour reproduire un ancien script
+              min_count:<n>        fréquence minimale
+              rank:<k>             k mots les plus fréquents
+              merge:<json>         union avec une liste de mots
+              keep:<json>          intersection avec une liste de mots
+              phon[:rules|phonemizer]  dictionnaire phonétique (g2p_fr)
+
+Les étapes par mot placées en tête (clean, ascii, filter) sont appliquées
+pendant la lecture : chaque token est nettoyé / filtré puis compté une seule
+fois, sans liste intermédiaire. Les suivantes opèrent sur la table des effectifs.
+
+Sorties versionnées (rien n'est écrasé) :
+    VOCAB_BUILDS_DIR/<nom>/<run_id>.json            liste triée des mots
+    VOCAB_BUILDS_DIR/<nom>/<run_id>.marisa          même liste en trie (Vocabulary.load, mmap)
+    VOCAB_BUILDS_DIR/<nom>/<run_id>.phon.json       {mot: phonèmes} si étape phon
+    VOCAB_BUILDS_DIR/<nom>/<run_id>.manifest.json   sources (hash), étapes, effectifs
+--publish copie ensuite la construction vers le fichier attendu par les autres
+scripts (et le trie à côté, même nom en .marisa), après avoir archivé la
+version précédente dans le même dossier.
+
+Exemples :
+    python -m src.processing_data.vocab_pipeline --preset optimized
+    python -m src.processing_data.vocab_pipeline --name essai --sources csv transcripts \\
+        --steps clean filter rank:500 merge:medical_vocab.json phon
+"""
+
+import os
+import logging
+import re
+import csv
+import json
+import shutil
+import argparse
+from collections import Counter
+
+from src.common.config import CORPUS_STATS_DIR, RESULTS_DIR, TRANSCRIPTS_DIR, VOCAB_BUILDS_DIR, VOCAB_DATA_DIR
+from src.common.run_manifest import atomic_write_json, file_hash, new_run_id, obj_hash
+from src.common.event_log import get_logger, log_stage
+from src.nlp.vocabulary import Vocabulary
+from src.speech.vosk_lexicon import WORDS_TXT, normalize_token
+
+logger = logging.getLogger(__name__)
+
+CORPUS_CSV = os.path.join(RESULTS_DIR, "transcriptions.csv")
+TOKEN_RE = re.compile(r"[a-zA-ZÀ-ÿ'-]+")
+LETTER_RE = re.compile(r"[a-zA-ZÀ-ÿ]")
+FORBIDDEN_CHARS = set('#"\\{}[]!')
+ELISIONS = ("d'", "l'", "qu'", "j'", "n'", "s'")
+
+MINIMAL_STOPWORDS = frozenset({
+    "le", "la", "les", "un", "une", "et", "de", "des", "du", "dans", "sur",
+    "à", "pour", "est", "avec", "au", "aux", "ce", "ces", "il", "elle", "on",
+    "ne", "pas", "que", "qui", "se", "sa", "son", "sont", "comme", "ou", "par",
+})
+
+# Mots fréquents de la conversation médecin / patient sans intérêt pour le vocabulaire
+COMMON_WORDS = frozenset({
+    "amene", "savez", "donc", "bien", "peut", "etre", "voila", "avez", "fait", "faire",
+    "aller", "dire", "voir", "mettre", "venir", "vouloir", "savoir", "pouvoir", "donner",
+    "prendre", "trouver", "passer", "falloir", "devoir", "regarder", "demander", "bonjour",
+    "merci", "d'accord", "oui", "non", "voilà", "ben", "ok", "question", "attention",
+    "mettrez", "très", "tout", "comme", "avec", "avoir", "être", "bon", "alors", "peux",
+    "suis", "c'est", "hein", "euh",
+})
+
+
+def _resolve(path, base=VOCAB_DATA_DIR):
+    return path if os.path.isabs(path) else os.path.join(base, path)
+
+
+def _load_word_list(path):
+    """Liste JSON de mots ou dict {mot: ...} -> Vocabulary (trie)."""
+    return Vocabulary.from_json(path)
+
+
+# ---------------------------------------------------------------------
+# Sources : générateurs de tokens
+# ---------------------------------------------------------------------
+def csv_source(path=CORPUS_CSV):
+    with open(path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield from TOKEN_RE.findall(row.get("transcription_text", "").lower())
+
+
+def transcripts_source(directory=TRANSCRIPTS_DIR):
+    for name in sorted(os.listdir(directory)):
+        base, ext = os.path.splitext(name)
+        # Sorties de run_stt_vosk (_brut / _corrige) : pas des références
+        if ext != ".txt" or base.endswith(("_brut", "_corrige")):
+            continue
+        with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+            for line in f:
+                yield from TOKEN_RE.findall(line.lower())
+
+
+def lexicon_source(path=WORDS_TXT):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.split()
+            if fields:
+                yield fields[0]
+
+
+def json_source(path):
+    yield from _load_word_list(path)
+
+
+def spacy_source(model="fr_core_news_sm"):
+    import spacy
+    nlp = spacy.load(model)
+    for lex in nlp.vocab:
+        if lex.is_alpha and lex.text.isascii():
+            yield lex.text
+
+
+def stats_source(path=CORPUS_STATS_DIR):
+    """Source pondérée : (mot, effectif) depuis les tables de corpus_stats.py."""
+    from src.processing_data.corpus_stats import CorpusStats
+    yield from CorpusStats.load(path).unigrams().items()
+
+
+# Sources dont les éléments sont des couples (mot, effectif)
+WEIGHTED_SOURCES = {"stats"}
+
+SOURCES = {
+    "csv": (csv_source, CORPUS_CSV),
+    "transcripts": (transcripts_source, TRANSCRIPTS_DIR),
+    "lexicon": (lexicon_source, WORDS_TXT),
+    "json": (json_source, None),
+    "spacy": (spacy_source, None),
+    "stats": (stats_source, CORPUS_STATS_DIR),
+}
+
+
+def parse_source(spec):
+    kind, _, arg = spec.partition(":")
+    if kind not in SOURCES:
+        raise ValueError(f"Source inconnue : {kind} (disponibles : {', '.join(SOURCES)})")
+    fn, path = SOURCES[kind]
+    if kind == "json":
+        if not arg:
+            raise ValueError("La source json demande un chemin (json:<fichier>)")
+        path = _resolve(arg)
+    elif arg:
+        path = arg
+    return kind, fn, path
+
+
+# ---------------------------------------------------------------------
+# Étapes
+# ---------------------------------------------------------------------
+class Step:
+    """token(mot) -> mot ou None pour les étapes par mot ; vocab(Counter) -> Counter sinon."""
+    per_token = False
+
+    def __init__(self, spec):
+        self.spec = spec
+
+    def token(self, word):
+        raise NotImplementedError
+
+    def vocab(self, counts):
+        # Étape par mot placée après une étape globale : appliquée aux clés
+        result = Counter()
+        for word, count in counts.items():
+            word = self.token(word)
+            if word is not None:
+                result[word] += count
+        return result
+
+
+class Clean(Step):
+    per_token = True
+
+    def __init__(self, spec, ascii_only=False):
+        super().__init__(spec)
+        self.ascii_only = ascii_only
+        self._cache = {}
+
+    def _normalize(self, word):
+        if self.ascii_only:
+            # Comme l'ancien nettoyage du lexique Vosk : chiffres supprimés, pas le mot
+            word = normalize_token(word)
+            if word is None:
+                return None
+        word = word.strip().lower()
+        if not word or any(c.isdigit() or c in FORBIDDEN_CHARS for c in word) or not LETTER_RE.search(word):
+            return None
+        return word
+
+    def token(self, word):
+        # Les mêmes mots reviennent sans cesse dans un corpus : normalisation mémorisée
+        try:
+            return self._cache[word]
+        except KeyError:
+            result = self._cache[word] = self._normalize(word)
+            return result
+
+
+class Filter(Step):
+    per_token = True
+
+    def __init__(self, spec, stopwords="spacy", min_len=3, common=COMMON_WORDS, drop_elisions=True):
+        super().__init__(spec)
+        if stopwords == "spacy":
+            # Liste de la langue, sans charger de modèle
+            from spacy.lang.fr.stop_words import STOP_WORDS
+            stop = set(STOP_WORDS)
+        elif stopwords == "minimal":
+            stop = set(MINIMAL_STOPWORDS)
+        elif stopwords == "none":
+            stop = set()
+        else:
+            raise ValueError(f"Liste de mots vides inconnue : {stopwords}")
+        self.excluded = frozenset(stop | set(common))
+        self.min_len = min_len
+        self.elisions = ELISIONS if drop_elisions else ()
+
+    def token(self, word):
+        if len(word) < self.min_len or word in self.excluded or (self.elisions and word.startswith(self.elisions)):
+            return None
+        return word
+
+
+class MinCount(Step):
+    def __init__(self, spec, n):
+        super().__init__(spec)
+        self.n = n
+
+    def vocab(self, counts):
+        return Counter({w: c for w, c in counts.items() if c >= self.n})
+
+
+class Rank(Step):
+    def __init__(self, spec, k):
+        super().__init__(spec)
+        self.k = k
+
+    def vocab(self, counts):
+        return Counter(dict(counts.most_common(self.k)))
+
+
+class Merge(Step):
+    def __init__(self, spec, path):
+        super().__init__(spec)
+        self.path = path
+
+    def vocab(self, counts):
+        result = Counter(counts)
+        for word in _load_word_list(self.path):
+            result.setdefault(word, 0)
+        return result
+
+
+class Keep(Step):
+    def __init__(self, spec, path):
+        super().__init__(spec)
+        self.path = path
+
+    def vocab(self, counts):
+        allowed = _load_word_list(self.path)
+        return Counter({w: c for w, c in counts.items() if w in allowed})
+
+
+class Phoneticize(Step):
+    """Étape terminale : ne modifie pas le vocabulaire, calcule build.phon."""
+
+    def __init__(self, spec, backend="rules"):
+        super().__init__(spec)
+        self.backend = backend
+
+    def vocab(self, counts):
+        return counts
+
+
+def _filter_step(spec, arg):
+    """filter[:<mots vides>[,min_len=<n>][,common=none][,elisions=keep]]"""
+    stopwords, *options = arg.split(",")
+    kwargs = {}
+    for option in options:
+        key, _, value = option.partition("=")
+        if key == "min_len":
+            kwargs["min_len"] = int(value)
+        elif key == "common" and value == "none":
+            kwargs["common"] = ()
+        elif key == "elisions" and value == "keep":
+            kwargs["drop_elisions"] = False
+        else:
+            raise ValueError(f"Option de filtre inconnue : {option} (min_len=<n>, common=none, elisions=keep)")
+    return Filter(spec, stopwords=stopwords or "spacy", **kwargs)
+
+
+STEPS = {
+    "clean": lambda spec, arg: Clean(spec),
+    "ascii": lambda spec, arg: Clean(spec, ascii_only=True),
+    "filter": _filter_step,
+    "min_count": lambda spec, arg: MinCount(spec, int(arg)),
+    "rank": lambda spec, arg: Rank(spec, int(arg)),
+    "merge": lambda spec, arg: Merge(spec, _resolve(arg)),
+    "keep": lambda spec, arg: Keep(spec, _resolve(arg)),
+    "phon": lambda spec, arg: Phoneticize(spec, arg or "rules"),
+}
+
+
+def parse_step(spec):
+    name, _, arg = spec.partition(":")
+    if name not in STEPS:
+        raise ValueError(f"Étape inconnue : {name} (disponibles : {', '.join(STEPS)})")
+    return STEPS[name](spec, arg)
+
+
+# ---------------------------------------------------------------------
+# Préréglages (anciens scripts de vocabulaire)
+# ---------------------------------------------------------------------
+PRESETS = {
+    # src/stt/create_vocab.py : mots des transcriptions hors mots vides (liste minimale seule)
+    "transcripts_vocab": {
+        "sources": ["transcripts"],
+        "steps": ["clean", "filter:minimal,min_len=1,common=none,elisions=keep"],
+        "publish": os.path.join(RESULTS_DIR, "vocab_data", "medical_vocab.json"),
+    },
+    # src/processing_data/creat_vocab.py : 100 termes médicaux les plus fréquents du corpus
+    "medical_top100": {
+        "sources": ["csv"],
+        "steps": ["clean", "filter", "keep:medical_vocab.json", "rank:100"],
+        "publish": os.path.join(VOCAB_DATA_DIR, "medical_vocab.json"),
+    },
+    # src/processing_data/build_optimized_vocab.py : vocabulaire médical + 200 mots fréquents
+    "optimized": {
+        "sources": ["csv"],
+        "steps": ["clean", "filter", "rank:200", "merge:medical_vocab.json"],
+        "publish": os.path.join(VOCAB_DATA_DIR, "optimized_vocab.json"),
+    },
+    # src/processing_data/french_vocab_spacy.py : vocabulaire médical + lexique spaCy
+    "spacy_merge": {
+        "sources": ["spacy"],
+        "steps": ["clean", "filter:spacy,common=none", "merge:medical_vocab.json"],
+        "publish": os.path.join(VOCAB_DATA_DIR, "medical_vocab.json"),
+    },
+    # src/processing_data/vocab_from_medium_vosk.py : lexique Vosk nettoyé pour les grammaires
+    "vosk_words": {
+        "sources": ["lexicon"],
+        "steps": ["ascii"],
+        "publish": os.path.join(VOCAB_DATA_DIR, "words_clean.json"),
+    },
+}
+
+
+# ---------------------------------------------------------------------
+# Exécution
+# ---------------------------------------------------------------------
+class VocabBuild:
+    def __init__(self, counts, phon=None):
+        self.counts = counts
+        self.phon = phon
+
+    @property
+    def words(self):
+        return sorted(self.counts)
+
+
+def run_pipeline(sources, steps, workers=None):
+    """sources : [(type, fonction, chemin)] ; steps : [Step]. Une seule passe sur les sources."""
+    # Préfixe d'étapes par mot fusionné dans la lecture
+    split = 0
+    while split < len(steps) and steps[split].per_token:
+        split += 1
+    token_steps = [s.token for s in steps[:split]]
+
+    counts = Counter()
+    for kind, fn, path in sources:
+        with log_stage(logger, f"source.{kind}", path=path) as fields:
+            read = kept = 0
+            weighted = kind in WEIGHTED_SOURCES
+            for item in (fn(path) if path else fn()):
+                word, n = item if weighted else (item, 1)
+                read += n
+                for step in token_steps:
+                    word = step(word)
+                    if word is None:
+                        break
+                else:
+                    counts[word] += n
+                    kept += n
+            fields.update(tokens=read, kept=kept)
+
+    phon = None
+    for step in steps[split:]:
+        with log_stage(logger, f"step.{step.spec}") as fields:
+            counts = step.vocab(counts)
+            if isinstance(step, Phoneticize):
+                from src.nlp.g2p_fr import phonetize
+                phon = phonetize(sorted(counts), backend=step.backend, workers=workers)
+            fields.update(words=len(counts))
+    return VocabBuild(counts, phon)
+
+
+def save_build(name, build, sources, steps, builds_dir=VOCAB_BUILDS_DIR):
+    """Écrit la construction sous un nouvel identifiant ; renvoie le chemin de la liste de mots."""
+    run_id = new_run_id()
+    out_dir = os.path.join(builds_dir, name)
+    words = build.words
+    words_path = os.path.join(out_dir, f"{run_id}.json")
+    atomic_write_json(words_path, words)
+    Vocabulary.from_words(words).save(os.path.join(out_dir, f"{run_id}.marisa"))
+    if build.phon is not None:
+        atomic_write_json(os.path.join(out_dir, f"{run_id}.phon.json"), build.phon)
+    manifest = {
+        "name": name,
+        "run_id": run_id,
+        "sources": [
+            {"type": kind, "path": path,
+             "sha1": file_hash(path) if path and os.path.isfile(path) else None}
+            for kind, _, path in sources
+        ],
+        "steps": [s.spec for s in steps],
+        "words": len(words),
+        "tokens": sum(build.counts.values()),
+        "vocab_hash": obj_hash(words),
+        "top": build.counts.most_common(20),
+    }
+    atomic_write_json(os.path.join(out_dir, f"{run_id}.manifest.json"), manifest)
+    return words_path
+
+
+def publish(build_path, target, builds_dir=VOCAB_BUILDS_DIR, name=None):
+    """Copie atomique vers target ; l'ancienne version est archivée si elle diffère."""
+    if os.path.exists(target) and file_hash(target) != file_hash(build_path):
+        archive_dir = os.path.join(builds_dir, name or "published")
+        os.makedirs(archive_dir, exist_ok=True)
+        base = os.path.basename(target)
+        archive = os.path.join(archive_dir, f"previous-{new_run_id()}-{base}")
+        shutil.copy2(target, archive)
+        logger.info(f"Version précédente de {base} archivée : {archive}")
+    with open(build_path, "r", encoding="utf-8") as f:
+        words = json.load(f)
+    atomic_write_json(target, words)
+    Vocabulary.from_words(words).save(os.path.splitext(target)[0] + ".marisa")
+    return target
+
+
+def run_preset(preset, publish_output=True, workers=None):
+    spec = PRESETS[preset]
+    return build_and_save(preset, spec["sources"], spec["steps"],
+                          spec["publish"] if publish_output else None, workers=workers)
+
+
+def build_and_save(name, source_specs, step_specs, publish_to=None, workers=None):
+    sources = [parse_source(s) for s in source_specs]
+    steps = [parse_step(s) for s in step_specs]
+    build = run_pipeline(sources, steps, workers=workers)
+    build_path = save_build(name, build, sources, steps)
+    logger.info(f"Vocabulaire {name} : {len(build.counts)} mots -> {build_path}")
+    if publish_to:
+        publish(build_path, publish_to, name=name)
+        logger.info(f"Publié dans {publish_to}")
+    return build, build_path
+
+
+# ---------------------------------------------------------------------
+# Programme principal
+# ---------------------------------------------------------------------
+def main():
+    get_logger(__name__, "vocab_pipeline")
+    parser = argparse.ArgumentParser(description="Construction de vocabulaire en une passe (étapes composables)")
+    parser.add_argument("--preset", type=str, choices=list(PRESETS), help="Recette prédéfinie (anciens scripts)")
+    parser.add_argument("--name", type=str, default="custom", help="Nom de la construction (dossier de versions)")
+    parser.add_argument("--sources", nargs="+", default=["csv"], help=f"Parmi : {', '.join(SOURCES)} (type[:chemin])")
+    parser.add_argument("--steps", nargs="+", default=["clean", "filter"], help=f"Parmi : {', '.join(STEPS)} (nom[:arg])")
+    parser.add_argument("--publish", type=str, default=None, help="Fichier JSON à mettre à jour avec le résultat")
+    parser.add_argument("--no_publish", action="store_true", help="Avec --preset : ne garder que la version archivée")
+    parser.add_argument("--workers", type=int, default=None, help="Processus de phonétisation (étape phon)")
+    args = parser.parse_args()
+
+    if args.preset:
+        build, _ = run_preset(args.preset, publish_output=not args.no_publish, workers=args.workers)
+    else:
+        publish_to = _resolve(args.publish) if args.publish else None
+        build, _ = build_and_save(args.name, args.sources, args.steps, publish_to, workers=args.workers)
+    print("Exemple :", build.words[:30])
+
+
+if __name__ == "__main__":
+    main()
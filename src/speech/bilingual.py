@@ -0,0 +1,165 @@
+"""
+bilingual.py
+------------
+Reconnaissance bilingue français / anglais avec les deux modèles Vosk résidents
+(chargés une fois, partagés par tous les fichiers).
+
+Deux stratégies de routage :
+
+    lid       identification de langue sur les PROBE_SEC premières secondes :
+              un recognizer jetable par langue décode ce début en parallèle
+              (threads ; les appels Vosk relâchent le GIL), puis un recognizer
+              neuf de la langue la mieux notée décode tout le fichier d'un seul
+              flux (pas de frontière d'énoncé forcée à PROBE_SEC).
+              Surcoût : PROBE_SEC de décodage dans chaque langue.
+    parallel  les deux recognizers décodent tout le fichier en parallèle,
+              la transcription la mieux notée est retenue (2x CPU).
+
+Note d'une hypothèse : confiance moyenne des mots Vosk + STOPWORD_WEIGHT x part
+de mots-outils de la langue (un modèle qui « force » une langue étrangère produit
+des mots peu sûrs et peu de mots-outils).
+
+    from src.speech.bilingual import BilingualRecognizer
+    router = BilingualRecognizer()            # DEFAULT_MODEL_FR + DEFAULT_MODEL_EN
+    text, language, info = router.transcribe(wav_path)
+"""
+
+import json
+import time
+import wave
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from vosk import KaldiRecognizer, Model
+
+from src.common.config import DEFAULT_MODEL_EN, DEFAULT_MODEL_FR
+from src.common.memory import rss_mb
+from src.common.profiling import stage
+from src.speech.vosk_decode import CHUNK_FRAMES, decode_wav_words
+from src.speech.word_timings import WordTimings
+
+STRATEGIES = ("lid", "parallel")
+PROBE_SEC = 3.0
+STOPWORD_WEIGHT = 0.5
+STOPWORDS = {
+    "fr": frozenset("le la les un une des de du et est en dans que qui pour pas sur avec il elle je vous nous "
+                    "on au aux ce cette son sa ses mais ou plus a".split()),
+    "en": frozenset("the a an and is are of to in that it for on with as was be this you he she we they "
+                    "not but or at by have has i".split()),
+}
+
+
+def score_hypothesis(words, conf, language):
+    """Confiance moyenne + poids des mots-outils de la langue (0 sans mot)."""
+    if not words:
+        return 0.0
+    stopwords = STOPWORDS.get(language, frozenset())
+    ratio = sum(w in stopwords for w in words) / len(words)
+    return float(sum(conf) / len(conf)) + STOPWORD_WEIGHT * ratio
+
+
+class BilingualRecognizer:
+    def __init__(self, models=None, strategy="lid", probe_sec=PROBE_SEC, chunk_frames=CHUNK_FRAMES):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Stratégie inconnue : {strategy} (disponibles : {', '.join(STRATEGIES)})")
+        self.model_dirs = models or {"fr": DEFAULT_MODEL_FR, "en": DEFAULT_MODEL_EN}
+        self.strategy = strategy
+        self.probe_sec = probe_sec
+        self.chunk_frames = chunk_frames
+        self.models = {}
+        # Empreinte mémoire de chaque modèle (delta RSS au chargement)
+        self.load_mb = {}
+        self._pool = ThreadPoolExecutor(max_workers=len(self.model_dirs))
+
+    def load(self):
+        """Charge les modèles manquants (un modèle déjà fourni dans self.models est conservé)."""
+        for language, model_dir in self.model_dirs.items():
+            if language in self.models:
+                continue
+            before = rss_mb()
+            with stage(f"vosk.model_load.{language}"):
+                self.models[language] = Model(model_dir)
+            self.load_mb[language] = round(rss_mb() - before, 2)
+        return self
+
+    @property
+    def languages(self):
+        return list(self.model_dirs)
+
+    # ------------------ Transcription ------------------
+    def transcribe(self, wav_path):
+        """Renvoie (texte, langue, infos : stratégie, scores, routing_sec = temps du routage)."""
+        if len(self.models) < len(self.model_dirs):
+            self.load()
+        if self.strategy == "parallel":
+            return self._transcribe_parallel(wav_path)
+        return self._transcribe_lid(wav_path)
+
+    def _transcribe_parallel(self, wav_path):
+        start = time.perf_counter()
+        futures = {lang: self._pool.submit(decode_wav_words, model, wav_path, chunk_frames=self.chunk_frames)
+                   for lang, model in self.models.items()}
+        hypotheses = {lang: f.result() for lang, f in futures.items()}
+        scores = {lang: score_hypothesis(t.words, t.conf, lang) for lang, (_, t) in hypotheses.items()}
+        language = max(scores, key=scores.get)
+        info = {"strategy": "parallel", "scores": scores, "routing_sec": round(time.perf_counter() - start, 4)}
+        return hypotheses[language][0], language, info
+
+    def _recognizer(self, language, rate):
+        rec = KaldiRecognizer(self.models[language], rate)
+        rec.SetWords(True)
+        return rec
+
+    @staticmethod
+    def _feed(rec, chunks, emit_offset, rate):
+        """Envoie des blocs à un recognizer ; renvoie les (résultat, position d'émission)."""
+        results = []
+        frames = emit_offset
+        for data in chunks:
+            frames += len(data) // 2
+            with stage("vosk.accept_waveform"):
+                final = rec.AcceptWaveform(data)
+            if final:
+                results.append((json.loads(rec.Result()), frames / rate))
+        return results
+
+    def _transcribe_lid(self, wav_path):
+        with wave.open(wav_path, "rb") as wf:
+            rate = wf.getframerate()
+            probe_chunks = []
+            probe_frames = int(self.probe_sec * rate)
+            while sum(len(c) for c in probe_chunks) // 2 < probe_frames:
+                data = wf.readframes(self.chunk_frames)
+                if not data:
+                    break
+                probe_chunks.append(data)
+            probed = sum(len(c) for c in probe_chunks) // 2
+
+            # Sonde : chaque langue décode le début en parallèle sur un recognizer jetable
+            start = time.perf_counter()
+            with stage("bilingual.probe"):
+                def probe(lang):
+                    rec = self._recognizer(lang, rate)
+                    results = self._feed(rec, probe_chunks, 0, rate)
+                    results.append((json.loads(rec.FinalResult()), probed / rate))
+                    return results
+
+                probes = dict(zip(self.models, self._pool.map(probe, list(self.models))))
+            probe_sec = time.perf_counter() - start
+            timings = {lang: WordTimings.from_results(res) for lang, res in probes.items()}
+            scores = {lang: score_hypothesis(t.words, t.conf, lang) for lang, t in timings.items()}
+            language = max(scores, key=scores.get)
+
+            # Fichier complet dans la langue retenue : un recognizer neuf reprend les blocs de la
+            # sonde puis la suite, sans le FinalResult de la sonde qui aurait coupé un mot à PROBE_SEC
+            rec = self._recognizer(language, rate)
+            rest = iter(lambda: wf.readframes(self.chunk_frames), b"")
+            results = self._feed(rec, chain(probe_chunks, rest), 0, rate)
+            with stage("vosk.final_result"):
+                results.append((json.loads(rec.FinalResult()), wf.getnframes() / rate))
+
+        text = " ".join(t for t in (res.get("text", "") for res, _ in results) if t).strip()
+        info = {"strategy": "lid", "scores": scores, "routing_sec": round(probe_sec, 4)}
+        return text, language, info
+
+    def close(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,170 @@
+"""
+denoise.py
+----------
+Débruitage en flux avant Vosk (bloc opératoire : ventilation, moniteurs, aspiration).
+
+Filtre de Wiener à SNR a priori « decision-directed » sur une STFT à 50 % de
+recouvrement (fenêtres racine de Hann, reconstruction parfaite) :
+
+    - bruit estimé par bande : moyenne récursive sur les trames où la bande ne
+      contient pas de parole (SNR a posteriori < SPEECH_GAMMA), avec une lente
+      remontée pour suivre un bruit qui augmente ; initialisation possible par
+      un profil moyen des enregistrements de NOISE_DIR (noise_profile) ;
+    - gain G = xi / (1 + xi), borné par gain_floor pour limiter le bruit musical.
+
+StreamingDenoiser.process(bytes) -> bytes : PCM 16 bits en entrée et en sortie,
+sur les mêmes blocs que ceux lus par vosk_decode (paramètre frontend). Latence
+algorithmique : FRAME - HOP échantillons (16 ms à 16 kHz), compensée en sortie
+(le flux débruité reste aligné sur l'original, flush() rend la fin). Coût par
+bloc borné : une FFT par lot de trames, seule la récursion du gain est par trame.
+
+    from src.speech.denoise import StreamingDenoiser
+    text = decode_wav(model, wav_path, frontend=StreamingDenoiser())
+"""
+
+import os
+import wave
+import numpy as np
+
+from src.common.config import NOISE_DIR, SAMPLE_RATE
+from src.common.profiling import stage
+from src.speech.vosk_decode import CHUNK_FRAMES, convert_to_wav, is_vosk_ready
+
+FRAME = 512
+HOP = FRAME // 2
+SPEECH_GAMMA = 3.0      # SNR a posteriori au-delà duquel la bande est considérée comme parole
+NOISE_ALPHA = 0.95      # lissage de l'estimation du bruit
+NOISE_RISE = 1.002      # remontée par trame des bandes jugées parole (~0,5 dB/s)
+DD_ALPHA = 0.98         # lissage « decision-directed » du SNR a priori
+INIT_FRAMES = 8         # trames d'amorçage du bruit sans profil (~130 ms)
+EPS = 1e-10
+
+WINDOW = np.sqrt(0.5 - 0.5 * np.cos(2 * np.pi * np.arange(FRAME) / FRAME)).astype(np.float32)
+
+
+def _spectra(samples):
+    """Trames (recouvrement 50 %) d'un signal float32 -> puissances (n, FRAME // 2 + 1)."""
+    n = (len(samples) - FRAME) // HOP + 1
+    if n <= 0:
+        return np.zeros((0, FRAME // 2 + 1), dtype=np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME)[::HOP][:n]
+    spec = np.fft.rfft(frames * WINDOW, axis=1)
+    return (spec.real ** 2 + spec.imag ** 2).astype(np.float32)
+
+
+def noise_profile(paths=None, noise_dir=NOISE_DIR, max_sec=30.0):
+    """Spectre de puissance moyen des bruits de référence (NOISE_DIR), None s'il n'y en a pas."""
+    if paths is None:
+        if not os.path.isdir(noise_dir):
+            return None
+        paths = [os.path.join(noise_dir, f) for f in sorted(os.listdir(noise_dir))
+                 if f.lower().endswith((".wav", ".mp3", ".flac", ".ogg", ".m4a"))]
+    total, count = None, 0
+    for path in paths:
+        wav_path = path if is_vosk_ready(path) else convert_to_wav(path)
+        try:
+            with wave.open(wav_path, "rb") as wf:
+                data = wf.readframes(int(max_sec * wf.getframerate()))
+        finally:
+            if wav_path != path and os.path.exists(wav_path):
+                os.remove(wav_path)
+        power = _spectra(np.frombuffer(data, dtype=np.int16).astype(np.float32))
+        if len(power):
+            total = power.sum(axis=0) if total is None else total + power.sum(axis=0)
+            count += len(power)
+    return total / count if count else None
+
+
+class StreamingDenoiser:
+    def __init__(self, noise_psd=None, gain_floor=0.1, rate=SAMPLE_RATE):
+        if rate != SAMPLE_RATE:
+            raise ValueError(f"Débruitage prévu pour {SAMPLE_RATE} Hz (reçu : {rate} Hz)")
+        self.profile = None if noise_psd is None else np.asarray(noise_psd, dtype=np.float32)
+        self.gain_floor = gain_floor
+        self.reset()
+
+    @property
+    def latency_ms(self):
+        return 1000.0 * (FRAME - HOP) / SAMPLE_RATE
+
+    def reset(self):
+        # FRAME - HOP zéros en tête : la première trame couvre le début du signal
+        self._in = np.zeros(FRAME - HOP, dtype=np.float32)
+        self._ola = np.zeros(HOP, dtype=np.float32)
+        self._noise = None if self.profile is None else self.profile.copy()
+        self._init = [] if self.profile is None else None
+        self._prev = None          # |S|² estimé de la trame précédente (decision-directed)
+        self._to_skip = FRAME - HOP
+        self._owed = 0             # échantillons reçus et pas encore rendus
+
+    # ------------------ Gain par trame ------------------
+    def _gains(self, power):
+        gains = np.empty_like(power)
+        for i, p in enumerate(power):
+            if self._noise is None:
+                # Amorçage sans profil : les premières trames sont supposées sans parole
+                self._init.append(p)
+                if len(self._init) < INIT_FRAMES:
+                    gains[i] = 1.0
+                    continue
+                self._noise = np.mean(self._init, axis=0)
+                self._init = None
+            gamma = p / (self._noise + EPS)
+            ml = np.maximum(gamma - 1.0, 0.0)
+            xi = ml if self._prev is None else DD_ALPHA * self._prev / (self._noise + EPS) + (1 - DD_ALPHA) * ml
+            g = np.maximum(xi / (1.0 + xi), self.gain_floor)
+            self._prev = (g * g) * p
+            gains[i] = g
+            noise_bins = gamma < SPEECH_GAMMA
+            self._noise = np.where(noise_bins, NOISE_ALPHA * self._noise + (1 - NOISE_ALPHA) * p,
+                                   self._noise * NOISE_RISE)
+        return gains
+
+    # ------------------ Flux ------------------
+    def process(self, data):
+        """Bloc PCM 16 bits -> bloc débruité (longueur variable, alignée sur l'entrée)."""
+        with stage("denoise.chunk"):
+            new = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+            self._owed += len(new)
+            x = np.concatenate([self._in, new])
+            n = (len(x) - FRAME) // HOP + 1
+            if n <= 0:
+                self._in = x
+                return b""
+            frames = np.lib.stride_tricks.sliding_window_view(x, FRAME)[::HOP][:n]
+            spec = np.fft.rfft(frames * WINDOW, axis=1)
+            gains = self._gains((spec.real ** 2 + spec.imag ** 2).astype(np.float32))
+            y = np.fft.irfft(spec * gains, n=FRAME, axis=1).astype(np.float32) * WINDOW
+            # Recouvrement-addition (50 %) : première moitié + seconde moitié de la trame précédente
+            tails = np.vstack([self._ola[None, :], y[:-1, HOP:]])
+            out = (y[:, :HOP] + tails).reshape(-1)
+            self._ola = y[-1, HOP:].copy()
+            self._in = x[n * HOP:]
+            return self._emit(out)
+
+    def _emit(self, out):
+        if self._to_skip:
+            skip = min(self._to_skip, len(out))
+            out = out[skip:]
+            self._to_skip -= skip
+        out = out[:self._owed]
+        self._owed -= len(out)
+        return np.clip(np.round(out), -32768, 32767).astype(np.int16).tobytes()
+
+    def flush(self):
+        """Fin du flux : rend les derniers échantillons encore dans la fenêtre."""
+        if not self._owed:
+            return b""
+        owed = self._owed
+        tail = self.process(np.zeros(FRAME, dtype=np.int16).tobytes())
+        self._owed = 0
+        return tail[:2 * owed]
+
+
+def denoise_pcm(data, denoiser=None, chunk_frames=CHUNK_FRAMES):
+    """Débruite un signal PCM 16 bits complet (mêmes blocs que la boucle Vosk)."""
+    denoiser = denoiser or StreamingDenoiser()
+    step = 2 * chunk_frames
+    parts = [denoiser.process(data[i:i + step]) for i in range(0, len(data), step)]
+    parts.append(denoiser.flush())
+    return b"".join(parts)
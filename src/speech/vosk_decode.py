@@ -0,0 +1,149 @@
+"""
+vosk_decode.py
+--------------
+Boucle de décodage Vosk commune aux benchmarks et à l'inférence.
+"""
+
+import os
+import json
+import wave
+import tempfile
+import subprocess
+from vosk import KaldiRecognizer
+
+from src.common.config import SAMPLE_RATE
+from src.common.profiling import profiled, stage
+from src.speech.word_timings import WordTimings
+
+CHUNK_FRAMES = 4000
+
+
+@profiled("ffmpeg.convert")
+def convert_to_wav(input_path, sample_rate=SAMPLE_RATE):
+    """
+    Convertit un fichier audio/vidéo en WAV mono 16 kHz dans un fichier temporaire
+    unique (sûr en parallèle). L'appelant supprime le fichier retourné.
+    """
+    fd, temp_path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    subprocess.run(
+        ["ffmpeg", "-y", "-i", input_path, "-ac", "1", "-ar", str(sample_rate), "-vn", temp_path],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True
+    )
+    return temp_path
+
+
+def is_vosk_ready(wav_path, sample_rate=SAMPLE_RATE):
+    """Vrai si le fichier est déjà un WAV mono PCM 16 bits au bon taux."""
+    if not wav_path.lower().endswith(".wav"):
+        return False
+    try:
+        with wave.open(wav_path, "rb") as wf:
+            return wf.getnchannels() == 1 and wf.getsampwidth() == 2 and wf.getframerate() == sample_rate
+    except (wave.Error, EOFError):
+        return False
+
+
+def wav_duration(wav_path):
+    """Durée en secondes d'un fichier WAV."""
+    with wave.open(wav_path, "rb") as wf:
+        return wf.getnframes() / float(wf.getframerate())
+
+
+def _decode(model, wav_path, grammar, chunk_frames, words, max_alternatives=0, monitor=None, frontend=None):
+    """
+    Boucle commune : renvoie la liste des (résultat Vosk, position d'émission en s).
+    monitor : objet recevant chaque bloc PCM avant AcceptWaveform (monitor.update(data)),
+    par ex. MicObstructionDetector.
+    frontend : traitement du signal en flux appliqué avant Vosk (frontend.process(data)
+    -> bytes, frontend.flush() en fin de fichier), par ex. StreamingDenoiser.
+    """
+    with wave.open(wav_path, "rb") as wf:
+        rate = wf.getframerate()
+        with stage("vosk.recognizer_init"):
+            if grammar:
+                rec = KaldiRecognizer(model, rate, json.dumps(grammar, ensure_ascii=False))
+            else:
+                rec = KaldiRecognizer(model, rate)
+            if words:
+                rec.SetWords(True)
+            if max_alternatives:
+                rec.SetMaxAlternatives(max_alternatives)
+        results = []
+        frames = 0
+        while True:
+            data = wf.readframes(chunk_frames)
+            if len(data) == 0:
+                break
+            frames += len(data) // wf.getsampwidth()
+            if monitor is not None:
+                monitor.update(data)
+            if frontend is not None:
+                data = frontend.process(data)
+                if not data:
+                    continue
+            with stage("vosk.accept_waveform"):
+                final = rec.AcceptWaveform(data)
+            if final:
+                with stage("vosk.json"):
+                    results.append((json.loads(rec.Result()), frames / rate))
+        if frontend is not None:
+            tail = frontend.flush()
+            if tail:
+                with stage("vosk.accept_waveform"):
+                    final = rec.AcceptWaveform(tail)
+                if final:
+                    results.append((json.loads(rec.Result()), frames / rate))
+        with stage("vosk.final_result"):
+            results.append((json.loads(rec.FinalResult()), frames / rate))
+    return results
+
+
+def _best_text(res):
+    # Avec SetMaxAlternatives, le texte est dans alternatives[0] (hypothèses triées)
+    alternatives = res.get("alternatives")
+    if alternatives:
+        return alternatives[0].get("text", "")
+    return res.get("text", "")
+
+
+def _join_text(results):
+    return " ".join(t for t in (_best_text(res) for res, _ in results) if t).strip()
+
+
+@profiled("vosk.decode")
+def decode_wav(model, wav_path, grammar=None, chunk_frames=CHUNK_FRAMES, monitor=None, frontend=None):
+    """
+    Décode un WAV mono PCM 16 bits avec Vosk et renvoie le texte reconnu.
+    grammar : liste de mots/phrases injectée comme grammaire du recognizer.
+    """
+    return _join_text(_decode(model, wav_path, grammar, chunk_frames, words=False, monitor=monitor, frontend=frontend))
+
+
+@profiled("vosk.decode")
+def decode_wav_words(model, wav_path, grammar=None, chunk_frames=CHUNK_FRAMES, monitor=None, frontend=None):
+    """
+    Comme decode_wav, avec SetWords : renvoie (texte, WordTimings) où chaque mot
+    porte start / end / conf et la position audio à laquelle il a été finalisé.
+    """
+    results = _decode(model, wav_path, grammar, chunk_frames, words=True, monitor=monitor, frontend=frontend)
+    return _join_text(results), WordTimings.from_results(results)
+
+
+@profiled("vosk.decode")
+def decode_wav_nbest(model, wav_path, max_alternatives=5, grammar=None, chunk_frames=CHUNK_FRAMES, monitor=None,
+                     frontend=None):
+    """
+    Décodage avec SetMaxAlternatives : renvoie une liste de segments (un par
+    résultat final Vosk), chacun étant la liste des (texte, score) des N
+    meilleures hypothèses, la première étant le 1-best.
+    """
+    segments = []
+    results = _decode(model, wav_path, grammar, chunk_frames, words=False,
+                      max_alternatives=max_alternatives, monitor=monitor, frontend=frontend)
+    for res, _ in results:
+        alternatives = res.get("alternatives") or [{"text": res.get("text", ""), "confidence": 0.0}]
+        hypotheses = [(a.get("text", "").strip(), float(a.get("confidence", 0.0))) for a in alternatives]
+        if any(text for text, _ in hypotheses):
+            segments.append(hypotheses)
+    return segments
@@ -0,0 +1,163 @@
+"""
+vosk_lexicon.py
+---------------
+Chargement rapide du lexique d'un modèle Vosk (graph/words.txt, plusieurs
+centaines de milliers d'entrées pour les grands modèles).
+
+- Normalisation (nettoyage pour les grammaires Vosk, comme l'ancien
+  vocab_from_medium_vosk.py) : minuscules, chiffres supprimés, accents et
+  ligatures translittérés en ASCII par une table str.translate construite une
+  fois, ftfy appelé seulement sur les tokens qui présentent un double encodage.
+- Résultat : marisa_trie.Trie trié et compact (appartenance et recherche par
+  préfixe sans liste Python de chaînes).
+- Cache : le trie est écrit dans LEXICON_CACHE_DIR sous une clé formée du SHA-1
+  de words.txt et de la version de normalisation, puis relu par mmap.
+
+    from src.speech.vosk_lexicon import load_lexicon
+    words = load_lexicon()                       # VOCAB_DATA_DIR/words.txt normalisé
+    raw = load_lexicon(path, normalize=False)    # entrées brutes
+    "pneumonie" in words ; words.keys("pneumo")
+
+    python -m src.speech.vosk_lexicon models/vosk-model-fr-0.22/graph/words.txt
+    python -m src.speech.vosk_lexicon --compare   # écarts avec l'ancienne normalisation
+"""
+
+import os
+import re
+import time
+import argparse
+import functools
+import unicodedata
+import marisa_trie
+
+from src.common.config import LEXICON_CACHE_DIR, VOCAB_DATA_DIR
+from src.common.run_manifest import file_hash
+
+WORDS_TXT = os.path.join(VOCAB_DATA_DIR, "words.txt")
+NORMALIZATION_VERSION = 2
+
+# Caractères interdits dans une grammaire Vosk
+FORBIDDEN_RE = re.compile(r'[#"\\{}\[\]!]')
+# Séquences typiques d'un UTF-8 relu en Latin-1 (é -> Ã©, ’ -> â€™...)
+MOJIBAKE_RE = re.compile("[ÃÂÅ]|â€")
+DIGITS_TABLE = str.maketrans("", "", "0123456789")
+SPECIAL = {"œ": "oe", "Œ": "oe", "æ": "ae", "Æ": "ae", "ß": "ss", "’": "'", "‘": "'", "ʼ": "'"}
+# Plages translittérées : latin et symboles, formes de présentation (ligatures ﬁ, ﬂ...),
+# formes pleine chasse ; le reste est supprimé par l'encodage ASCII
+TABLE_RANGES = ((0x80, 0x2500), (0xFB00, 0xFB50), (0xFF00, 0xFFF0))
+
+
+@functools.lru_cache(maxsize=None)
+def ascii_table():
+    """
+    Table str.translate : caractère -> équivalent ASCII (ou suppression). Les chiffres
+    sont supprimés après translittération (x² -> x, ① -> rien, pas x2 / 1).
+    """
+    table = {}
+    for start, end in TABLE_RANGES:
+        for cp in range(start, end):
+            decomposed = unicodedata.normalize("NFKD", chr(cp))
+            table[cp] = "".join(c for c in decomposed if ord(c) < 128 and not c.isdigit()).lower() or None
+    for ch, repl in SPECIAL.items():
+        table[ord(ch)] = repl
+    table.update(DIGITS_TABLE)
+    return table
+
+
+def normalize_token(token):
+    """Token de words.txt -> forme ASCII minuscule utilisable dans une grammaire, ou None."""
+    token = token.strip()
+    if token.isascii():
+        token = token.lower().translate(DIGITS_TABLE)
+    else:
+        if MOJIBAKE_RE.search(token):
+            import ftfy
+            token = ftfy.fix_text(token)
+        # Caractères hors table (autres écritures) : supprimés par l'encodage ASCII
+        token = token.lower().translate(ascii_table()).encode("ascii", "ignore").decode("ascii")
+    if not token or FORBIDDEN_RE.search(token):
+        return None
+    return token
+
+
+def legacy_normalize(token):
+    """Ancienne normalisation de vocab_from_medium_vosk.py (ftfy sur chaque token), pour comparaison."""
+    import ftfy
+    token = "".join(c for c in token if not c.isdigit()).strip()
+    token = unicodedata.normalize("NFKD", ftfy.fix_text(token).replace("œ", "oe").replace("Œ", "Oe"))
+    token = "".join(c for c in token if unicodedata.category(c) != "Mn").lower()
+    token = "".join(c for c in token if ord(c) < 128).strip()
+    if not token or FORBIDDEN_RE.search(token):
+        return None
+    return token
+
+
+def compare_normalization(words):
+    """Tokens dont la normalisation diffère de l'ancienne : [(token, ancienne, nouvelle)]."""
+    return [(w, old, new) for w in words
+            for old, new in [(legacy_normalize(w), normalize_token(w))] if old != new]
+
+
+def read_words(path):
+    """Première colonne de words.txt (l'id Kaldi est ignoré)."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            word, _, _ = line.partition(" ")
+            word = word.strip()
+            if word:
+                yield word
+
+
+def _cache_path(path, normalize, cache_dir):
+    kind = f"norm{NORMALIZATION_VERSION}" if normalize else "raw"
+    return os.path.join(cache_dir, f"{file_hash(path)[:16]}-{kind}.marisa")
+
+
+def load_lexicon(path=WORDS_TXT, normalize=True, cache_dir=LEXICON_CACHE_DIR, force=False):
+    """Trie des mots du lexique (normalisés ou bruts), relu depuis le cache si words.txt n'a pas changé."""
+    cache = _cache_path(path, normalize, cache_dir)
+    if os.path.exists(cache) and not force:
+        trie = marisa_trie.Trie()
+        trie.mmap(cache)
+        return trie
+
+    words = read_words(path)
+    if normalize:
+        words = (w for w in map(normalize_token, words) if w)
+    trie = marisa_trie.Trie(set(words))
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{cache}.{os.getpid()}.tmp"
+    trie.save(tmp_path)
+    os.replace(tmp_path, cache)
+    return trie
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lexique Vosk normalisé et mis en cache (trie)")
+    parser.add_argument("words_txt", nargs="?", default=WORDS_TXT)
+    parser.add_argument("--raw", action="store_true", help="Sans normalisation")
+    parser.add_argument("--force", action="store_true", help="Reconstruire le cache")
+    parser.add_argument("--compare", action="store_true",
+                        help="Compare la normalisation à l'ancien script et liste les écarts")
+    args = parser.parse_args()
+
+    if args.compare:
+        words = list(read_words(args.words_txt))
+        diffs = compare_normalization(words)
+        print(f"{len(diffs)} / {len(words)} tokens normalisés différemment de vocab_from_medium_vosk.py")
+        for token, old, new in diffs[:50]:
+            print(f"  {token!r:>24} : {old!r} -> {new!r}")
+        return
+
+    start = time.perf_counter()
+    trie = load_lexicon(args.words_txt, normalize=not args.raw, force=args.force)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    load_lexicon(args.words_txt, normalize=not args.raw)
+    cached = time.perf_counter() - start
+    print(f"{len(trie)} mots ; construction / chargement : {cold:.3f} s, depuis le cache : {cached:.3f} s")
+    print(f"Cache : {_cache_path(args.words_txt, not args.raw, LEXICON_CACHE_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+word_timings.py
+---------------
+Mots reconnus par Vosk avec leurs timings et confiances (SetWords), stockés
+de façon compacte : une liste de mots + un tableau float32 (n, 4) :
+
+    start  : début du mot (s)
+    end    : fin du mot (s)
+    conf   : confiance Vosk (0..1)
+    emit   : position audio (s) à laquelle le résultat contenant le mot a été
+             renvoyé par le recognizer -> emit - end = latence de finalisation
+
+Sérialisation JSON en colonnes ({"w": [...], "start": [...], ...}), 4 à 5 fois plus
+compacte que la liste de dicts renvoyée par Vosk.
+"""
+
+import json
+import numpy as np
+
+COLUMNS = ("start", "end", "conf", "emit")
+START, END, CONF, EMIT = range(4)
+
+
+class WordTimings:
+    __slots__ = ("words", "values")
+
+    def __init__(self, words=None, values=None):
+        self.words = list(words or [])
+        self.values = np.asarray(values, dtype=np.float32).reshape(-1, 4) if values is not None \
+            else np.zeros((0, 4), dtype=np.float32)
+
+    # ------------------ Construction ------------------
+    @classmethod
+    def from_results(cls, results):
+        """results : [(résultat Vosk décodé, position d'émission en s)]."""
+        words, rows = [], []
+        for res, emit in results:
+            for w in res.get("result", ()):
+                words.append(w["word"])
+                rows.append((w["start"], w["end"], w.get("conf", 1.0), emit))
+        return cls(words, rows if rows else None)
+
+    @classmethod
+    def concat(cls, parts, offsets=None):
+        """Recolle des segments (offsets en s ajoutés aux temps de chaque segment)."""
+        parts = list(parts)
+        offsets = offsets or [0.0] * len(parts)
+        words, arrays = [], []
+        for part, offset in zip(parts, offsets):
+            words.extend(part.words)
+            arrays.append(part.shifted(offset).values)
+        return cls(words, np.concatenate(arrays) if arrays else None)
+
+    # ------------------ Accès ------------------
+    def __len__(self):
+        return len(self.words)
+
+    @property
+    def text(self):
+        return " ".join(self.words)
+
+    @property
+    def conf(self):
+        return self.values[:, CONF]
+
+    def shifted(self, offset):
+        values = self.values.copy()
+        values[:, [START, END, EMIT]] += offset
+        return WordTimings(self.words, values)
+
+    def between(self, t0, t1):
+        """Mots dont le début est dans [t0, t1)."""
+        mask = (self.values[:, START] >= t0) & (self.values[:, START] < t1)
+        return WordTimings([w for w, keep in zip(self.words, mask) if keep], self.values[mask])
+
+    def low_confidence(self, threshold):
+        """Indices des mots sous le seuil de confiance."""
+        return np.flatnonzero(self.values[:, CONF] < threshold)
+
+    def stats(self, threshold=0.7):
+        """Résumé pour les métriques / logs : confiance et latence de finalisation."""
+        if not len(self):
+            return {"words": 0, "conf_mean": None, "low_conf_ratio": None, "emit_lag_p50": None, "emit_lag_p90": None}
+        lag = self.values[:, EMIT] - self.values[:, END]
+        return {
+            "words": len(self),
+            "conf_mean": round(float(self.conf.mean()), 4),
+            "low_conf_ratio": round(float((self.conf < threshold).mean()), 4),
+            "emit_lag_p50": round(float(np.percentile(lag, 50)), 3),
+            "emit_lag_p90": round(float(np.percentile(lag, 90)), 3),
+        }
+
+    # ------------------ Sérialisation ------------------
+    def to_dict(self, decimals=3):
+        values = np.round(self.values.astype(np.float64), decimals)
+        return {"w": self.words, **{c: values[:, i].tolist() for i, c in enumerate(COLUMNS)}}
+
+    @classmethod
+    def from_dict(cls, data):
+        values = np.column_stack([data[c] for c in COLUMNS]) if data.get("w") else None
+        return cls(data.get("w", []), values)
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,225 @@
+"""
+compile_medical_graph.py
+------------------------
+Compilation hors ligne du vocabulaire médical dans le graphe Vosk, à la place
+de la grammaire injectée à l'exécution (KaldiRecognizer(model, rate, grammar)).
+
+Le modèle produit (DEFAULT_OUTPUT_DIR par défaut) décode sans contrainte,
+à la vitesse du modèle de base, tout en connaissant les termes médicaux.
+Un dossier de sortie existant (EXPERIMENTAL_MODEL_FR par exemple) n'est
+remplacé qu'avec --force ; --dry_run n'écrit rien.
+
+Pré-requis :
+  - Kaldi compilé (KALDI_ROOT) et SRILM (ngram-count, ngram) dans le PATH ;
+  - le paquet de compilation du modèle (--compile_dir) : am/ exp/chain/tdnn,
+    db/ (lexique .dic, LM de base .lm.gz, phones/), utils/ steps/ ;
+  - lexicon_extra.txt produit par src/stt/lexicon_extra.py.
+
+Étapes :
+  1. corpus : textes des transcriptions normalisés -> extra.txt
+  2. LM     : LM 3-gramme du corpus interpolé avec le LM de base, puis élagué (SRILM)
+  3. dict   : lexique de base + lexicon_extra (entrées aux phonèmes inconnus écartées)
+  4. lang   : prepare_lang.sh + format_lm.sh
+  5. graphe : mkgraph_lookahead.sh (Gr.fst + HCLr.fst, format des petits modèles Vosk)
+  6. modèle : copie du modèle de base avec le nouveau graphe -> --output_dir
+
+Exemple :
+    python -m src.stt.compile_medical_graph --compile_dir models/vosk-model-fr-compile --dry_run
+"""
+
+import os
+import re
+import gzip
+import shutil
+import argparse
+import subprocess
+
+from src.common.config import DEFAULT_MODEL_FR, MODELS_DIR, TRANSCRIPTS_DIR, VOCAB_DATA_DIR
+from src.common.event_log import get_logger
+
+logger = get_logger(__name__, "compile_medical_graph")
+
+# ------------------ Fichiers ------------------
+LEXICON_EXTRA = os.path.join(VOCAB_DATA_DIR, "lexicon_extra.txt")
+DEFAULT_COMPILE_DIR = os.path.join(MODELS_DIR, "vosk-model-fr-compile")
+DEFAULT_OUTPUT_DIR = os.path.join(MODELS_DIR, "vosk-model-small-fr-0.22-med-graph")
+TOKEN_RE = re.compile(r"[a-zàâäçéèêëîïôöùûüÿœæ'-]+")
+
+# Fichiers du graphe lookahead copiés dans le modèle Vosk
+GRAPH_FILES = ["HCLr.fst", "Gr.fst", "words.txt", "phones/word_boundary.int", "disambig_tid.int"]
+
+
+# ------------------ Utilitaires ------------------
+def run(cmd, cwd, dry_run=False, stdout=None):
+    logger.info(f"$ {' '.join(cmd)}")
+    if dry_run:
+        return
+    subprocess.run(cmd, cwd=cwd, check=True, stdout=stdout)
+
+
+def normalize_line(text):
+    return " ".join(TOKEN_RE.findall(text.lower()))
+
+
+def find_first(directory, suffixes):
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(suffixes):
+            return os.path.join(directory, name)
+    raise FileNotFoundError(f"Aucun fichier {suffixes} dans {directory}")
+
+
+# ------------------ Étapes ------------------
+def build_corpus(transcripts_dir, out_path, dry_run=False):
+    """Une phrase normalisée par ligne, depuis les .txt de TRANSCRIPTS_DIR (dry_run : comptage seul)."""
+    lines = 0
+    with open(os.devnull if dry_run else out_path, "w", encoding="utf-8") as out:
+        for name in sorted(os.listdir(transcripts_dir)):
+            if not name.endswith(".txt"):
+                continue
+            with open(os.path.join(transcripts_dir, name), "r", encoding="utf-8") as f:
+                for sentence in re.split(r"[.!?\n]+", f.read()):
+                    line = normalize_line(sentence)
+                    if line:
+                        out.write(line + "\n")
+                        lines += 1
+    logger.info(f"Corpus : {lines} phrases -> {out_path}")
+    return lines
+
+
+def load_phone_set(phone_dir):
+    phones = set()
+    for name in ("nonsilence_phones.txt", "silence_phones.txt"):
+        path = os.path.join(phone_dir, name)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    phones.update(line.split())
+    return phones
+
+
+def merge_lexicon(base_dic, extra_path, phones, out_path, dry_run=False):
+    """
+    Lexique de base + entrées supplémentaires. Une entrée dont un phonème
+    n'appartient pas au jeu du modèle acoustique est écartée (sinon prepare_lang échoue).
+    dry_run : statistiques seulement, rien n'est écrit.
+    """
+    entries = set()
+    opener = gzip.open if base_dic.endswith(".gz") else open
+    with opener(base_dic, "rt", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2:
+                entries.add((parts[0], " ".join(parts[1:])))
+
+    added = rejected = 0
+    if os.path.exists(extra_path):
+        with open(extra_path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 2:
+                    continue
+                word, pron = parts[0], parts[1:]
+                if phones and not set(pron) <= phones:
+                    rejected += 1
+                    continue
+                if (word, " ".join(pron)) not in entries:
+                    entries.add((word, " ".join(pron)))
+                    added += 1
+    else:
+        logger.warning(f"Lexique supplémentaire introuvable : {extra_path}")
+
+    with open(os.devnull if dry_run else out_path, "w", encoding="utf-8") as f:
+        f.write("[unk] SIL\n")
+        for word, pron in sorted(entries):
+            if word != "[unk]":
+                f.write(f"{word} {pron}\n")
+    logger.info(f"Lexique : {len(entries)} entrées ({added} ajoutées, {rejected} écartées : phonèmes inconnus)")
+
+
+def assemble_model(base_model, graph_dir, output_dir, dry_run=False, force=False):
+    """Copie le modèle de base puis remplace son graphe par le graphe compilé."""
+    logger.info(f"Assemblage du modèle : {base_model} + {graph_dir} -> {output_dir}")
+    if dry_run:
+        return
+    if os.path.exists(output_dir):
+        if not force:
+            raise FileExistsError(f"{output_dir} existe déjà (--force pour le remplacer)")
+        shutil.rmtree(output_dir)
+    shutil.copytree(base_model, output_dir)
+    for rel in GRAPH_FILES:
+        src = os.path.join(graph_dir, rel)
+        if os.path.exists(src):
+            dst = os.path.join(output_dir, "graph", rel)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copy2(src, dst)
+        else:
+            logger.warning(f"Fichier de graphe absent : {src}")
+
+
+# ------------------ Script principal ------------------
+def main():
+    parser = argparse.ArgumentParser(description="Compile le vocabulaire médical dans le graphe Vosk")
+    parser.add_argument("--compile_dir", type=str, default=DEFAULT_COMPILE_DIR, help="Paquet de compilation du modèle")
+    parser.add_argument("--base_model", type=str, default=DEFAULT_MODEL_FR)
+    parser.add_argument("--output_dir", type=str, default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--force", action="store_true", help="Remplacer --output_dir s'il existe")
+    parser.add_argument("--lexicon_extra", type=str, default=LEXICON_EXTRA)
+    parser.add_argument("--transcripts_dir", type=str, default=TRANSCRIPTS_DIR)
+    parser.add_argument("--order", type=int, default=3)
+    parser.add_argument("--mix_lambda", type=float, default=0.9, help="Poids du LM de base dans l'interpolation")
+    parser.add_argument("--prune", type=float, default=3e-8)
+    parser.add_argument("--dry_run", action="store_true", help="Afficher les commandes sans rien exécuter ni écrire")
+    args = parser.parse_args()
+
+    # Vérifié avant la compilation (longue) plutôt qu'à l'assemblage
+    if os.path.exists(args.output_dir) and not args.force and not args.dry_run:
+        parser.error(f"{args.output_dir} existe déjà : choisir un autre --output_dir ou ajouter --force")
+
+    cdir = os.path.abspath(args.compile_dir)
+    work = os.path.join(cdir, "data_med")
+    db = os.path.join(cdir, "db")
+    if not args.dry_run:
+        os.makedirs(os.path.join(work, "dict"), exist_ok=True)
+
+    # 1. Corpus
+    corpus = os.path.join(work, "extra.txt")
+    build_corpus(args.transcripts_dir, corpus, args.dry_run)
+
+    # 2. LM interpolé
+    base_lm = find_first(db, (".lm.gz", ".arpa.gz"))
+    extra_lm = os.path.join(work, "extra.lm.gz")
+    mixed_lm = os.path.join(work, "mix.lm.gz")
+    final_lm = os.path.join(work, "mix-pruned.lm.gz")
+    run(["ngram-count", "-order", str(args.order), "-wbdiscount", "-text", corpus, "-lm", extra_lm], cdir, args.dry_run)
+    run(["ngram", "-order", str(args.order), "-lm", base_lm, "-mix-lm", extra_lm,
+         "-lambda", str(args.mix_lambda), "-write-lm", mixed_lm], cdir, args.dry_run)
+    run(["ngram", "-order", str(args.order), "-lm", mixed_lm, "-prune", str(args.prune),
+         "-write-lm", final_lm], cdir, args.dry_run)
+
+    # 3. Dictionnaire
+    dict_dir = os.path.join(work, "dict")
+    phone_dir = os.path.join(db, "phone")
+    if os.path.isdir(phone_dir) and not args.dry_run:
+        for name in os.listdir(phone_dir):
+            shutil.copy2(os.path.join(phone_dir, name), dict_dir)
+    merge_lexicon(find_first(db, (".dic", ".dic.gz")), args.lexicon_extra, load_phone_set(phone_dir),
+                  os.path.join(dict_dir, "lexicon.txt"), args.dry_run)
+
+    # 4. Lang
+    lang, lang_test = os.path.join(work, "lang"), os.path.join(work, "lang_test")
+    run(["utils/prepare_lang.sh", dict_dir, "[unk]", os.path.join(work, "lang_local"), lang], cdir, args.dry_run)
+    run(["utils/format_lm.sh", lang, final_lm, os.path.join(dict_dir, "lexicon.txt"), lang_test], cdir, args.dry_run)
+
+    # 5. Graphe lookahead
+    am_dir = os.path.join(cdir, "exp", "chain", "tdnn")
+    graph_dir = os.path.join(work, "lgraph")
+    run(["utils/mkgraph_lookahead.sh", "--self-loop-scale", "1.0", "--remove-oov", "--compose-graph",
+         lang_test, am_dir, graph_dir], cdir, args.dry_run)
+
+    # 6. Modèle Vosk
+    assemble_model(args.base_model, graph_dir, args.output_dir, args.dry_run, args.force)
+    logger.info(f"Modèle médical compilé : {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
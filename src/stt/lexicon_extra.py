@@ -1,19 +1,11 @@
 import os
 import json
-import logging
 from src.common.config import VOCAB_DATA_DIR
+from src.nlp.g2p_fr import phones_for
+from src.common.event_log import get_logger
 
 # ------------------ Configuration du logger ------------------
-LOG_PATH = os.path.join(VOCAB_DATA_DIR, "generate_lexicon.log")
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_PATH, mode="a", encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__, "generate_lexicon")
 
 # ------------------ Fichiers ------------------
 LEXICON_PATH = os.path.join(VOCAB_DATA_DIR, "medical_vocab_phon.json")
@@ -46,7 +38,11 @@ def main():
                 if not word or not ph:
                     logger.warning(f"⚠️ Entrée incomplète ignorée : {word} -> {ph}")
                     continue
-                phones = " ".join(ph.replace(".", " ").split())
+                # Ancien format {mot: mot} : phonétisation par règles à la volée
+                phones = " ".join(phones_for(word, ph))
+                if not phones:
+                    logger.warning(f"⚠️ Aucune phonétisation pour : {word}")
+                    continue
                 f.write(f"{word} {phones}\n")
                 count += 1
 
@@ -1,7 +1,6 @@
 import os
 import json
 import wave
-import logging
 import time
 import psutil
 import csv
@@ -9,15 +8,11 @@ from vosk import Model, KaldiRecognizer
 from jiwer import wer
 import spacy
 from src.common.config import DEFAULT_MODEL_FR, PROCESSED_DATA_DIR, TRANSCRIPTS_DIR, RESULTS_DIR, VOCAB_DATA_DIR
+from src.common.event_log import get_logger
 
 # -------------------- Logger --------------------
 os.makedirs(RESULTS_DIR, exist_ok=True)
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[logging.StreamHandler()]
-)
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__, "recognize_medical_audio")
 
 # -------------------- Lemmatisation --------------------
 try:
@@ -1,30 +1,61 @@
 import os
-import whisper
+import argparse
 from src.common.config import MODELS_DIR, PROCESSED_DIR
+from src.transcription.transcript_cache import TranscriptCache, split_cached, write_transcript
+from src.transcription.whisper_batch import load_whisper_model, transcribe_files
 
 TRANSCRIPT_DIR = os.path.join("data", "transcripts")
-os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
+MODEL_NAME = "medium"
+# Mêmes options que transcribe_to_csv.py --mode sequential --precision fp32 : entrées de cache partagées
+OPTIONS = {"language": "fr", "mode": "sequential", "precision": "fp32"}
 
-# Chemin pour le cache du modèle
-os.environ["TORCH_HOME"] = MODELS_DIR
 
-# Charger un modèle Whisper open source
-model = whisper.load_model("medium")  
-print(f" Modèle Whisper chargé depuis {MODELS_DIR}")
+def transcript_path(audio_path):
+    return os.path.join(TRANSCRIPT_DIR, f"{os.path.splitext(os.path.basename(audio_path))[0]}.txt")
 
-# Parcourir les fichiers audio
-for file in os.listdir(PROCESSED_DIR):
-    if file.endswith(".wav"):
-        audio_path = os.path.join(PROCESSED_DIR, file)
-        print(f" Transcription de : {audio_path}")
 
-        result = model.transcribe(audio_path, language="fr")
+def main():
+    parser = argparse.ArgumentParser(description="Transcriptions Whisper des fichiers de PROCESSED_DIR")
+    parser.add_argument("--force", action="store_true", help="Ignorer le cache et tout retranscrire")
+    args = parser.parse_args()
 
-        # Sauvegarder la transcription
-        transcript_path = os.path.join(TRANSCRIPT_DIR, f"{os.path.splitext(file)[0]}.txt")
-        with open(transcript_path, "w", encoding="utf-8") as f:
-            f.write(result["text"])
+    os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
 
-        print(f"Transcription enregistrée : {transcript_path}")
+    # Chemin pour le cache du modèle
+    os.environ["TORCH_HOME"] = MODELS_DIR
 
-print("\nToutes les transcriptions sont terminées !")
+    # Seuls les fichiers absents du cache (contenu audio + modèle + options) sont transcrits
+    wav_paths = [os.path.join(PROCESSED_DIR, f) for f in os.listdir(PROCESSED_DIR) if f.endswith(".wav")]
+    cache = TranscriptCache()
+    cached, todo = split_cached(cache, wav_paths, MODEL_NAME, OPTIONS, force=args.force)
+    print(f" {len(cached)} fichiers en cache, {len(todo)} à transcrire")
+
+    for audio_path, text in cached.items():
+        write_transcript(transcript_path(audio_path), text)
+
+    if not todo:
+        print("\nToutes les transcriptions sont terminées !")
+        return
+
+    # Charger un modèle Whisper open source (fp32, comme l'indiquent les options du cache)
+    model, _ = load_whisper_model(MODEL_NAME, OPTIONS["precision"])
+    print(f" Modèle Whisper chargé depuis {MODELS_DIR}")
+
+    keys = dict(todo)
+
+    def store_batch(batch):
+        for audio_path, text in batch.items():
+            cache.put(keys[audio_path], text, audio_file=os.path.basename(audio_path), model=MODEL_NAME)
+            write_transcript(transcript_path(audio_path), text)
+            print(f"Transcription enregistrée : {transcript_path(audio_path)}")
+        # Cache réécrit par paquets d'entrées, pas après chaque fichier
+        cache.checkpoint()
+
+    transcribe_files(model, list(keys), OPTIONS["mode"], 1, OPTIONS["language"], on_batch=store_batch)
+    cache.save()
+
+    print("\nToutes les transcriptions sont terminées !")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,91 +1,130 @@
 import os
 import csv
-import whisper
-import logging
-import torch
-from tqdm import tqdm
+import argparse
 from src.common.config import TRANSCRIPTS_DIR, RESULTS_DIR, MODELS_DIR, WAV_DATA_DIR_v2  # <- Nouveau path
+from src.transcription.whisper_batch import PRECISIONS, load_whisper_model, transcribe_files
+from src.transcription.transcript_cache import TranscriptCache, split_cached, upsert_csv, write_transcript
+from src.common.event_log import get_logger
 
 # ---------------------------------------------------------------------
 # Configuration du logger
 # ---------------------------------------------------------------------
-LOG_PATH = os.path.join(RESULTS_DIR, "transcription_v2.log")
-os.makedirs(RESULTS_DIR, exist_ok=True)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_PATH, mode="a", encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__, "transcription_v2")
 
 # ---------------------------------------------------------------------
 # Configuration des chemins
 # ---------------------------------------------------------------------
-os.environ["TORCH_HOME"] = MODELS_DIR
 CSV_PATH = os.path.join(RESULTS_DIR, "transcriptions_v2.csv")
-os.makedirs(TRANSCRIPTS_DIR, exist_ok=True)
-os.makedirs(RESULTS_DIR, exist_ok=True)
+RTF_CSV_PATH = os.path.join(RESULTS_DIR, "whisper_rtf.csv")
+RTF_HEADER = ["model", "precision", "threads", "mode", "batch_size", "files", "audio_sec", "load_sec", "decode_sec", "rtf"]
+
 
 # ---------------------------------------------------------------------
-# Chargement du modèle Whisper
+# RTF
 # ---------------------------------------------------------------------
-device = "cuda" if torch.cuda.is_available() else "cpu"
-logger.info(f"Chargement du modèle Whisper (large) sur {device}...")
-try:
-    model = whisper.load_model("large", device=device)
-    logger.info("Modèle Whisper chargé avec succès !")
-except Exception as e:
-    logger.error(f"Erreur lors du chargement du modèle Whisper : {e}")
-    raise SystemExit(1)
+def append_rtf(row):
+    csv_exists = os.path.exists(RTF_CSV_PATH)
+    with open(RTF_CSV_PATH, mode="a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=RTF_HEADER)
+        if not csv_exists:
+            writer.writeheader()
+        writer.writerow(row)
+
 
 # ---------------------------------------------------------------------
-# Création / ouverture du CSV
+# Programme principal
 # ---------------------------------------------------------------------
-csv_exists = os.path.exists(CSV_PATH)
-try:
-    with open(CSV_PATH, mode="a", newline="", encoding="utf-8") as csv_file:
-        writer = csv.writer(csv_file)
+def main():
+    parser = argparse.ArgumentParser(description="Transcriptions de référence Whisper (CPU)")
+    parser.add_argument("--model", type=str, default="large", help="tiny, base, small, medium, large...")
+    parser.add_argument("--precision", type=str, default="fp32", choices=PRECISIONS)
+    parser.add_argument("--threads", type=int, default=None, help="Threads torch (défaut : tous les cœurs)")
+    parser.add_argument("--mode", type=str, default="batched", choices=["batched", "sequential"])
+    parser.add_argument("--batch_size", type=int, default=8, help="Fenêtres de 30 s par passe encodeur")
+    parser.add_argument("--language", type=str, default="fr")
+    parser.add_argument("--wav_dir", type=str, default=WAV_DATA_DIR_v2)
+    parser.add_argument("--force", action="store_true", help="Ignorer le cache et tout retranscrire")
+    args = parser.parse_args()
 
-        if not csv_exists:
-            writer.writerow(["audio_file", "transcript_file", "transcription_text"])
-            logger.info(" Nouveau fichier CSV créé avec en-tête.")
-
-        # -----------------------------------------------------------------
-        # Parcourir tous les fichiers .wav dans WAV_DATA_DIR_v2 avec tqdm
-        # -----------------------------------------------------------------
-        wav_files = [f for f in os.listdir(WAV_DATA_DIR_v2) if f.lower().endswith(".wav")]
-
-        for file in tqdm(wav_files, desc="Transcription des fichiers v2", unit="fichier"):
-            audio_path = os.path.join(WAV_DATA_DIR_v2, file)
-            base_name = os.path.splitext(file)[0]
-            transcript_path = os.path.join(TRANSCRIPTS_DIR, f"{base_name}.txt")
-
-            logger.info(f"Transcription en cours : {audio_path}")
-            try:
-                result = model.transcribe(audio_path, language="fr")
-                text = result["text"].strip()
-            except Exception as e:
-                logger.error(f"Erreur pendant la transcription de {file} : {e}")
-                continue
-
-            # Sauvegarder la transcription dans un fichier texte
-            try:
-                with open(transcript_path, "w", encoding="utf-8") as f:
-                    f.write(text)
-                logger.info(f"Transcription sauvegardée : {transcript_path}")
-            except Exception as e:
-                logger.error(f"Impossible d’enregistrer {transcript_path} : {e}")
-                continue
-
-            # Ajouter au CSV
-            writer.writerow([audio_path, transcript_path, text])
-            logger.info(f"Ligne ajoutée au CSV pour {file}")
-
-    logger.info(f"\nToutes les transcriptions v2 sont enregistrées dans : {CSV_PATH}")
-
-except Exception as e:
-    logger.error(f"Erreur générale pendant la création du CSV : {e}")
+    os.environ["TORCH_HOME"] = MODELS_DIR
+    os.makedirs(TRANSCRIPTS_DIR, exist_ok=True)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+
+    # -----------------------------------------------------------------
+    # Cache : seuls les segments nouveaux ou modifiés sont décodés
+    # -----------------------------------------------------------------
+    wav_files = sorted(f for f in os.listdir(args.wav_dir) if f.lower().endswith(".wav"))
+    wav_paths = [os.path.join(args.wav_dir, f) for f in wav_files]
+    # Options qui changent le texte produit (batch_size et threads n'en font pas partie)
+    options = {"language": args.language, "precision": args.precision, "mode": args.mode}
+    cache = TranscriptCache()
+    cached, todo = split_cached(cache, wav_paths, args.model, options, force=args.force)
+    logger.info(f"{len(cached)} segments en cache, {len(todo)} à transcrire")
+
+    # -----------------------------------------------------------------
+    # Chargement du modèle Whisper
+    # -----------------------------------------------------------------
+    texts, audio_sec, decode_sec, load_sec = {}, 0.0, 0.0, 0.0
+    if todo:
+        logger.info(f"Chargement du modèle Whisper ({args.model}, {args.precision}, threads={args.threads}) sur cpu...")
+        try:
+            model, load_sec = load_whisper_model(args.model, args.precision, args.threads)
+            logger.info(f"Modèle Whisper chargé avec succès en {load_sec:.1f}s !")
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement du modèle Whisper : {e}")
+            raise SystemExit(1)
+
+        keys = dict(todo)
+
+        def store_batch(batch):
+            # Cache réécrit par paquets d'entrées : un crash ne perd que les dernières
+            for audio_path, text in batch.items():
+                cache.put(keys[audio_path], text, audio_file=os.path.basename(audio_path), model=args.model)
+            cache.checkpoint()
+
+        texts, audio_sec, decode_sec = transcribe_files(
+            model, list(keys), args.mode, args.batch_size, args.language, on_batch=store_batch
+        )
+        cache.save()
+
+    # -----------------------------------------------------------------
+    # Sauvegarde des transcriptions + CSV
+    # -----------------------------------------------------------------
+    rows = []
+    written = 0
+    for audio_path, text in {**cached, **texts}.items():
+        base_name = os.path.splitext(os.path.basename(audio_path))[0]
+        transcript_path = os.path.join(TRANSCRIPTS_DIR, f"{base_name}.txt")
+        try:
+            written += write_transcript(transcript_path, text)
+        except Exception as e:
+            logger.error(f"Impossible d’enregistrer {transcript_path} : {e}")
+            continue
+        rows.append({"audio_file": audio_path, "transcript_file": transcript_path, "transcription_text": text})
+
+    try:
+        upsert_csv(CSV_PATH, rows)
+        logger.info(f"{written} transcriptions écrites/mises à jour ; CSV à jour (sans doublon) : {CSV_PATH}")
+    except Exception as e:
+        logger.error(f"Erreur générale pendant la mise à jour du CSV : {e}")
+
+    if not texts:
+        return
+
+    # -----------------------------------------------------------------
+    # RTF de la configuration
+    # -----------------------------------------------------------------
+    rtf = decode_sec / audio_sec if audio_sec else float("nan")
+    append_rtf({
+        "model": args.model, "precision": args.precision, "threads": args.threads or "",
+        "mode": args.mode, "batch_size": args.batch_size if args.mode == "batched" else 1,
+        "files": len(texts), "audio_sec": round(audio_sec, 2), "load_sec": round(load_sec, 2),
+        "decode_sec": round(decode_sec, 2), "rtf": round(rtf, 4),
+    })
+    logger.info(f"{len(texts)} fichiers, {audio_sec:.1f}s d'audio décodés en {decode_sec:.1f}s -> RTF={rtf:.3f} "
+                f"({args.model}, {args.precision}, threads={args.threads}, {args.mode})")
+    logger.info(f"RTF enregistré dans : {RTF_CSV_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+transcript_cache.py
+-------------------
+Cache des transcriptions Whisper, indexé par (hash du contenu audio, modèle,
+options de décodage). Seuls les segments nouveaux ou modifiés sont décodés ;
+un segment renommé mais identique est retrouvé par son contenu.
+"""
+
+import os
+import csv
+import json
+import hashlib
+
+from src.common.config import TRANSCRIPT_CACHE_PATH
+from src.common.run_manifest import atomic_replace, atomic_write_json, file_hash, obj_hash
+
+
+# Entrées ajoutées entre deux réécritures du cache (checkpoint)
+SAVE_EVERY = 20
+
+
+def cache_key(audio_hash, model_name, options):
+    return hashlib.sha1(f"{audio_hash}|{model_name}|{obj_hash(options)}".encode("utf-8")).hexdigest()
+
+
+class TranscriptCache:
+    def __init__(self, path=TRANSCRIPT_CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        self._unsaved = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("entries", {})
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        return entry["text"] if entry else None
+
+    def put(self, key, text, **meta):
+        self.entries[key] = {"text": text, **meta}
+        self._unsaved += 1
+
+    def save(self):
+        atomic_write_json(self.path, {"version": 1, "entries": self.entries})
+        self._unsaved = 0
+
+    def checkpoint(self, every=SAVE_EVERY):
+        """Sauvegarde (réécriture complète) une fois every entrées ajoutées depuis la dernière."""
+        if self._unsaved >= every:
+            self.save()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def split_cached(cache, audio_paths, model_name, options, force=False):
+    """
+    Sépare les fichiers déjà transcrits des fichiers à décoder.
+    Renvoie ({chemin: texte en cache}, [(chemin, clé) à décoder]).
+    """
+    cached, todo = {}, []
+    for path in audio_paths:
+        key = cache_key(file_hash(path), model_name, options)
+        text = None if force else cache.get(key)
+        if text is None:
+            todo.append((path, key))
+        else:
+            cached[path] = text
+    return cached, todo
+
+
+def write_transcript(transcript_path, text):
+    """Écrit le .txt seulement si son contenu change. Renvoie True si écrit."""
+    if os.path.exists(transcript_path):
+        with open(transcript_path, "r", encoding="utf-8") as f:
+            if f.read() == text:
+                return False
+    with open(transcript_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return True
+
+
+def upsert_csv(csv_path, rows, header=("audio_file", "transcript_file", "transcription_text")):
+    """
+    Met à jour le CSV de transcriptions (une ligne par audio_file) au lieu
+    d'ajouter des doublons ; réécriture atomique.
+    """
+    existing = {}
+    if os.path.exists(csv_path):
+        with open(csv_path, "r", newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                existing[row["audio_file"]] = row
+    for row in rows:
+        existing[row["audio_file"]] = row
+
+    def _write(f):
+        writer = csv.DictWriter(f, fieldnames=list(header), extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(existing.values())
+
+    atomic_replace(csv_path, _write, newline="")
@@ -0,0 +1,131 @@
+"""
+whisper_batch.py
+----------------
+Chargement de Whisper selon le budget CPU (taille, fp32/int8, threads) et
+décodage par lots des segments courts de wav_data_v2.
+
+Au lieu d'un `model.transcribe` par fichier (une passe encodeur par segment,
+fenêtre glissante, repli en température), les segments sont découpés en
+fenêtres de 30 s, convertis en log-mel une seule fois puis empilés : l'encodeur
+et le décodeur glouton traitent `batch_size` fenêtres par passe.
+"""
+
+import time
+import logging
+import torch
+import whisper
+from tqdm import tqdm
+from whisper.audio import N_SAMPLES, SAMPLE_RATE
+
+PRECISIONS = ("fp32", "int8")
+
+logger = logging.getLogger(__name__)
+
+
+def _to_plain_linear(model):
+    """
+    whisper.model.Linear sous-classe nn.Linear (cast du poids au dtype d'entrée) ;
+    quantize_dynamic n'accepte que nn.Linear exact. En fp32 le comportement est identique.
+    """
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+    return model
+
+
+def load_whisper_model(size="large", precision="fp32", threads=None):
+    """
+    Charge Whisper sur CPU.
+    precision : "fp32" ou "int8" (quantification dynamique des couches linéaires).
+    threads   : nombre de threads intra-op torch (None = défaut torch).
+    Renvoie (modèle, durée de chargement en secondes).
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Précision inconnue : {precision} (attendu : {', '.join(PRECISIONS)})")
+    if threads:
+        torch.set_num_threads(threads)
+
+    start = time.perf_counter()
+    model = whisper.load_model(size, device="cpu")
+    if precision == "int8":
+        model = torch.quantization.quantize_dynamic(_to_plain_linear(model), {torch.nn.Linear}, dtype=torch.qint8)
+    model.eval()
+    return model, time.perf_counter() - start
+
+
+def split_windows(audio):
+    """Découpe un signal 16 kHz en fenêtres de 30 s (la dernière est complétée par pad_or_trim)."""
+    if len(audio) <= N_SAMPLES:
+        return [audio]
+    return [audio[i:i + N_SAMPLES] for i in range(0, len(audio), N_SAMPLES)]
+
+
+def transcribe_batch(model, audios, language="fr", batch_size=8):
+    """
+    Transcrit une liste de signaux (np.float32, 16 kHz) par lots.
+    Renvoie la liste des textes, dans l'ordre des entrées.
+    """
+    n_mels = model.dims.n_mels
+    # (indice du signal, mel) pour chaque fenêtre de 30 s
+    windows = []
+    for idx, audio in enumerate(audios):
+        for chunk in split_windows(audio):
+            mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(chunk), n_mels=n_mels)
+            windows.append((idx, mel))
+
+    options = whisper.DecodingOptions(language=language, task="transcribe", fp16=False, without_timestamps=True)
+    texts = [[] for _ in audios]
+    with torch.no_grad():
+        for start in range(0, len(windows), batch_size):
+            batch = windows[start:start + batch_size]
+            mels = torch.stack([mel for _, mel in batch]).to(model.device)
+            results = whisper.decode(model, mels, options)
+            for (idx, _), res in zip(batch, results):
+                texts[idx].append(res.text.strip())
+    return [" ".join(t for t in parts if t) for parts in texts]
+
+
+def audio_duration(audio):
+    return len(audio) / float(SAMPLE_RATE)
+
+
+def load_audios(paths):
+    """Charge les fichiers en signaux float32 mono 16 kHz (via ffmpeg, comme Whisper)."""
+    return [whisper.load_audio(p) for p in paths]
+
+
+def transcribe_files(model, wav_paths, mode, batch_size, language, on_batch=None):
+    """
+    Renvoie ({chemin: texte}, durée audio totale, durée de décodage).
+    mode "batched"    : fenêtres de 30 s empilées dans l'encodeur (décodage glouton).
+    mode "sequential" : model.transcribe fichier par fichier (comportement historique,
+                        fp32, texte nettoyé comme en mode batched).
+    on_batch({chemin: texte}) est appelé après chaque lot (persistance du cache).
+    """
+    texts = {}
+    audio_sec = decode_sec = 0.0
+    step = batch_size if mode == "batched" else 1
+    for start in tqdm(range(0, len(wav_paths), step), desc="Transcription", unit="lot"):
+        paths = wav_paths[start:start + step]
+        try:
+            audios = load_audios(paths)
+        except Exception as e:
+            logger.error(f"Erreur de lecture audio ({', '.join(paths)}) : {e}")
+            continue
+        audio_sec += sum(audio_duration(a) for a in audios)
+
+        t0 = time.perf_counter()
+        try:
+            if mode == "batched":
+                results = transcribe_batch(model, audios, language=language, batch_size=batch_size)
+            else:
+                results = [model.transcribe(audios[0], language=language, fp16=False)["text"].strip()]
+        except Exception as e:
+            logger.error(f"Erreur pendant la transcription de {', '.join(paths)} : {e}")
+            continue
+        decode_sec += time.perf_counter() - t0
+        batch = dict(zip(paths, results))
+        texts.update(batch)
+        if on_batch:
+            on_batch(batch)
+    return texts, audio_sec, decode_sec